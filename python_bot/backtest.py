@@ -0,0 +1,452 @@
+"""
+Backtest vetorizado das regras de MarketAnalyst.gerar_sinal_detalhado.
+
+Indicadores, pivôs e ciclo são calculados uma única vez sobre todo o histórico
+e os filtros são aplicados como arrays. Cada candle t é avaliado como o
+"candle atual" do robô: os candles M5 até t e os candles de ciclo fechados
+antes de t, mais o candle de ciclo em formação montado com os M5 até t. Um pivô
+só entra na análise depois do fechamento dos `grupo_candles` candles seguintes
+(o provisório usa apenas o candle em formação), então não há olhar adiante.
+As saídas seguem o trailing por marcos do EA_Executor (trailing_sim.py).
+
+Uso:
+    python backtest.py --simbolo EURUSD --dias 365
+    python backtest.py --csv candles_m5.csv --conferir 100
+    python backtest.py --simbolo EURUSD --sem-trailing
+"""
+import argparse
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import time as dt_time, timedelta
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorCalculator
+from resampler import reamostrar
+from timeframes import TIMEFRAME_M5, TIMEFRAME_M30, segundos_timeframe
+from trailing_sim import ESCALA_EA, simular_saidas
+
+# Mesma ordem em que gerar_sinal_detalhado descarta um candle
+MOTIVOS = ('horario', 'adx', 'corpo', 'distancia_vwap', 'ciclo_neutro', 'duplicado', 'sem_sl')
+
+
+@dataclass
+class ParametrosEstrategia:
+    """Parâmetros da estratégia; os padrões são os valores usados hoje pelo robô."""
+    adx_min: float = 20
+    engolfo_pct_max: float = 2.5
+    distancia_vwap_max: float = 0.005
+    grupo_candles: int = 3
+    distancia_pivo: float = 0.0005
+    distancia_sl: float = 0.0003
+    relacao_risco_retorno: float = 2.0
+    horario_inicio: dt_time = dt_time(0, 0)
+    horario_fim: dt_time = dt_time(23, 59)
+    horas_duplicidade: int = 1
+    timeframe_ciclo: int = TIMEFRAME_M30
+    n_candles_ciclo: int = 500
+    escala_trailing: tuple = ESCALA_EA   # () desliga o trailing do EA_Executor
+    lote: float = 0.01                   # só vai para o sinal; os resultados são em R
+
+
+@dataclass
+class ResultadoBacktest:
+    simbolo: str
+    parametros: ParametrosEstrategia
+    operacoes: pd.DataFrame
+    motivos: pd.Series
+    resumo: dict = field(default_factory=dict)
+
+
+# ================================
+# 🧮 ESTADO POR CANDLE (VETORIZADO)
+# ================================
+
+def _segundos(horario: dt_time) -> float:
+    return horario.hour * 3600 + horario.minute * 60 + horario.second + horario.microsecond / 1e6
+
+
+def _ultimos_tres(valores: np.ndarray, fim: np.ndarray, prov: np.ndarray, tem_prov: np.ndarray):
+    """Três últimos pivôs de cada candle: confirmados até `fim` (exclusivo) e o provisório."""
+    def valor(k):
+        return valores[np.clip(fim - k, 0, max(len(valores) - 1, 0))] if len(valores) else np.full(len(fim), np.nan)
+
+    p3 = np.where(tem_prov, prov, valor(1))
+    p2 = np.where(tem_prov, valor(1), valor(2))
+    p1 = np.where(tem_prov, valor(2), valor(3))
+    return p1, p2, p3
+
+
+def _estado_ciclo(df: pd.DataFrame, parametros: ParametrosEstrategia) -> dict:
+    n = parametros.grupo_candles
+    segundos = segundos_timeframe(parametros.timeframe_ciclo)
+    ciclo_df = reamostrar(df, parametros.timeframe_ciclo)
+    H = ciclo_df['high'].to_numpy(dtype=float)
+    L = ciclo_df['low'].to_numpy(dtype=float)
+    tempos_ciclo = ciclo_df.index.values.astype('datetime64[s]').astype(np.int64)
+
+    # Candle de ciclo em formação de cada M5 e seus high/low parciais até ali
+    tempos = df.index.values.astype('datetime64[s]').astype(np.int64)
+    baldes = tempos // segundos * segundos
+    b = np.searchsorted(tempos_ciclo, baldes)
+    valido = (b < len(tempos_ciclo)) & (tempos_ciclo[np.minimum(b, len(tempos_ciclo) - 1)] == baldes) \
+        if len(tempos_ciclo) else np.zeros(len(df), dtype=bool)
+    grupos = pd.Series(baldes)
+    parcial_high = df['high'].groupby(grupos.values).cummax().to_numpy(dtype=float)
+    parcial_low = df['low'].groupby(grupos.values).cummin().to_numpy(dtype=float)
+
+    # Pivôs confirmados em todo o histórico de ciclo (índices em ciclo_df)
+    idx_topos, idx_fundos = IndicatorCalculator._indices_pivos(H, L, n, parametros.distancia_pivo)
+    inicio_janela = np.maximum(0, b - (parametros.n_candles_ciclo - 1))
+    menor_j = inicio_janela + n          # pivôs antes disso não existem no DataFrame de ciclo do robô
+    maior_j = b - 1 - n                  # pivô em j só é confirmado com o candle j + n fechado
+
+    # Pivô provisório em j = b - n, dependente do candle em formação
+    j = b - n
+    tem_janela = valido & (j - n >= inicio_janela) & (j >= 1)
+    jj = np.clip(j, 1, max(len(H) - 2, 1))
+    if len(H) >= 2 * n + 1:
+        max_fechados = np.r_[np.full(2 * n, np.nan), np.lib.stride_tricks.sliding_window_view(H, 2 * n).max(axis=1)]
+        min_fechados = np.r_[np.full(2 * n, np.nan), np.lib.stride_tricks.sliding_window_view(L, 2 * n).min(axis=1)]
+        bb = np.clip(b, 0, len(max_fechados) - 1)
+        max_janela = np.maximum(max_fechados[bb], parcial_high)
+        min_janela = np.minimum(min_fechados[bb], parcial_low)
+        vizinho_h = np.where(jj + 1 >= b, parcial_high, H[np.minimum(jj + 1, len(H) - 1)])
+        vizinho_l = np.where(jj + 1 >= b, parcial_low, L[np.minimum(jj + 1, len(L) - 1)])
+        prov_topo = H[jj]
+        prov_fundo = L[jj]
+        tem_prov_topo = tem_janela & (prov_topo == max_janela) & (
+            prov_topo - np.maximum(H[jj - 1], vizinho_h) >= parametros.distancia_pivo)
+        tem_prov_fundo = tem_janela & (prov_fundo == min_janela) & (
+            np.minimum(L[jj - 1], vizinho_l) - prov_fundo >= parametros.distancia_pivo)
+    else:
+        prov_topo = prov_fundo = np.full(len(df), np.nan)
+        tem_prov_topo = tem_prov_fundo = np.zeros(len(df), dtype=bool)
+
+    estado = {'valido': valido, 'b': b}
+    for lado, indices, valores, prov, tem_prov in (
+            ('topos', idx_topos, H[idx_topos], prov_topo, tem_prov_topo),
+            ('fundos', idx_fundos, L[idx_fundos], prov_fundo, tem_prov_fundo)):
+        fim = np.searchsorted(indices, maior_j, side='right')
+        ini = np.searchsorted(indices, menor_j, side='left')
+        quantidade = np.maximum(fim - ini, 0) + tem_prov
+        estado[lado] = {
+            'valores': valores, 'ini': ini, 'fim': fim, 'prov': prov, 'tem_prov': tem_prov,
+            'ultimos': _ultimos_tres(valores, fim, prov, tem_prov), 'quantidade': quantidade,
+        }
+    return estado
+
+
+def _ciclos(estado: dict) -> np.ndarray:
+    t1, t2, t3 = estado['topos']['ultimos']
+    f1, f2, f3 = estado['fundos']['ultimos']
+    suficiente = estado['valido'] & (estado['topos']['quantidade'] >= 3) & (estado['fundos']['quantidade'] >= 3)
+
+    topos_sobem = (t1 < t2) & (t2 < t3)
+    alta = topos_sobem & (((f1 < f2) & (f2 < f3)) | (f2 < t3))
+    baixa = (t1 > t2) & (t2 > t3) & (f1 > f2) & (f2 > f3)
+    # 1 = alta, -1 = baixa, 0 = neutro
+    return np.where(suficiente & alta, 1, np.where(suficiente & baixa, -1, 0))
+
+
+def _pivo_para_sl(lado: dict, t: int, preco: float, compra: bool, distancia: float):
+    """Mesma regra de verificar_sl / LadoPivos.mais_recente para o candle t."""
+    def valido(pivo):
+        if compra:
+            return pivo < preco and preco - pivo >= distancia
+        return pivo > preco and pivo - preco >= distancia
+
+    if lado['tem_prov'][t] and valido(lado['prov'][t]):
+        return lado['prov'][t]
+    valores = lado['valores'][lado['ini'][t]:lado['fim'][t]]
+    if compra:
+        ok = np.flatnonzero((valores < preco) & (preco - valores >= distancia))
+    else:
+        ok = np.flatnonzero((valores > preco) & (valores - preco >= distancia))
+    return valores[ok[-1]] if len(ok) else None
+
+
+# ================================
+# 📉 SIMULAÇÃO DAS SAÍDAS
+# ================================
+
+def _primeira_saida(abertura, high, low, i0: int, sl: float, tp: float, compra: bool):
+    """Primeiro candle após i0 que toca SL ou TP; no mesmo candle, SL primeiro (pessimista)."""
+    total = len(high)
+    inicio, passo = i0 + 1, 256
+    while inicio < total:
+        fim = min(total, inicio + passo)
+        if compra:
+            bate_sl = low[inicio:fim] <= sl
+            bate_tp = high[inicio:fim] >= tp
+        else:
+            bate_sl = high[inicio:fim] >= sl
+            bate_tp = low[inicio:fim] <= tp
+        toques = np.flatnonzero(bate_sl | bate_tp)
+        if len(toques):
+            i = inicio + toques[0]
+            if bate_sl[toques[0]]:
+                # Gap além do stop: sai na abertura
+                preco = min(abertura[i], sl) if compra else max(abertura[i], sl)
+                return i, preco, 'sl'
+            preco = max(abertura[i], tp) if compra else min(abertura[i], tp)
+            return i, preco, 'tp'
+        inicio, passo = fim, passo * 4
+    return None, None, 'aberta'
+
+
+# ================================
+# 🚀 BACKTEST
+# ================================
+
+def chave_ciclo(parametros: ParametrosEstrategia) -> tuple:
+    """Parâmetros dos quais dependem os pivôs e o ciclo; o resto do estado não muda entre eles."""
+    return (parametros.grupo_candles, parametros.distancia_pivo, parametros.timeframe_ciclo, parametros.n_candles_ciclo)
+
+
+def executar_backtest(df: pd.DataFrame, parametros: ParametrosEstrategia = None, simbolo: str = "",
+                      cache: dict = None) -> ResultadoBacktest:
+    """
+    `df`: candles M5 fechados, indexados por tempo, com open/high/low/close/tick_volume.
+    `cache`: dicionário mantido pelo chamador entre execuções sobre o mesmo `df`;
+    guarda ADX/VWAP e o estado de ciclo por `chave_ciclo` para varreduras de parâmetros.
+    """
+    parametros = parametros or ParametrosEstrategia()
+    cache = {} if cache is None else cache
+    total = len(df)
+    abertura = df['open'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+
+    if 'base' not in cache:
+        cache['base'] = {
+            'adx': np.round(IndicatorCalculator.calcular_adx(df)['ADX'].to_numpy(dtype=float), 2),
+            'vwap': IndicatorCalculator.calcular_vwap(df)['vwap_diaria'].to_numpy(dtype=float),
+            'corpo_pct': np.abs(close - abertura) / abertura * 100,
+            'segundos_do_dia': df.index.values.astype('datetime64[s]').astype(np.int64) % 86400,
+        }
+    adx, vwap, corpo_pct, segundos_do_dia = (cache['base'][k] for k in ('adx', 'vwap', 'corpo_pct', 'segundos_do_dia'))
+    chave = ('ciclo',) + chave_ciclo(parametros)
+    if chave not in cache:
+        estado = _estado_ciclo(df, parametros)
+        cache[chave] = (estado, _ciclos(estado))
+    estado, ciclo = cache[chave]
+
+    # Filtros independentes de estado, na ordem de gerar_sinal_detalhado
+    with np.errstate(invalid='ignore'):
+        rejeicoes = [
+            (segundos_do_dia < _segundos(parametros.horario_inicio)) |
+            (segundos_do_dia > _segundos(parametros.horario_fim)),
+            (20 < adx) & (adx < parametros.adx_min),
+            corpo_pct > parametros.engolfo_pct_max,
+            np.abs(close - vwap) / vwap > parametros.distancia_vwap_max,
+            ciclo == 0,
+        ]
+    motivo = np.full(total, None, dtype=object)
+    pendente = np.ones(total, dtype=bool)
+    for nome, rejeitado in zip(MOTIVOS, rejeicoes):
+        marcar = pendente & rejeitado
+        motivo[marcar] = nome
+        pendente &= ~rejeitado
+
+    # Candidatos em ordem: duplicidade e SL dependem das operações já abertas
+    tempos = df.index
+    janela_duplicidade = timedelta(hours=parametros.horas_duplicidade)
+    operacoes = []
+    abertas = {1: [], -1: []}     # (tempo de entrada, índice de saída) por direção
+    for t in np.flatnonzero(pendente):
+        direcao = int(ciclo[t])
+        limite = tempos[t] - janela_duplicidade
+        abertas[direcao] = [(ent, sai) for ent, sai in abertas[direcao] if sai is None or sai > t]
+        if any(ent >= limite for ent, _ in abertas[direcao]):
+            motivo[t] = 'duplicado'
+            continue
+
+        compra = direcao == 1
+        lado = estado['fundos'] if compra else estado['topos']
+        pivo = _pivo_para_sl(lado, t, close[t], compra, parametros.distancia_sl)
+        if pivo is None:
+            motivo[t] = 'sem_sl'
+            continue
+
+        preco = close[t]
+        distancia = abs(preco - pivo)
+        sl = round(pivo, 5)
+        tp = round(preco + parametros.relacao_risco_retorno * distancia * (1 if compra else -1), 5)
+        if parametros.escala_trailing:
+            saidas, precos, resultados, _ = simular_saidas(abertura, high, low, close, [t], [compra], [preco],
+                                                           [sl], [tp], parametros.escala_trailing, digitos=5)
+            saida = int(saidas[0]) if saidas[0] >= 0 else None
+            preco_saida, resultado = precos[0], resultados[0]
+        else:
+            saida, preco_saida, resultado = _primeira_saida(abertura, high, low, t, sl, tp, compra)
+        if saida is None:
+            preco_saida = close[-1]
+        abertas[direcao].append((tempos[t], saida))
+
+        risco = abs(preco - sl)
+        lucro = (preco_saida - preco) * (1 if compra else -1)
+        operacoes.append({
+            'entrada': tempos[t],
+            'saida': tempos[saida] if saida is not None else pd.NaT,
+            'direcao': 'buy' if compra else 'sell',
+            'preco_entrada': preco,
+            'sl': sl,
+            'tp': tp,
+            'preco_saida': preco_saida,
+            'resultado': resultado,
+            'lucro': lucro,
+            'r': lucro / risco if risco else np.nan,
+            'candles': (saida if saida is not None else total - 1) - t,
+            'adx': adx[t],
+            'corpo_pct': round(corpo_pct[t], 2),
+            'indice_entrada': t,
+            'indice_saida': saida,
+        })
+
+    operacoes = pd.DataFrame(operacoes, columns=[
+        'entrada', 'saida', 'direcao', 'preco_entrada', 'sl', 'tp', 'preco_saida', 'resultado',
+        'lucro', 'r', 'candles', 'adx', 'corpo_pct', 'indice_entrada', 'indice_saida'])
+    motivos = pd.Series(motivo, index=df.index, name='motivo')
+    return ResultadoBacktest(simbolo, parametros, operacoes, motivos, resumir(operacoes, motivos))
+
+
+def resumir(operacoes: pd.DataFrame, motivos: pd.Series) -> dict:
+    fechadas = operacoes[operacoes['resultado'] != 'aberta']
+    r = fechadas['r'].to_numpy(dtype=float)
+    ganhos, perdas = r[r > 0].sum(), -r[r < 0].sum()
+    curva = np.cumsum(r)
+    drawdown = (np.maximum.accumulate(np.r_[0.0, curva]) - np.r_[0.0, curva]).max() if len(r) else 0.0
+    return {
+        'operacoes': len(operacoes),
+        'fechadas': len(fechadas),
+        'abertas': len(operacoes) - len(fechadas),
+        'taxa_acerto': float((r > 0).mean()) if len(r) else 0.0,
+        'r_total': float(r.sum()),
+        'r_medio': float(r.mean()) if len(r) else 0.0,
+        'fator_lucro': float(ganhos / perdas) if perdas else float('inf') if ganhos else 0.0,
+        'max_drawdown_r': float(drawdown),
+        'candles_medios': float(fechadas['candles'].mean()) if len(fechadas) else 0.0,
+        'rejeicoes': motivos.value_counts().to_dict(),
+    }
+
+
+# ================================
+# 🔎 CONFERÊNCIA COM O CÓDIGO DO ROBÔ
+# ================================
+
+class _IndiceBacktest:
+    """Responde à checagem de duplicidade do MarketAnalyst com as operações do backtest."""
+
+    def __init__(self, operacoes: pd.DataFrame, t: int, agora):
+        self.operacoes = operacoes[(operacoes['indice_entrada'] < t) &
+                                   (operacoes['indice_saida'].isna() | (operacoes['indice_saida'] > t))]
+        self.agora = agora
+
+    def repetido(self, simbolo: str, direcao: str, horas: int = 1) -> bool:
+        recentes = self.operacoes[(self.operacoes['direcao'] == direcao) &
+                                  (self.operacoes['entrada'] >= self.agora - timedelta(hours=horas))]
+        return not recentes.empty
+
+
+def conferir_com_analista(df: pd.DataFrame, resultado: ResultadoBacktest, amostras: int = 50,
+                          seed: int = 0, n_candles_analise: int = 300) -> pd.DataFrame:
+    """
+    Roda MarketAnalyst (caminho do robô) em candles sorteados, com os mesmos
+    recortes de dados do main.py, e devolve as divergências encontradas.
+    """
+    from strategy import MarketAnalyst
+    from pivot_tracker import PivotTracker
+
+    parametros = resultado.parametros
+    proporcao = segundos_timeframe(parametros.timeframe_ciclo) // segundos_timeframe(TIMEFRAME_M5)
+    n_base = max(n_candles_analise, (parametros.n_candles_ciclo + 1) * proporcao)
+    inicio = n_base
+
+    rng = np.random.default_rng(seed)
+    entradas = resultado.operacoes['indice_entrada'].to_numpy()
+    entradas = entradas[entradas >= inicio]
+    candidatos = np.arange(inicio, len(df))
+    sorteio = rng.choice(candidatos, size=min(amostras, len(candidatos)), replace=False) if len(candidatos) else []
+    amostra = np.unique(np.r_[rng.choice(entradas, size=min(amostras, len(entradas)), replace=False)
+                              if len(entradas) else [], sorteio]).astype(int)
+
+    por_entrada = resultado.operacoes.set_index('indice_entrada')
+    divergencias = []
+    for t in amostra:
+        janela = df.iloc[t - n_candles_analise + 1:t + 1]
+        df_ciclo = reamostrar(df.iloc[t - n_base + 1:t + 1], parametros.timeframe_ciclo).iloc[-parametros.n_candles_ciclo:]
+        pivos = PivotTracker(parametros.grupo_candles, parametros.distancia_pivo)
+        pivos.sincronizar(df_ciclo)
+        analista = MarketAnalyst(janela, df_ciclo, resultado.simbolo, pivos=pivos, gravar_sinal=False,
+                                 registrar_motivos=True,
+                                 indice_sinais=_IndiceBacktest(resultado.operacoes, t, df.index[t]))
+        sinal = analista.gerar_sinal_detalhado(parametros, df.index[t].time())
+
+        esperado = resultado.motivos.iloc[t]
+        obtido = analista.motivo_rejeicao
+        if sinal and t in por_entrada.index:
+            operacao = por_entrada.loc[t]
+            if (sinal['direcao'], sinal['sl'], sinal['tp']) != (operacao['direcao'], operacao['sl'], operacao['tp']):
+                divergencias.append({'indice': t, 'tempo': df.index[t], 'backtest': (operacao['direcao'], operacao['sl'], operacao['tp']),
+                                     'robo': (sinal['direcao'], sinal['sl'], sinal['tp'])})
+        elif bool(sinal) != (t in por_entrada.index) or (not sinal and obtido != esperado):
+            divergencias.append({'indice': t, 'tempo': df.index[t], 'backtest': esperado or 'sinal',
+                                 'robo': obtido or 'sinal'})
+    return pd.DataFrame(divergencias, columns=['indice', 'tempo', 'backtest', 'robo'])
+
+
+# ================================
+# 🖥️ LINHA DE COMANDO
+# ================================
+
+def carregar_candles_fake(simbolo: str, dias: int) -> pd.DataFrame:
+    import fake_mt5
+    from bar_cache import rates_para_dataframe
+
+    fake_mt5.configurar(dias_historico=dias + 1)
+    rates = fake_mt5.copy_rates_from_pos(simbolo, TIMEFRAME_M5, 1, dias * 288)
+    return rates_para_dataframe(rates)
+
+
+def main_backtest(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Backtest vetorizado da estratégia")
+    parser.add_argument("--simbolo", default="EURUSD", help="símbolo do fake_mt5 (sem --csv)")
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--csv", help="CSV com colunas time, open, high, low, close, tick_volume (M5)")
+    parser.add_argument("--conferir", type=int, default=0, help="candles sorteados para conferir com o MarketAnalyst")
+    parser.add_argument("--saida", help="CSV para gravar as operações")
+    parser.add_argument("--sem-trailing", action="store_true", help="saídas só por SL/TP fixos")
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        df = pd.read_csv(args.csv, parse_dates=['time']).set_index('time')
+    else:
+        df = carregar_candles_fake(args.simbolo, args.dias)
+
+    inicio = time.perf_counter()
+    parametros = ParametrosEstrategia(escala_trailing=() if args.sem_trailing else ESCALA_EA)
+    resultado = executar_backtest(df, parametros, simbolo=args.simbolo)
+    duracao = time.perf_counter() - inicio
+
+    print(f"📊 {args.simbolo}: {len(df)} candles em {duracao:.2f}s")
+    for chave, valor in resultado.resumo.items():
+        print(f"   {chave}: {valor}")
+    if args.saida:
+        resultado.operacoes.to_csv(args.saida, index=False)
+
+    if args.conferir:
+        divergencias = conferir_com_analista(df, resultado, amostras=args.conferir)
+        if not divergencias.empty:
+            print(f"❌ {len(divergencias)} divergências com o MarketAnalyst:")
+            print(divergencias.to_string(index=False))
+            return 1
+        print(f"✅ Backtest confere com o MarketAnalyst nos candles sorteados")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_backtest())
@@ -0,0 +1,234 @@
+"""
+Arquivo histórico de candles em disco, colunar e mapeado em memória.
+
+Layout: <raiz>/<SIMBOLO>/<timeframe>/<coluna>.bin (um array binário por campo
+do MT5) + meta.json com os tipos e a quantidade de candles válidos. A coluna
+`time` é ordenada e serve de índice: um índice esparso (um tempo a cada
+PASSO_INDICE candles) fica em memória e o recorte por intervalo faz duas
+bisseções que tocam poucas páginas do arquivo, sem carregá-lo.
+
+A ingestão só acrescenta candles fechados mais novos que o último gravado. Os
+bytes vão primeiro para as colunas e só depois a quantidade é publicada no
+meta.json (troca atômica), então um leitor nunca vê um candle pela metade.
+
+Uso:
+    python bar_archive.py --simbolos EURUSD GBPUSD --timeframe M1 --dias 365   # via fake_mt5
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from bars import Barras
+from config import HISTORICO_DIR
+from resampler import reamostrar_barras
+from timeframes import NOMES_TIMEFRAME, SEGUNDOS_POR_TIMEFRAME, segundos_timeframe
+
+PASSO_INDICE = 4096
+
+
+def _segundos(tempo) -> int:
+    """Aceita segundos, datetime, Timestamp, datetime64 ou texto ISO."""
+    if isinstance(tempo, (int, np.integer)):
+        return int(tempo)
+    return pd.Timestamp(tempo).value // 1_000_000_000
+
+
+class _Serie:
+    """Colunas mapeadas de um (símbolo, timeframe) com `quantidade` candles válidos."""
+
+    def __init__(self, diretorio: str, meta: dict, versao: float):
+        self.versao = versao
+        self.quantidade = meta['quantidade']
+        self.colunas = {}
+        for coluna, tipo in meta['colunas'].items():
+            caminho = os.path.join(diretorio, f"{coluna}.bin")
+            self.colunas[coluna] = (np.memmap(caminho, dtype=np.dtype(tipo), mode='r', shape=(self.quantidade,))
+                                    if self.quantidade else np.empty(0, dtype=np.dtype(tipo)))
+        self.tempo = self.colunas.pop('time')
+        self.esparso = np.array(self.tempo[::PASSO_INDICE])
+
+    def posicao(self, tempo: int, lado: str = 'left') -> int:
+        bloco = max(int(np.searchsorted(self.esparso, tempo, side=lado)) - 1, 0)
+        inicio = bloco * PASSO_INDICE
+        fim = min(inicio + 2 * PASSO_INDICE, self.quantidade)
+        return inicio + int(np.searchsorted(self.tempo[inicio:fim], tempo, side=lado))
+
+    def barras(self, inicio: int, fim: int) -> Barras:
+        return Barras(self.tempo[inicio:fim], {c: v[inicio:fim] for c, v in self.colunas.items()})
+
+
+class ArquivoBarras:
+    def __init__(self, raiz: str = HISTORICO_DIR):
+        self.raiz = raiz
+        self._series = {}
+        self._lock = threading.Lock()
+
+    # ================================
+    # 📁 LAYOUT
+    # ================================
+
+    def diretorio(self, simbolo: str, timeframe: int) -> str:
+        return os.path.join(self.raiz, simbolo, NOMES_TIMEFRAME[timeframe])
+
+    def _ler_meta(self, diretorio: str):
+        caminho = os.path.join(diretorio, "meta.json")
+        if not os.path.exists(caminho):
+            return None, None
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f), os.stat(caminho).st_mtime_ns
+
+    def _gravar_meta(self, diretorio: str, meta: dict):
+        temporario = os.path.join(diretorio, "meta.json.tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(temporario, os.path.join(diretorio, "meta.json"))
+
+    def simbolos(self) -> list:
+        if not os.path.isdir(self.raiz):
+            return []
+        return sorted(os.listdir(self.raiz))
+
+    def _serie(self, simbolo: str, timeframe: int):
+        """Série aberta, reaberta só quando outra ingestão publicou candles novos."""
+        diretorio = self.diretorio(simbolo, timeframe)
+        meta, versao = self._ler_meta(diretorio)
+        if meta is None:
+            return None
+        with self._lock:
+            serie = self._series.get((simbolo, timeframe))
+            if serie is None or serie.versao != versao:
+                serie = _Serie(diretorio, meta, versao)
+                self._series[(simbolo, timeframe)] = serie
+            return serie
+
+    # ================================
+    # 📥 INGESTÃO (SÓ ACRESCENTA)
+    # ================================
+
+    def acrescentar(self, simbolo: str, timeframe: int, rates) -> int:
+        """Acrescenta os candles de `rates` (array do MT5 ou Barras) mais novos que o último gravado."""
+        barras = Barras.de(rates)
+        diretorio = self.diretorio(simbolo, timeframe)
+        os.makedirs(diretorio, exist_ok=True)
+        meta, _ = self._ler_meta(diretorio)
+        if meta is None:
+            meta = {'timeframe': timeframe, 'quantidade': 0,
+                    'colunas': {'time': '<i8', **{c: barras.coluna(c).dtype.str for c in barras.colunas}}}
+            ultimo = None
+        else:
+            serie = self._serie(simbolo, timeframe)
+            ultimo = int(serie.tempo[-1]) if serie.quantidade else None
+
+        if ultimo is not None:
+            barras = barras[barras.posicao(ultimo, 'right'):]
+        if barras.vazio:
+            return 0
+        if np.any(np.diff(barras.tempo) <= 0):
+            raise ValueError(f"Candles fora de ordem ou repetidos para {simbolo}")
+
+        for coluna, tipo in meta['colunas'].items():
+            valores = barras.tempo if coluna == 'time' else barras.coluna(coluna)
+            caminho = os.path.join(diretorio, f"{coluna}.bin")
+            with open(caminho, "ab") as f:
+                # Descarta sobras de uma ingestão interrompida antes do meta.json
+                f.truncate(meta['quantidade'] * np.dtype(tipo).itemsize)
+                np.ascontiguousarray(valores, dtype=np.dtype(tipo)).tofile(f)
+
+        meta['quantidade'] += len(barras)
+        self._gravar_meta(diretorio, meta)
+        return len(barras)
+
+    def ingerir_mt5(self, simbolo: str, timeframe: int, mt5_modulo=None, max_barras: int = 100_000,
+                    lote_inicial: int = 1024) -> int:
+        """Busca no terminal (ou no fake_mt5) os candles fechados que faltam e acrescenta."""
+        mt5 = mt5_modulo or importlib.import_module('MetaTrader5')
+        serie = self._serie(simbolo, timeframe)
+        ultimo = int(serie.tempo[-1]) if serie is not None and serie.quantidade else None
+
+        lote = max_barras if ultimo is None else lote_inicial
+        while True:
+            # Posição 1: o candle em formação (posição 0) nunca entra no arquivo
+            rates = mt5.copy_rates_from_pos(simbolo, timeframe, 1, lote)
+            if rates is None or len(rates) == 0:
+                return 0
+            cobre = ultimo is None or rates['time'][0] <= ultimo
+            if cobre or len(rates) < lote or lote >= max_barras:
+                return self.acrescentar(simbolo, timeframe, rates)
+            lote = min(lote * 4, max_barras)
+
+    # ================================
+    # 📤 LEITURA
+    # ================================
+
+    def intervalo(self, simbolo: str, timeframe: int):
+        serie = self._serie(simbolo, timeframe)
+        if serie is None or not serie.quantidade:
+            return None
+        return (pd.Timestamp(int(serie.tempo[0]), unit='s'), pd.Timestamp(int(serie.tempo[-1]), unit='s'))
+
+    def ler(self, simbolo: str, timeframe: int, inicio=None, fim=None) -> Barras:
+        """Candles com início <= tempo <= fim; as colunas são fatias dos arquivos mapeados."""
+        serie = self._serie(simbolo, timeframe)
+        if serie is None or not serie.quantidade:
+            return Barras.vazia()
+        a = serie.posicao(_segundos(inicio)) if inicio is not None else 0
+        b = serie.posicao(_segundos(fim), 'right') if fim is not None else serie.quantidade
+        return serie.barras(a, max(a, b))
+
+    def ultimas(self, simbolo: str, timeframe: int, n_barras: int, fim=None) -> Barras:
+        """Equivalente ao obter_candles do robô sobre o arquivo: os `n_barras` candles até `fim`."""
+        serie = self._serie(simbolo, timeframe)
+        if serie is None or not serie.quantidade:
+            return Barras.vazia()
+        b = serie.posicao(_segundos(fim), 'right') if fim is not None else serie.quantidade
+        return serie.barras(max(0, b - n_barras), b)
+
+    def ler_reamostrado(self, simbolo: str, timeframe_base: int, timeframe: int, inicio=None, fim=None) -> Barras:
+        """Candles de `timeframe` montados na hora a partir do timeframe base gravado."""
+        if inicio is not None:
+            segundos = segundos_timeframe(timeframe)
+            inicio = _segundos(inicio) // segundos * segundos   # começa num candle maior completo
+        return reamostrar_barras(self.ler(simbolo, timeframe_base, inicio, fim), timeframe,
+                                 descartar_parcial=inicio is None)
+
+
+# ================================
+# 🖥️ LINHA DE COMANDO
+# ================================
+
+def main_arquivo(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Popula o arquivo histórico a partir do fake_mt5 (ou do terminal)")
+    parser.add_argument("--simbolos", nargs="+", default=["EURUSD"])
+    parser.add_argument("--timeframe", choices=list(NOMES_TIMEFRAME.values()), default="M1")
+    parser.add_argument("--dias", type=int, default=30, help="histórico simulado pelo fake_mt5")
+    parser.add_argument("--raiz", default=HISTORICO_DIR)
+    parser.add_argument("--mt5", action="store_true", help="usa o terminal MetaTrader5 em vez do fake_mt5")
+    args = parser.parse_args(argv)
+
+    timeframe = next(tf for tf, nome in NOMES_TIMEFRAME.items() if nome == args.timeframe)
+    if args.mt5:
+        mt5 = importlib.import_module('MetaTrader5')
+    else:
+        import fake_mt5 as mt5
+        mt5.configurar(dias_historico=args.dias)
+    if not mt5.initialize():
+        print("❌ Falha ao inicializar o MT5")
+        return 1
+
+    arquivo = ArquivoBarras(args.raiz)
+    max_barras = args.dias * 86400 // SEGUNDOS_POR_TIMEFRAME[timeframe]
+    for simbolo in args.simbolos:
+        novos = arquivo.ingerir_mt5(simbolo, timeframe, mt5, max_barras=max_barras)
+        print(f"💾 {simbolo} {args.timeframe}: +{novos} candles, intervalo {arquivo.intervalo(simbolo, timeframe)}")
+    mt5.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_arquivo())
@@ -0,0 +1,128 @@
+import importlib
+import threading
+import numpy as np
+import pandas as pd
+
+from bars import Barras
+from mt5_gateway import gateway_mt5
+
+
+def rates_para_dataframe(rates) -> pd.DataFrame:
+    df = pd.DataFrame(rates)
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+    df.set_index('time', inplace=True)
+    return df
+
+
+class BarCache:
+    """
+    Cache de candles OHLCV por (símbolo, timeframe) com busca incremental.
+
+    Na primeira chamada baixa o histórico completo; depois pede ao terminal só
+    alguns candles do fim, substitui o candle em formação e acrescenta os novos.
+    O cache guarda o array estruturado do MT5 como veio: `obter_barras` devolve
+    visões dele (sem cópia) e `obter` monta um DataFrame sob demanda. Cada
+    atualização gera um array novo, então visões já entregues não mudam.
+    """
+
+    def __init__(self, mt5_modulo=None, lote_inicial: int = 4):
+        self._mt5 = mt5_modulo
+        self.lote_inicial = lote_inicial
+        self._rates = {}
+        self._profundidade = {}
+        self._lock = threading.RLock()
+        self.acertos = 0
+        self.faltas = 0
+        self.barras_baixadas = 0
+
+    @property
+    def mt5(self):
+        if self._mt5 is None:
+            self._mt5 = importlib.import_module('MetaTrader5')
+        return self._mt5
+
+    @property
+    def lock(self) -> threading.RLock:
+        """Lock do estado do cache (o acesso ao terminal é serializado pelo gateway MT5)."""
+        return self._lock
+
+    def _baixar(self, simbolo: str, timeframe: int, n_barras: int):
+        rates = self.mt5.copy_rates_from_pos(simbolo, timeframe, 0, n_barras)
+        if rates is None or len(rates) == 0:
+            return None
+        self.barras_baixadas += len(rates)
+        return rates
+
+    def _carga_completa(self, chave, n_barras: int):
+        self.faltas += 1
+        rates = self._baixar(chave[0], chave[1], n_barras)
+        if rates is None:
+            self._rates.pop(chave, None)
+            return None
+        self._rates[chave] = rates
+        self._profundidade[chave] = n_barras
+        return rates
+
+    def _carga_incremental(self, chave, cache: np.ndarray):
+        ultimo = cache['time'][-1]
+        profundidade = self._profundidade[chave]
+        lote = min(self.lote_inicial, profundidade)
+
+        while True:
+            rates = self._baixar(chave[0], chave[1], lote)
+            if rates is None:
+                return cache
+            if rates['time'][0] <= ultimo:
+                # Sobreposição com o cache: substitui o candle em formação e anexa os novos
+                self.acertos += 1
+                novos = rates[rates['time'] >= ultimo]
+                if len(novos) == 0:
+                    # O terminal só devolveu candles anteriores ao cache: nada novo
+                    return cache
+                manter = np.searchsorted(cache['time'], novos['time'][0])
+                inicio = max(0, manter + len(novos) - profundidade)
+                cache = np.concatenate([cache[inicio:manter], novos])
+                self._rates[chave] = cache
+                return cache
+            if lote >= profundidade:
+                # Nem a profundidade inteira alcança o cache: o que veio já é a recarga completa
+                self.faltas += 1
+                self._rates[chave] = rates
+                return rates
+            lote = min(lote * 4, profundidade)
+
+    def obter_barras(self, simbolo: str, timeframe: int, n_barras: int) -> Barras:
+        chave = (simbolo, timeframe)
+        with self._lock:
+            cache = self._rates.get(chave)
+            if cache is None or n_barras > self._profundidade.get(chave, 0):
+                rates = self._carga_completa(chave, n_barras)
+            else:
+                rates = self._carga_incremental(chave, cache)
+            if rates is None:
+                return Barras.vazia()
+            return Barras.de_rates(rates[-n_barras:])
+
+    def obter(self, simbolo: str, timeframe: int, n_barras: int) -> pd.DataFrame:
+        barras = self.obter_barras(simbolo, timeframe, n_barras)
+        return barras.como_dataframe() if not barras.vazio else pd.DataFrame()
+
+    def invalidar(self, simbolo: str = None):
+        with self._lock:
+            for chave in [c for c in self._rates if simbolo is None or c[0] == simbolo]:
+                del self._rates[chave]
+                self._profundidade.pop(chave, None)
+
+    def estatisticas(self) -> dict:
+        total = self.acertos + self.faltas
+        return {
+            'acertos': self.acertos,
+            'faltas': self.faltas,
+            'taxa_acerto': self.acertos / total if total else 0.0,
+            'barras_baixadas': self.barras_baixadas,
+            'series_em_cache': len(self._rates),
+        }
+
+
+# Instância compartilhada pelo loop de estratégias, scanner e painel do mesmo processo
+cache_barras = BarCache(mt5_modulo=gateway_mt5)
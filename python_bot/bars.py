@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+
+class Barras:
+    """
+    Candles OHLCV sobre arrays NumPy, sem DataFrame no caminho quente.
+
+    Criada a partir do array estruturado de `copy_rates_from_pos`, as colunas são
+    visões dos campos (nenhuma cópia) e `tempo` fica em segundos (int64), como o
+    MT5 entrega. Fatias também são visões. O DataFrame só é montado sob demanda,
+    por `como_dataframe()` (painel, depuração, código legado).
+    """
+
+    __slots__ = ('_tempo', '_colunas', '_df')
+
+    def __init__(self, tempo: np.ndarray, colunas: dict):
+        self._tempo = tempo
+        self._colunas = colunas
+        self._df = None
+
+    @classmethod
+    def de_rates(cls, rates) -> "Barras":
+        if rates is None:
+            return cls.vazia()
+        campos = [c for c in rates.dtype.names if c != 'time']
+        return cls(rates['time'].astype(np.int64, copy=False), {c: rates[c] for c in campos})
+
+    @classmethod
+    def de_dataframe(cls, df: pd.DataFrame) -> "Barras":
+        tempo = df.index.values.astype('datetime64[s]').astype(np.int64)
+        return cls(tempo, {c: df[c].to_numpy() for c in df.columns})
+
+    @classmethod
+    def de(cls, dados) -> "Barras":
+        """Aceita Barras, DataFrame indexado por tempo ou o array do MT5."""
+        if isinstance(dados, Barras):
+            return dados
+        if isinstance(dados, pd.DataFrame):
+            return cls.de_dataframe(dados)
+        return cls.de_rates(dados)
+
+    @classmethod
+    def vazia(cls) -> "Barras":
+        return cls(np.empty(0, dtype=np.int64), {})
+
+    @staticmethod
+    def concatenar(partes: list) -> "Barras":
+        partes = [p for p in partes if len(p)]
+        if not partes:
+            return Barras.vazia()
+        if len(partes) == 1:
+            return partes[0]
+        colunas = [c for c in partes[0].colunas if all(c in p._colunas for p in partes)]
+        return Barras(np.concatenate([p._tempo for p in partes]),
+                      {c: np.concatenate([p._colunas[c] for p in partes]) for c in colunas})
+
+    # ================================
+    # 📐 ACESSO
+    # ================================
+
+    def __len__(self) -> int:
+        return len(self._tempo)
+
+    @property
+    def vazio(self) -> bool:
+        return len(self._tempo) == 0
+
+    def __getitem__(self, fatia: slice) -> "Barras":
+        if not isinstance(fatia, slice):
+            raise TypeError("Barras aceita apenas fatias; use as colunas para valores individuais")
+        return Barras(self._tempo[fatia], {c: v[fatia] for c, v in self._colunas.items()})
+
+    def ultimas(self, n: int) -> "Barras":
+        return self[-n:] if n > 0 else self[:0]
+
+    def posicao(self, tempo: int, lado: str = 'left') -> int:
+        """Índice de `tempo` (segundos) por bisseção."""
+        return int(np.searchsorted(self._tempo, tempo, side=lado))
+
+    @property
+    def colunas(self) -> tuple:
+        return tuple(self._colunas)
+
+    def coluna(self, nome: str) -> np.ndarray:
+        """Coluna pelo nome; zeros se ela não existir (ex.: `volume` fora do MT5)."""
+        valores = self._colunas.get(nome)
+        return valores if valores is not None else np.zeros(len(self))
+
+    @property
+    def tempo(self) -> np.ndarray:
+        return self._tempo
+
+    @property
+    def tempos(self) -> np.ndarray:
+        return self._tempo.view('datetime64[s]')
+
+    @property
+    def open(self) -> np.ndarray:
+        return self._colunas['open']
+
+    @property
+    def high(self) -> np.ndarray:
+        return self._colunas['high']
+
+    @property
+    def low(self) -> np.ndarray:
+        return self._colunas['low']
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._colunas['close']
+
+    @property
+    def tick_volume(self) -> np.ndarray:
+        return self._colunas['tick_volume']
+
+    @property
+    def volume(self) -> np.ndarray:
+        """tick_volume e, quando zerado, a coluna `volume` (mesma regra dos indicadores)."""
+        tick_volume = self.tick_volume.astype(float)
+        return np.where(tick_volume > 0, tick_volume, self.coluna('volume').astype(float))
+
+    # ================================
+    # 🐼 PANDAS SOB DEMANDA
+    # ================================
+
+    def como_dataframe(self) -> pd.DataFrame:
+        if self._df is None:
+            indice = pd.DatetimeIndex(self.tempos.astype('datetime64[ns]'), name='time')
+            self._df = pd.DataFrame(self._colunas, index=indice)
+        return self._df
+
+    def __getstate__(self):
+        # O DataFrame em cache não vai junto para outros processos
+        return self._tempo, self._colunas
+
+    def __setstate__(self, estado):
+        self._tempo, self._colunas = estado
+        self._df = None
+
+    def __repr__(self) -> str:
+        if self.vazio:
+            return "Barras(vazia)"
+        return f"Barras({len(self)} candles, {self.tempos[0]} → {self.tempos[-1]})"
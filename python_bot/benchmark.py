@@ -0,0 +1,216 @@
+"""
+Benchmarks reprodutíveis dos indicadores e do ciclo de sinais, sem MT5 nem rede.
+
+Uso:
+    python benchmark.py --saida resultados.json
+    python benchmark.py --tamanhos 1000 10000 --comparar baseline.json --tolerancia 0.25
+
+Os candles são sintéticos (semente fixa) e o ciclo completo roda contra o
+fake_mt5 e um SQLite temporário. Com `--comparar`, tempos medianos acima de
+baseline * (1 + tolerância) são marcados como regressão e o código de saída é 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Banco, logs e MT5 isolados antes de importar os módulos do robô
+_DIRETORIO = tempfile.mkdtemp(prefix="bench_trader_")
+os.environ["DB_PATH"] = os.path.join(_DIRETORIO, "sinais.sqlite")
+os.environ.setdefault("METRICAS", "0")
+
+import fake_mt5  # noqa: E402
+sys.modules["MetaTrader5"] = fake_mt5
+
+TAMANHOS_PADRAO = [1_000, 10_000, 100_000, 1_000_000]
+
+
+# ================================
+# 🧪 DADOS SINTÉTICOS
+# ================================
+
+def gerar_ohlcv(n_barras: int, seed: int = 0, minutos: int = 5, preco: float = 1.10) -> pd.DataFrame:
+    """Passeio aleatório log-normal com colunas e índice iguais aos do MT5."""
+    rng = np.random.default_rng(seed)
+    close = preco * np.exp(np.cumsum(rng.normal(0, 0.0008, n_barras)))
+    abertura = np.concatenate(([preco], close[:-1]))
+    amplitude = np.abs(rng.normal(0, 0.0006, n_barras)) * close
+    indice = pd.date_range("2020-01-06", periods=n_barras, freq=f"{minutos}min", name="time")
+    return pd.DataFrame({
+        'open': abertura,
+        'high': np.maximum(abertura, close) + amplitude,
+        'low': np.minimum(abertura, close) - amplitude,
+        'close': close,
+        'tick_volume': rng.integers(1, 500, n_barras).astype(np.uint64),
+        'spread': np.full(n_barras, 12, dtype=np.int32),
+        'real_volume': np.zeros(n_barras, dtype=np.uint64),
+    }, index=indice)
+
+
+# ================================
+# ⏱️ MEDIÇÃO
+# ================================
+
+def medir(funcao, repeticoes: int) -> dict:
+    funcao()  # aquecimento (imports preguiçosos, caches do pandas)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return {'mediana': statistics.median(tempos), 'min': min(tempos), 'max': max(tempos), 'repeticoes': repeticoes}
+
+
+def repeticoes_para(n_barras: int) -> int:
+    return max(3, min(50, 2_000_000 // max(n_barras, 1) // 20))
+
+
+def bench_indicadores(tamanhos, n_simbolos: int) -> dict:
+    from indicators import IndicatorCalculator
+    from resampler import reamostrar
+    from timeframes import TIMEFRAME_M30
+    from strategy import MarketAnalyst
+    from symbol_manager import SymbolConfig
+
+    config = SymbolConfig(simbolo="BENCH", lote=0.01, adx_min=20,
+                          horario_inicio=datetime.strptime("00:00", "%H:%M").time(),
+                          horario_fim=datetime.strptime("23:59", "%H:%M").time(),
+                          tipo="forex", volume_ajustado=1.0, ponto=0.0001)
+    horario = datetime.strptime("12:00", "%H:%M").time()
+
+    resultados = {}
+    for n in tamanhos:
+        frames = [gerar_ohlcv(n, seed=i) for i in range(n_simbolos)]
+        ciclos = [reamostrar(df, TIMEFRAME_M30) for df in frames]
+        repeticoes = repeticoes_para(n)
+        proximo = iter(range(10 ** 9))
+
+        def escolher(lista):
+            return lista[next(proximo) % n_simbolos]
+
+        resultados[f"calcular_vwap/{n}"] = medir(
+            lambda: IndicatorCalculator.calcular_vwap(escolher(frames)), repeticoes)
+        resultados[f"calcular_adx/{n}"] = medir(
+            lambda: IndicatorCalculator.calcular_adx(escolher(frames)), repeticoes)
+        resultados[f"detectar_pivos/{n}"] = medir(
+            lambda: IndicatorCalculator.detectar_pivos(escolher(frames), grupo_candles=3, distancia_minima=0.0005),
+            repeticoes)
+
+        def analista():
+            i = next(proximo) % n_simbolos
+            analise = MarketAnalyst(frames[i], ciclos[i], f"BENCH{i}", gravar_sinal=False)
+            analise.gerar_sinal_detalhado(config, horario)
+
+        resultados[f"market_analyst/{n}"] = medir(analista, repeticoes)
+    return resultados
+
+
+def bench_ciclo_completo(n_simbolos: int, ciclos: int) -> dict:
+    fake_mt5.configurar(simbolos=[
+        (f"SIM{i:02d}", f"Simbolo sintético {i}", f"Forex\\Bench\\SIM{i:02d}", 10, 1.0 + i / 10, 0.00001)
+        for i in range(n_simbolos)
+    ])
+    fake_mt5.initialize()
+
+    import main
+    from market_scanner import MarketScanner, ScannerConfig
+
+    scanner = MarketScanner(ScannerConfig(max_forex=n_simbolos, max_indices=0, max_crypto=0, max_acoes=0,
+                                          spread_maximo=50))
+    inicio = time.perf_counter()
+    scanner.carregar_dados_mt5()
+    scanner.salvar_no_banco()
+    resultados = {f"market_scanner/{n_simbolos}_ativos": {
+        'mediana': time.perf_counter() - inicio, 'min': None, 'max': None, 'repeticoes': 1}}
+
+    inicio = time.perf_counter()
+    main.executar_estrategias()
+    resultados[f"executar_estrategias_frio/{n_simbolos}_ativos"] = {
+        'mediana': time.perf_counter() - inicio, 'min': None, 'max': None, 'repeticoes': 1}
+
+    def ciclo():
+        fake_mt5.avancar(300)
+        main.executar_estrategias()
+
+    resultados[f"executar_estrategias/{n_simbolos}_ativos"] = medir(ciclo, ciclos)
+    return resultados
+
+
+# ================================
+# 📊 COMPARAÇÃO COM BASELINE
+# ================================
+
+def comparar(atual: dict, baseline: dict, tolerancia: float) -> list:
+    regressoes = []
+    for nome, medida in atual['resultados'].items():
+        referencia = baseline.get('resultados', {}).get(nome)
+        if referencia is None or not referencia['mediana']:
+            continue
+        razao = medida['mediana'] / referencia['mediana']
+        if razao > 1 + tolerancia:
+            regressoes.append((nome, referencia['mediana'], medida['mediana'], razao))
+    return regressoes
+
+
+def main_benchmark(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do robô trader (offline)")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO)
+    parser.add_argument("--simbolos", type=int, default=3, help="séries sintéticas por tamanho")
+    parser.add_argument("--ativos-ciclo", type=int, default=10, help="ativos no ciclo completo")
+    parser.add_argument("--ciclos", type=int, default=5, help="repetições do ciclo completo")
+    parser.add_argument("--sem-ciclo", action="store_true", help="pula o ciclo completo")
+    parser.add_argument("--saida", default="benchmark_resultados.json")
+    parser.add_argument("--comparar", help="JSON de baseline gerado por uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.20)
+    args = parser.parse_args(argv)
+
+    saida = os.path.abspath(args.saida)
+    baseline = os.path.abspath(args.comparar) if args.comparar else None
+    # Logs do robô vão para o diretório temporário, não para o do projeto
+    os.chdir(_DIRETORIO)
+
+    resultados = bench_indicadores(args.tamanhos, args.simbolos)
+    if not args.sem_ciclo:
+        resultados.update(bench_ciclo_completo(args.ativos_ciclo, args.ciclos))
+
+    relatorio = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'plataforma': platform.platform(),
+            'processador': platform.processor() or platform.machine(),
+        },
+        'resultados': resultados,
+    }
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+
+    largura = max(len(nome) for nome in resultados)
+    for nome, medida in resultados.items():
+        print(f"{nome:<{largura}}  {medida['mediana'] * 1000:10.3f} ms")
+    print(f"\n💾 Resultados salvos em {saida}")
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            regressoes = comparar(relatorio, json.load(f), args.tolerancia)
+        if regressoes:
+            print(f"\n❌ {len(regressoes)} regressões acima de {args.tolerancia:.0%}:")
+            for nome, antes, depois, razao in regressoes:
+                print(f"   {nome}: {antes * 1000:.3f} ms → {depois * 1000:.3f} ms ({razao:.2f}x)")
+            return 1
+        print(f"\n✅ Nenhuma regressão acima de {args.tolerancia:.0%} em relação a {baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_benchmark())
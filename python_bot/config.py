@@ -4,3 +4,24 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DB_PATH = os.getenv("DB_PATH")
+
+# Gera também logs/trader_AAAA-MM-DD.jsonl (um objeto JSON por linha, com o símbolo em análise)
+LOG_JSON = os.getenv("LOG_JSON", "0").lower() in ("1", "true", "sim")
+
+# Tempos por etapa e contadores de filtros (metrics.py); 0 desliga a coleta
+METRICAS_HABILITADAS = os.getenv("METRICAS", "1").lower() in ("1", "true", "sim")
+# Segundos entre gravações das métricas no SQLite (painel); o arquivo Prometheus sai a cada ciclo
+METRICAS_INTERVALO_SQLITE = float(os.getenv("METRICAS_INTERVALO_SQLITE", "300"))
+
+# Arquivo histórico de candles (bar_archive.py): uma pasta por símbolo e timeframe
+HISTORICO_DIR = os.getenv("HISTORICO_DIR", "historico")
+
+# O loop principal acrescenta ao arquivo os candles fechados que analisa (gráfico do painel)
+ARQUIVAR_CANDLES = os.getenv("ARQUIVAR_CANDLES", "1").lower() in ("1", "true", "sim")
+
+# Gateway MT5 (mt5_gateway.py): segundos que um copy_rates_* idêntico reaproveita o resultado.
+# 0 = só une pedidos simultâneos; com TTL, um candle que fecha dentro da janela pode chegar atrasado
+MT5_CACHE_TTL = float(os.getenv("MT5_CACHE_TTL", "0"))
+
+# Limite de chamadas por segundo ao terminal; 0 = sem limite
+MT5_MAX_POR_SEGUNDO = float(os.getenv("MT5_MAX_POR_SEGUNDO", "0"))
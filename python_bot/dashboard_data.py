@@ -0,0 +1,211 @@
+"""
+Camada de dados do painel (streamlit_app.py).
+
+Os filtros vão para o SQL (símbolo, status, intervalo de datas) com paginação,
+usando os índices de `sinais`, e os resultados ficam num cache com validade
+(TTL) por consulta, compartilhado por todas as sessões do painel. Vencido o TTL,
+a consulta só é refeita se `PRAGMA data_version` indicar que outra conexão
+(robô, EAs) gravou no banco. Os candles do gráfico vêm do arquivo histórico
+local (bar_archive.py), sem abrir o terminal MT5.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from bar_archive import ArquivoBarras
+from config import DB_PATH, HISTORICO_DIR
+from database import obter_banco
+from timeframes import NOMES_TIMEFRAME, segundos_timeframe
+
+COLUNAS_CANDLES = ('open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume')
+
+
+class CacheTTL:
+    """Resultados por chave com validade; `versao` revalida entradas vencidas sem recalcular."""
+
+    def __init__(self, ttl: float = 5.0, max_itens: int = 256):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._itens = {}
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave, calcular, versao=None):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                expira, versao_item, valor = item
+                if agora < expira or (versao is not None and versao == versao_item):
+                    self._itens[chave] = (agora + self.ttl, versao_item, valor)
+                    self.acertos += 1
+                    return valor
+        self.faltas += 1
+        valor = calcular()
+        with self._lock:
+            if len(self._itens) >= self.max_itens:
+                # Descarta o item que vence primeiro
+                del self._itens[min(self._itens, key=lambda c: self._itens[c][0])]
+            self._itens[chave] = (agora + self.ttl, versao, valor)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self) -> dict:
+        total = self.acertos + self.faltas
+        return {'acertos': self.acertos, 'faltas': self.faltas,
+                'taxa_acerto': self.acertos / total if total else 0.0, 'itens': len(self._itens)}
+
+
+@dataclass(frozen=True)
+class FiltroSinais:
+    simbolo: str = None
+    status: str = None
+    inicio: date = None       # inclusive
+    fim: date = None          # inclusive
+    pagina: int = 0
+    por_pagina: int = 100
+
+    def clausulas(self) -> tuple:
+        condicoes, parametros = [], []
+        if self.simbolo:
+            condicoes.append("simbolo = ?")
+            parametros.append(self.simbolo)
+        if self.status:
+            condicoes.append("status = ?")
+            parametros.append(self.status)
+        # timestamp é ISO 8601 em texto: comparar strings equivale a comparar datas
+        if self.inicio is not None:
+            condicoes.append("timestamp >= ?")
+            parametros.append(self.inicio.isoformat())
+        if self.fim is not None:
+            condicoes.append("timestamp < ?")
+            parametros.append((self.fim + timedelta(days=1)).isoformat())
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        return where, tuple(parametros)
+
+
+def _candles_vazio() -> pd.DataFrame:
+    return pd.DataFrame(columns=list(COLUNAS_CANDLES), index=pd.DatetimeIndex([], name='time'), dtype=float)
+
+
+class DadosPainel:
+    def __init__(self, caminho_banco: str = DB_PATH, ttl: float = 5.0, arquivo: ArquivoBarras = None):
+        self.caminho_banco = caminho_banco
+        self.cache = CacheTTL(ttl)
+        self.arquivo = arquivo or ArquivoBarras(HISTORICO_DIR)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    # ================================
+    # 🗄️ BANCO
+    # ================================
+
+    def _consultar(self, sql: str, parametros=()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, obter_banco(self.caminho_banco).conexao(), params=parametros)
+
+    def versao_banco(self) -> int:
+        """`PRAGMA data_version` de uma conexão própria: muda quando outra conexão grava."""
+        with self._lock:
+            if self._conn is None:
+                self._conn = obter_banco(self.caminho_banco).nova_conexao()
+                self._conn.execute("PRAGMA query_only=1")
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _em_cache(self, chave, calcular):
+        return self.cache.obter(chave, calcular, versao=self.versao_banco())
+
+    # ================================
+    # 📋 SINAIS
+    # ================================
+
+    def opcoes_sinais(self) -> dict:
+        """Símbolos, status e datas existentes, para montar os filtros."""
+        def calcular():
+            conn = obter_banco(self.caminho_banco).conexao()
+            simbolos = [s for (s,) in conn.execute("SELECT DISTINCT simbolo FROM sinais ORDER BY simbolo")]
+            status = [s for (s,) in conn.execute("SELECT DISTINCT status FROM sinais ORDER BY status") if s]
+            primeiro, ultimo = conn.execute("SELECT MIN(timestamp), MAX(timestamp) FROM sinais").fetchone()
+            return {
+                'simbolos': simbolos,
+                'status': status,
+                'data_min': datetime.fromisoformat(primeiro).date() if primeiro else None,
+                'data_max': datetime.fromisoformat(ultimo).date() if ultimo else None,
+            }
+        return self._em_cache(('opcoes_sinais',), calcular)
+
+    def sinais(self, filtro: FiltroSinais = FiltroSinais()) -> pd.DataFrame:
+        """Uma página de sinais, mais recentes primeiro, com `timestamp` e `candle_servidor` já convertidos."""
+        where, parametros = filtro.clausulas()
+
+        def calcular():
+            df = self._consultar(
+                f"SELECT * FROM sinais {where} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                parametros + (filtro.por_pagina, filtro.pagina * filtro.por_pagina))
+            df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
+            # NaT nos sinais gravados antes da coluna existir
+            df['candle_servidor'] = pd.to_datetime(df['candle_servidor'], format='ISO8601')
+            return df
+        return self._em_cache(('sinais', filtro), calcular)
+
+    def contar_sinais(self, filtro: FiltroSinais = FiltroSinais()) -> int:
+        """Total de sinais que atendem ao filtro (a página não importa)."""
+        where, parametros = filtro.clausulas()
+        return self._em_cache(('contar_sinais', where, parametros), lambda: obter_banco(self.caminho_banco).consultar_um(
+            f"SELECT COUNT(*) FROM sinais {where}", parametros)[0])
+
+    # ================================
+    # 📊 ATIVOS E MÉTRICAS
+    # ================================
+
+    def ativos_observados(self) -> pd.DataFrame:
+        return self._em_cache(('ativos_observados',),
+                              lambda: self._consultar("SELECT * FROM ativos WHERE observando = 1"))
+
+    def metricas_recentes(self) -> tuple:
+        """(timestamp do último retrato, DataFrame do retrato) ou (None, DataFrame vazio)."""
+        def calcular():
+            ultimo = obter_banco(self.caminho_banco).consultar_um("SELECT MAX(timestamp) FROM metricas")[0]
+            if ultimo is None:
+                return None, pd.DataFrame()
+            return ultimo, self._consultar(
+                "SELECT tipo, nome, simbolo, amostras, p50, p95, max, valor FROM metricas WHERE timestamp = ?",
+                (ultimo,))
+        return self._em_cache(('metricas_recentes',), calcular)
+
+    # ================================
+    # 📈 CANDLES (ARQUIVO LOCAL)
+    # ================================
+
+    def _timeframe_base(self, simbolo: str, timeframe: int):
+        """O próprio timeframe, se arquivado; senão o maior arquivado que o divide."""
+        segundos = segundos_timeframe(timeframe)
+        candidatos = sorted((tf for tf in NOMES_TIMEFRAME if segundos % segundos_timeframe(tf) == 0),
+                            key=segundos_timeframe, reverse=True)
+        return next((tf for tf in candidatos if self.arquivo.intervalo(simbolo, tf) is not None), None)
+
+    def candles(self, simbolo: str, timeframe: int, n_barras: int = 100, fim=None) -> pd.DataFrame:
+        """
+        Os `n_barras` candles até `fim` (padrão: o último arquivado), lidos do
+        arquivo local ou reamostrados de um timeframe menor arquivado. Sem
+        candles, devolve um DataFrame vazio que ainda tem índice de tempo.
+        """
+        def calcular():
+            base = self._timeframe_base(simbolo, timeframe)
+            if base is None:
+                return _candles_vazio()
+            if base == timeframe:
+                barras = self.arquivo.ultimas(simbolo, timeframe, n_barras, fim)
+            else:
+                limite = fim if fim is not None else self.arquivo.intervalo(simbolo, base)[1]
+                inicio = pd.Timestamp(limite) - pd.Timedelta(seconds=n_barras * segundos_timeframe(timeframe))
+                barras = self.arquivo.ler_reamostrado(simbolo, base, timeframe, inicio, limite).ultimas(n_barras)
+            return barras.como_dataframe() if not barras.vazio else _candles_vazio()
+        # O arquivo não muda com o banco: aqui vale só o TTL
+        return self.cache.obter(('candles', simbolo, timeframe, n_barras, str(fim)), calcular)
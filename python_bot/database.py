@@ -0,0 +1,284 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from config import DB_PATH
+
+# Tabelas compartilhadas com os EAs (EA_Executor / EA_Manager leem o mesmo arquivo)
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ativos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    simbolo TEXT NOT NULL,
+    tipo TEXT,
+    descricao TEXT,
+    path TEXT,
+    spread REAL,
+    volume_ajustado REAL,
+    observando INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS sinais (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    simbolo TEXT NOT NULL,
+    direcao TEXT NOT NULL,
+    preco_entrada REAL,
+    sl REAL,
+    tp REAL,
+    status TEXT DEFAULT 'pendente',
+    ciclo TEXT,
+    adx REAL,
+    corpo_pct REAL,
+    lote REAL,
+    timestamp TEXT,
+    candle_servidor TEXT
+);
+
+-- Retratos periódicos de metrics.Metricas (aba Diagnóstico do painel)
+CREATE TABLE IF NOT EXISTS metricas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    simbolo TEXT,
+    amostras INTEGER,
+    p50 REAL,
+    p95 REAL,
+    max REAL,
+    valor REAL
+);
+
+-- Parâmetros da estratégia por ativo (optimizer.py grava; NULL = padrão do robô)
+CREATE TABLE IF NOT EXISTS configuracoes (
+    simbolo TEXT PRIMARY KEY,
+    lote REAL,
+    adx_min REAL,
+    engolfo_pct_max REAL,
+    distancia_vwap_max REAL,
+    grupo_candles INTEGER,
+    distancia_pivo REAL,
+    distancia_sl REAL,
+    relacao_risco_retorno REAL,
+    horario_inicio TEXT,
+    horario_fim TEXT,
+    ponto REAL,
+    origem TEXT,
+    atualizado_em TEXT
+);
+
+-- Versões lidas pelos consumidores antes de recarregar (versao_ativos: lista de observados)
+CREATE TABLE IF NOT EXISTS controle (
+    chave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL DEFAULT 0
+);
+
+-- Outbox dos sinais para o EA_Executor (signal_outbox.py): seq nunca é reutilizado
+CREATE TABLE IF NOT EXISTS outbox_sinais (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    sinal_id INTEGER NOT NULL,
+    simbolo TEXT NOT NULL,
+    direcao TEXT NOT NULL,
+    preco_entrada REAL,
+    sl REAL,
+    tp REAL,
+    lote REAL,
+    estado TEXT NOT NULL DEFAULT 'pendente',
+    consumidor TEXT,
+    publicado_em TEXT NOT NULL,
+    reivindicado_em TEXT
+);
+
+-- Última publicação por ativo: o EA compara com o último seq visto antes de qualquer outra consulta
+CREATE TABLE IF NOT EXISTS outbox_publicado (
+    simbolo TEXT PRIMARY KEY,
+    ultimo_seq INTEGER NOT NULL
+);
+
+-- A reivindicação no outbox marca o sinal como em execução na mesma instrução
+CREATE TRIGGER IF NOT EXISTS trg_outbox_reivindicado AFTER UPDATE OF estado ON outbox_sinais
+WHEN new.estado = 'reivindicado' AND old.estado = 'pendente'
+BEGIN
+    UPDATE sinais SET status = 'em_execucao' WHERE id = new.sinal_id;
+END;
+
+-- Qualquer escrita em configuracoes (otimizador, edição manual) avisa o SymbolManager
+CREATE TRIGGER IF NOT EXISTS trg_configuracoes_insercao AFTER INSERT ON configuracoes
+BEGIN
+    INSERT INTO controle (chave, valor) VALUES ('versao_configuracoes', 1)
+    ON CONFLICT (chave) DO UPDATE SET valor = valor + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_configuracoes_alteracao AFTER UPDATE ON configuracoes
+BEGIN
+    INSERT INTO controle (chave, valor) VALUES ('versao_configuracoes', 1)
+    ON CONFLICT (chave) DO UPDATE SET valor = valor + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_configuracoes_remocao AFTER DELETE ON configuracoes
+BEGIN
+    INSERT INTO controle (chave, valor) VALUES ('versao_configuracoes', 1)
+    ON CONFLICT (chave) DO UPDATE SET valor = valor + 1;
+END;
+
+-- Checagem de duplicidade (MarketAnalyst._sinal_repetido)
+CREATE INDEX IF NOT EXISTS idx_sinais_duplicidade ON sinais (simbolo, direcao, status, timestamp);
+-- Busca de sinais pendentes pelo EA_Executor e listagens do painel
+CREATE INDEX IF NOT EXISTS idx_sinais_status ON sinais (status, simbolo);
+CREATE INDEX IF NOT EXISTS idx_sinais_timestamp ON sinais (timestamp);
+-- Lista de observados (SymbolManager / EA_Manager)
+CREATE INDEX IF NOT EXISTS idx_ativos_observando ON ativos (observando, simbolo);
+CREATE INDEX IF NOT EXISTS idx_metricas_timestamp ON metricas (timestamp);
+-- Reivindicação (pendente mais antigo do ativo) e leitura de volta pelo consumidor
+CREATE INDEX IF NOT EXISTS idx_outbox_pendentes ON outbox_sinais (simbolo, estado, seq);
+CREATE INDEX IF NOT EXISTS idx_outbox_consumidor ON outbox_sinais (consumidor);
+"""
+
+
+# Colunas acrescentadas depois da criação da tabela: (tabela, coluna, tipo)
+COLUNAS_NOVAS = (
+    ('configuracoes', 'relacao_risco_retorno', 'REAL'),
+    ('sinais', 'candle_servidor', 'TEXT'),
+)
+
+# Horário local do PC no formato de datetime.now().isoformat(), para datas gravadas pelo próprio
+# SQL (EA_Executor, migrações): todas as colunas de data do banco seguem a mesma convenção
+AGORA_SQL = "strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')"
+
+VERSAO_ATIVOS = 'versao_ativos'
+VERSAO_CONFIGURACOES = 'versao_configuracoes'
+# 1 depois que os sinais pendentes de antes do outbox foram publicados nele
+OUTBOX_MIGRADO = 'outbox_migrado'
+
+
+def _migrar(conn: sqlite3.Connection):
+    for tabela, coluna, tipo in COLUNAS_NOVAS:
+        existentes = {linha[1] for linha in conn.execute(f"PRAGMA table_info({tabela})")}
+        if coluna not in existentes:
+            conn.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}")
+    _publicar_pendentes_antigos(conn)
+
+
+def _publicar_pendentes_antigos(conn: sqlite3.Connection):
+    """
+    Leva ao outbox os sinais ainda pendentes gravados antes dele existir, que o
+    EA_Executor (agora só lê o outbox) não veria. Roda uma vez por banco, numa
+    transação só, para dois processos subindo juntos não publicarem em dobro.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if ler_versao(conn, OUTBOX_MIGRADO) == 0:
+            conn.execute(f"""
+                INSERT INTO outbox_sinais (sinal_id, simbolo, direcao, preco_entrada, sl, tp, lote, publicado_em)
+                SELECT id, simbolo, direcao, preco_entrada, sl, tp, lote, {AGORA_SQL} FROM sinais
+                WHERE status = 'pendente' AND id NOT IN (SELECT sinal_id FROM outbox_sinais)
+                ORDER BY id
+            """)
+            conn.execute("""
+                INSERT INTO outbox_publicado (simbolo, ultimo_seq)
+                SELECT simbolo, MAX(seq) FROM outbox_sinais WHERE true GROUP BY simbolo
+                ON CONFLICT (simbolo) DO UPDATE SET ultimo_seq = MAX(ultimo_seq, excluded.ultimo_seq)
+            """)
+            incrementar_versao(conn, OUTBOX_MIGRADO)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def ler_versao(conn: sqlite3.Connection, chave: str) -> int:
+    linha = conn.execute("SELECT valor FROM controle WHERE chave = ?", (chave,)).fetchone()
+    return linha[0] if linha else 0
+
+
+def incrementar_versao(conn: sqlite3.Connection, chave: str) -> int:
+    """Incrementa o contador `chave`; chame dentro da transação que fez a mudança."""
+    return conn.execute("""
+        INSERT INTO controle (chave, valor) VALUES (?, 1)
+        ON CONFLICT (chave) DO UPDATE SET valor = valor + 1
+        RETURNING valor
+    """, (chave,)).fetchone()[0]
+
+
+class Database:
+    """
+    Acesso compartilhado ao banco SQLite do robô.
+
+    Cada thread (e cada processo do pool) mantém uma conexão própria e de longa
+    duração, em modo WAL: os EAs continuam lendo enquanto o Python grava, e o
+    cache de comandos preparados do sqlite3 evita recompilar as mesmas consultas.
+    As conexões ficam em autocommit; escritas em grupo usam `transacao()`.
+    """
+
+    def __init__(self, caminho: str = DB_PATH, timeout_ms: int = 5000):
+        self.caminho = caminho
+        self.timeout_ms = timeout_ms
+        self._local = threading.local()
+        self._esquema_pronto = False
+        self._lock = threading.Lock()
+
+    def _abrir(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.caminho, timeout=self.timeout_ms / 1000,
+                               isolation_level=None, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout_ms)}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def conexao(self) -> sqlite3.Connection:
+        local = self._local
+        # A verificação de pid descarta conexões herdadas por processos filhos (fork)
+        if getattr(local, 'conn', None) is None or local.pid != os.getpid():
+            local.conn = self._abrir()
+            local.pid = os.getpid()
+            if not self._esquema_pronto:
+                with self._lock:
+                    if not self._esquema_pronto:
+                        local.conn.executescript(ESQUEMA)
+                        _migrar(local.conn)
+                        self._esquema_pronto = True
+        return local.conn
+
+    def nova_conexao(self) -> sqlite3.Connection:
+        """Conexão avulsa, fora do cache por thread; o chamador é responsável por fechá-la."""
+        self.conexao()  # garante o esquema
+        return self._abrir()
+
+    @contextmanager
+    def transacao(self):
+        conn = self.conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def consultar(self, sql: str, parametros=()) -> list:
+        return self.conexao().execute(sql, parametros).fetchall()
+
+    def consultar_um(self, sql: str, parametros=()):
+        return self.conexao().execute(sql, parametros).fetchone()
+
+    def executar(self, sql: str, parametros=()) -> sqlite3.Cursor:
+        return self.conexao().execute(sql, parametros)
+
+    def executar_varios(self, sql: str, sequencia) -> sqlite3.Cursor:
+        return self.conexao().executemany(sql, sequencia)
+
+    def fechar(self):
+        """Fecha a conexão da thread atual."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+
+_bancos = {}
+_bancos_lock = threading.Lock()
+
+
+def obter_banco(caminho: str = DB_PATH) -> Database:
+    """Instância compartilhada por caminho de arquivo dentro do processo."""
+    with _bancos_lock:
+        if caminho not in _bancos:
+            _bancos[caminho] = Database(caminho)
+        return _bancos[caminho]
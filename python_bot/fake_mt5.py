@@ -0,0 +1,202 @@
+"""
+Substituto local do pacote MetaTrader5 para rodar o robô offline.
+
+Expõe o subconjunto da API usado pelo projeto (initialize, symbols_get,
+copy_rates_from_pos, ...) sobre candles sintéticos determinísticos. Os candles
+de qualquer timeframe são agregados a partir de um mesmo caminho de preços em
+M1, então M5, M30 e H1 são consistentes entre si como no terminal.
+
+Uso: `sys.modules['MetaTrader5'] = fake_mt5` antes de importar os módulos do robô,
+ou injetar o módulo diretamente onde houver parâmetro `mt5_modulo`.
+"""
+from collections import Counter, namedtuple
+from datetime import datetime, timezone
+import numpy as np
+
+from timeframes import (
+    TIMEFRAME_M1, TIMEFRAME_M5, TIMEFRAME_M15, TIMEFRAME_M30,
+    TIMEFRAME_H1, TIMEFRAME_H4, TIMEFRAME_D1, segundos_timeframe,
+)
+
+SymbolInfo = namedtuple('SymbolInfo', 'name description path spread visible time point digits')
+Tick = namedtuple('Tick', 'time bid ask last volume')
+
+DTYPE_RATES = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+])
+
+SIMBOLOS_PADRAO = [
+    ('EURUSD', 'Euro vs US Dollar', 'Forex\\Majors\\EURUSD', 12, 1.10, 0.00001),
+    ('GBPUSD', 'Pound vs US Dollar', 'Forex\\Majors\\GBPUSD', 15, 1.27, 0.00001),
+    ('USDJPY', 'US Dollar vs Yen', 'Forex\\Majors\\USDJPY', 14, 150.0, 0.001),
+    ('US500', 'S&P 500 Index', 'Indices\\US500', 40, 5000.0, 0.01),
+    ('BTCUSD', 'Bitcoin vs US Dollar', 'Crypto\\BTCUSD', 30, 60000.0, 0.01),
+    ('AAPL', 'Apple Inc', 'Stocks\\USA\\NASDAQ\\AAPL', 20, 190.0, 0.01),
+]
+
+
+class _Estado:
+    def __init__(self):
+        self.configurar()
+
+    def configurar(self, simbolos=None, agora=None, dias_historico: int = 30, seed: int = 42):
+        self.simbolos = {}
+        self.agora = int(agora if agora is not None
+                         else datetime(2025, 1, 6, 12, 0, tzinfo=timezone.utc).timestamp())
+        self.inicio = (self.agora - dias_historico * 86400) // 86400 * 86400
+        self.seed = seed
+        self.latencia = 0.0
+        self.chamadas = Counter()
+        self.inicializado = False
+        for nome, descricao, path, spread, preco, ponto in (simbolos or SIMBOLOS_PADRAO):
+            self.simbolos[nome] = {
+                'info': (nome, descricao, path, spread, ponto),
+                'preco': preco,
+                'rng': np.random.default_rng([seed, sum(map(ord, nome))]),
+                'close': np.empty(0),
+                'high': np.empty(0),
+                'low': np.empty(0),
+                'volume': np.empty(0, dtype=np.uint64),
+            }
+
+    def _garantir_m1(self, nome: str, n_minutos: int):
+        # Estende o caminho de preços em M1 de forma determinística até n_minutos
+        s = self.simbolos[nome]
+        faltam = n_minutos - len(s['close'])
+        if faltam <= 0:
+            return
+        rng = s['rng']
+        ultimo = s['close'][-1] if len(s['close']) else s['preco']
+        retornos = rng.normal(0, 0.0004, faltam)
+        close = ultimo * np.exp(np.cumsum(retornos))
+        abertura = np.concatenate(([ultimo], close[:-1]))
+        amplitude = np.abs(rng.normal(0, 0.0003, faltam)) * close
+        s['close'] = np.concatenate((s['close'], close))
+        s['high'] = np.concatenate((s['high'], np.maximum(abertura, close) + amplitude))
+        s['low'] = np.concatenate((s['low'], np.minimum(abertura, close) - amplitude))
+        s['volume'] = np.concatenate((s['volume'], rng.integers(1, 60, faltam).astype(np.uint64)))
+
+    def barras(self, nome: str, timeframe: int, inicio_pos: int, quantidade: int):
+        segundos = segundos_timeframe(timeframe)
+        ultimo_balde = self.agora // segundos * segundos
+        primeiro_balde = max(ultimo_balde - (inicio_pos + quantidade - 1) * segundos,
+                             -(-self.inicio // segundos) * segundos)
+        ultimo_balde -= inicio_pos * segundos
+        if primeiro_balde > ultimo_balde:
+            return np.empty(0, dtype=DTYPE_RATES)
+
+        minuto_ini = (primeiro_balde - self.inicio) // 60
+        minuto_fim = (self.agora - self.inicio) // 60 + 1
+        if inicio_pos:
+            minuto_fim = min(minuto_fim, (ultimo_balde + segundos - self.inicio) // 60)
+        self._garantir_m1(nome, minuto_fim)
+        s = self.simbolos[nome]
+
+        tempos_m1 = self.inicio + np.arange(minuto_ini, minuto_fim) * 60
+        baldes = tempos_m1 // segundos * segundos
+        cortes = np.flatnonzero(np.r_[True, baldes[1:] != baldes[:-1]])
+        fatia = slice(minuto_ini, minuto_fim)
+        close = s['close'][fatia]
+        abertura = np.concatenate(([s['close'][minuto_ini - 1] if minuto_ini else s['preco']], close[:-1]))
+
+        rates = np.zeros(len(cortes), dtype=DTYPE_RATES)
+        rates['time'] = baldes[cortes]
+        rates['open'] = abertura[cortes]
+        rates['high'] = np.maximum.reduceat(s['high'][fatia], cortes)
+        rates['low'] = np.minimum.reduceat(s['low'][fatia], cortes)
+        rates['close'] = close[np.r_[cortes[1:] - 1, len(close) - 1]]
+        rates['tick_volume'] = np.add.reduceat(s['volume'][fatia], cortes)
+        rates['spread'] = s['info'][3]
+        return rates
+
+
+_estado = _Estado()
+
+
+# ================================
+# 🎛️ CONTROLE DA SIMULAÇÃO
+# ================================
+
+def configurar(simbolos=None, agora=None, dias_historico: int = 30, seed: int = 42):
+    """Reinicia a simulação. `simbolos`: tuplas (nome, descrição, path, spread, preço, ponto)."""
+    _estado.configurar(simbolos, agora, dias_historico, seed)
+
+
+def avancar(segundos: int):
+    """Avança o relógio simulado; novos candles passam a existir a partir dele."""
+    _estado.agora += int(segundos)
+
+
+def definir_latencia(segundos: float):
+    """Latência artificial por chamada, para testes de carga."""
+    _estado.latencia = segundos
+
+
+def agora() -> int:
+    return _estado.agora
+
+
+def chamadas() -> Counter:
+    return _estado.chamadas
+
+
+def _registrar(nome: str):
+    _estado.chamadas[nome] += 1
+    if _estado.latencia:
+        import time
+        time.sleep(_estado.latencia)
+
+
+# ================================
+# 🔌 API COMPATÍVEL COM MetaTrader5
+# ================================
+
+def initialize(*args, **kwargs) -> bool:
+    _registrar('initialize')
+    _estado.inicializado = True
+    return True
+
+
+def shutdown():
+    _registrar('shutdown')
+    _estado.inicializado = False
+
+
+def last_error():
+    return (1, 'Success')
+
+
+def symbols_get(group: str = None):
+    _registrar('symbols_get')
+    return tuple(symbol_info(nome) for nome in _estado.simbolos)
+
+
+def symbol_info(simbolo: str):
+    if simbolo not in _estado.simbolos:
+        return None
+    nome, descricao, path, spread, ponto = _estado.simbolos[simbolo]['info']
+    digitos = max(0, int(round(-np.log10(ponto))))
+    return SymbolInfo(nome, descricao, path, spread, True, _estado.agora, ponto, digitos)
+
+
+def symbol_select(simbolo: str, enable: bool = True) -> bool:
+    _registrar('symbol_select')
+    return simbolo in _estado.simbolos
+
+
+def symbol_info_tick(simbolo: str):
+    _registrar('symbol_info_tick')
+    rates = _estado.barras(simbolo, TIMEFRAME_M1, 0, 1) if simbolo in _estado.simbolos else []
+    if len(rates) == 0:
+        return None
+    preco = float(rates['close'][-1])
+    ponto = _estado.simbolos[simbolo]['info'][4]
+    return Tick(_estado.agora, preco, preco + _estado.simbolos[simbolo]['info'][3] * ponto, 0.0, 0)
+
+
+def copy_rates_from_pos(simbolo: str, timeframe: int, start_pos: int, count: int):
+    _registrar('copy_rates_from_pos')
+    if simbolo not in _estado.simbolos or count <= 0:
+        return None
+    return _estado.barras(simbolo, timeframe, start_pos, count)
@@ -1,98 +1,188 @@
 import pandas as pd 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 class IndicatorCalculator:
 
     @staticmethod
-    def calcular_vwap(df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
+    def _volume_efetivo(df: pd.DataFrame) -> np.ndarray:
+        # Usa tick_volume e, quando zerado, cai para a coluna volume (ou 0)
+        tick_volume = df['tick_volume'].to_numpy(dtype=float)
+        if 'volume' in df.columns:
+            volume = df['volume'].to_numpy(dtype=float)
+        else:
+            volume = np.zeros(len(df))
+        return np.where(tick_volume > 0, tick_volume, volume)
+
+    @staticmethod
+    def _inicios_sessao(chaves: np.ndarray) -> np.ndarray:
+        """Posições onde `chaves` muda de valor (a primeira sempre inicia uma sessão)."""
+        mudou = np.empty(len(chaves), dtype=bool)
+        mudou[0] = True
+        np.not_equal(chaves[1:], chaves[:-1], out=mudou[1:])
+        return np.flatnonzero(mudou)
+
+    @staticmethod
+    def _vwap_por_inicios(tpv: np.ndarray, vol: np.ndarray, inicios: np.ndarray) -> np.ndarray:
+        # Somas reiniciadas a cada sessão, na mesma ordem do laço original: resultado idêntico,
+        # sem erro que cresça com o histórico
+        fins = np.append(inicios[1:], len(tpv))
+        soma_tpv = np.empty(len(tpv))
+        soma_vol = np.empty(len(vol))
+        for inicio, fim in zip(inicios, fins):
+            np.cumsum(tpv[inicio:fim], out=soma_tpv[inicio:fim])
+            np.cumsum(vol[inicio:fim], out=soma_vol[inicio:fim])
+        vwap = np.full(len(tpv), np.nan)
+        np.divide(soma_tpv, soma_vol, out=vwap, where=soma_vol > 0)
+        return vwap
+
+    @staticmethod
+    def _vwap_por_sessao(tpv: np.ndarray, vol: np.ndarray, chaves: np.ndarray) -> np.ndarray:
+        return IndicatorCalculator._vwap_por_inicios(tpv, vol, IndicatorCalculator._inicios_sessao(chaves))
+
+    @staticmethod
+    def vwap_arrays(tempo: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                    volume: np.ndarray) -> dict:
+        """VWAP diária e semanal sobre arrays (`tempo` em segundos), sem DataFrame."""
+        if len(tempo) == 0:
+            return {'vwap_diaria': np.empty(0), 'vwap_semanal': np.empty(0)}
+        tpv = (high + low + close) / 3 * volume
+        return IndicatorCalculator._vwap_diaria_semanal(tempo, tpv, volume)
+
+    @staticmethod
+    def _vwap_diaria_semanal(tempo: np.ndarray, tpv: np.ndarray, volume: np.ndarray) -> dict:
+        inicios_dia = IndicatorCalculator._inicios_sessao(tempo // 86400)
+        # Toda semana começa num dia novo: basta olhar o primeiro candle de cada dia.
+        # 1970-01-01 foi uma quinta-feira; semanas começam na segunda (período 'W')
+        dias = tempo[inicios_dia] // 86400
+        inicios_semana = inicios_dia[IndicatorCalculator._inicios_sessao(dias - (dias + 3) % 7)]
+
+        return {
+            'vwap_diaria': IndicatorCalculator._vwap_por_inicios(tpv, volume, inicios_dia),
+            'vwap_semanal': IndicatorCalculator._vwap_por_inicios(tpv, volume, inicios_semana),
+        }
+
+    @staticmethod
+    def vwap_barras(barras) -> dict:
+        return IndicatorCalculator.vwap_arrays(barras.tempo, barras.high, barras.low, barras.close, barras.volume)
+
+    @staticmethod
+    def calcular_vwap(df: pd.DataFrame, mensal: bool = False, ancoras=None) -> pd.DataFrame:
+        colunas = [c for c in ('high', 'low', 'close', 'tick_volume', 'volume') if c in df.columns]
 
         if 'time' in df.columns:
-            df['time'] = pd.to_datetime(df['time'])
-            df.set_index('time', inplace=True)
+            df = df[colunas].set_index(pd.DatetimeIndex(pd.to_datetime(df['time']), name='time'))
         elif not isinstance(df.index, pd.DatetimeIndex):
             raise ValueError("O DataFrame precisa ter um índice ou coluna datetime.")
+        else:
+            df = df[colunas]
+
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+
+        if len(df) == 0:
+            return pd.DataFrame({'vwap_diaria': pd.Series(dtype=float), 'vwap_semanal': pd.Series(dtype=float)},
+                                index=df.index)
+
+        tempos = df.index.tz_localize(None) if df.index.tz is not None else df.index
+        segundos = tempos.values.astype('datetime64[s]').astype(np.int64)
+        vol = IndicatorCalculator._volume_efetivo(df)
+        tp = (df['high'].to_numpy(dtype=float) + df['low'].to_numpy(dtype=float)
+              + df['close'].to_numpy(dtype=float)) / 3
+        tpv = tp * vol
+        colunas_vwap = IndicatorCalculator._vwap_diaria_semanal(segundos, tpv, vol)
+
+        if mensal:
+            meses = tempos.values.astype('datetime64[M]').astype(np.int64)
+            colunas_vwap['vwap_mensal'] = IndicatorCalculator._vwap_por_sessao(tpv, vol, meses)
+
+        if ancoras is not None:
+            # VWAP ancorada: reinicia a cada âncora informada; antes da primeira fica NaN
+            marcos = np.sort(pd.DatetimeIndex(ancoras).values.astype('datetime64[ns]'))
+            sessoes = np.searchsorted(marcos, tempos.values.astype('datetime64[ns]'), side='right')
+            ancorada = IndicatorCalculator._vwap_por_sessao(tpv, vol, sessoes)
+            ancorada[sessoes == 0] = np.nan
+            colunas_vwap['vwap_ancorada'] = ancorada
+
+        return pd.DataFrame(colunas_vwap, index=df.index)
 
-        df = df.sort_index()
-
-        df['tp'] = (df['high'] + df['low'] + df['close']) / 3
-        df['data'] = df.index.date
-        df['semana'] = df.index.to_series().dt.to_period('W').apply(lambda p: p.start_time.date())
+    @staticmethod
+    def _indices_pivos(high: np.ndarray, low: np.ndarray, grupo_candles: int, distancia_minima: float):
+        n = grupo_candles
+        total = len(high)
+        if n < 1 or total < 2 * n + 1:
+            vazio = np.empty(0, dtype=np.intp)
+            return vazio, vazio
 
-        df['vwap_diaria'] = np.nan
-        df['vwap_semanal'] = np.nan
+        # Extremos de cada janela [i - n, i + n] centrada nos candles i = n .. total - n - 1
+        maximos = sliding_window_view(high, 2 * n + 1).max(axis=1)
+        minimos = sliding_window_view(low, 2 * n + 1).min(axis=1)
 
-        soma_tpv_dia = 0
-        soma_vol_dia = 0
-        dia_atual = None
+        centro = slice(n, total - n)
+        anterior = slice(n - 1, total - n - 1)
+        proximo = slice(n + 1, total - n + 1)
 
-        soma_tpv_semana = 0
-        soma_vol_semana = 0
-        semana_atual = None
+        eh_topo = (high[centro] == maximos) & (
+            high[centro] - np.maximum(high[anterior], high[proximo]) >= distancia_minima)
+        eh_fundo = (low[centro] == minimos) & (
+            np.minimum(low[anterior], low[proximo]) - low[centro] >= distancia_minima)
 
-        for i, row in df.iterrows():
-            vol = row['tick_volume'] if row['tick_volume'] > 0 else row.get('volume', 0)
+        return np.flatnonzero(eh_topo) + n, np.flatnonzero(eh_fundo) + n
 
-            if dia_atual != row['data']:
-                soma_tpv_dia = 0
-                soma_vol_dia = 0
-                dia_atual = row['data']
+    @staticmethod
+    def detectar_pivos(df: pd.DataFrame, janela: int = None, grupo_candles: int = 3, distancia_minima: float = 0.001,
+                       retornar_indices: bool = False):
+        if janela is not None:
+            df = df.tail(janela)
 
-            if semana_atual != row['semana']:
-                soma_tpv_semana = 0
-                soma_vol_semana = 0
-                semana_atual = row['semana']
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+        idx_topos, idx_fundos = IndicatorCalculator._indices_pivos(high, low, grupo_candles, distancia_minima)
 
-            tpv = row['tp'] * vol
-            soma_tpv_dia += tpv
-            soma_vol_dia += vol
-            df.at[i, 'vwap_diaria'] = soma_tpv_dia / soma_vol_dia if soma_vol_dia > 0 else np.nan
+        if retornar_indices:
+            return idx_topos, idx_fundos
 
-            soma_tpv_semana += tpv
-            soma_vol_semana += vol
-            df.at[i, 'vwap_semanal'] = soma_tpv_semana / soma_vol_semana if soma_vol_semana > 0 else np.nan
+        topos = list(zip(df.index[idx_topos], high[idx_topos]))
+        fundos = list(zip(df.index[idx_fundos], low[idx_fundos]))
+        return topos, fundos
 
-        return df[['vwap_diaria', 'vwap_semanal']]
-    
     @staticmethod
-    def detectar_pivos(df: pd.DataFrame, janela: int = 500, grupo_candles: int = 3, distancia_minima: float = 0.001):
-        df = df.tail(janela).copy()
-        topos, fundos = [], []
-        n = grupo_candles
-
-        for i in range(n, len(df) - n):
-            segmento = df.iloc[i - n:i + n + 1]
-            centro = df.iloc[i]
+    def _soma_movel(valores: np.ndarray, periodo: int) -> np.ndarray:
+        # Soma de cada janela completa (NaN antes disso ou com NaN na janela), como rolling().sum()
+        soma = np.full(len(valores), np.nan)
+        if len(valores) >= periodo:
+            soma[periodo - 1:] = sliding_window_view(valores, periodo).sum(axis=1)
+        return soma
 
-            if centro['high'] == segmento['high'].max():
-                anterior = df.iloc[i - 1]['high']
-                proximo = df.iloc[i + 1]['high']
-                if centro['high'] - max(anterior, proximo) >= distancia_minima:
-                    topos.append((df.index[i], centro['high']))
+    @staticmethod
+    def adx_arrays(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> tuple:
+        """(+DI, -DI, ADX) sobre arrays, com as mesmas médias simples de calcular_adx."""
+        high = np.asarray(high, dtype=float)
+        low = np.asarray(low, dtype=float)
+        close = np.asarray(close, dtype=float)
+        high_ant = np.r_[np.nan, high[:-1]]
+        low_ant = np.r_[np.nan, low[:-1]]
+        close_ant = np.r_[np.nan, close[:-1]]
+
+        tr = np.maximum(high - low, np.maximum(np.abs(high - close_ant), np.abs(low - close_ant)))
+        subida = high - high_ant
+        descida = low_ant - low
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mais_dm = np.where(subida > descida, np.maximum(subida, 0), 0)
+            menos_dm = np.where(descida > subida, np.maximum(descida, 0), 0)
+
+            tr_suave = IndicatorCalculator._soma_movel(tr, period)
+            mais_di = 100 * (IndicatorCalculator._soma_movel(mais_dm, period) / tr_suave)
+            menos_di = 100 * (IndicatorCalculator._soma_movel(menos_dm, period) / tr_suave)
+            dx = 100 * (np.abs(mais_di - menos_di) / (mais_di + menos_di))
+        adx = IndicatorCalculator._soma_movel(dx, period) / period
+        return mais_di, menos_di, adx
 
-            if centro['low'] == segmento['low'].min():
-                anterior = df.iloc[i - 1]['low']
-                proximo = df.iloc[i + 1]['low']
-                if min(anterior, proximo) - centro['low'] >= distancia_minima:
-                    fundos.append((df.index[i], centro['low']))
+    @staticmethod
+    def adx_barras(barras, period: int = 14) -> tuple:
+        return IndicatorCalculator.adx_arrays(barras.high, barras.low, barras.close, period)
 
-        return topos, fundos
-    
     @staticmethod
     def calcular_adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
-        df = df.copy()
-        df['TR'] = np.maximum(df['high'] - df['low'],
-                              np.maximum(abs(df['high'] - df['close'].shift(1)), abs(df['low'] - df['close'].shift(1))))
-
-        df['+DM'] = np.where((df['high'] - df['high'].shift(1)) > (df['low'].shift(1) - df['low']),
-                             np.maximum(df['high'] - df['high'].shift(1), 0), 0)
-        df['-DM'] = np.where((df['low'].shift(1) - df['low']) > (df['high'] - df['high'].shift(1)),
-                             np.maximum(df['low'].shift(1) - df['low'], 0), 0)
-
-        df['TR_smooth'] = df['TR'].rolling(window=period).sum()
-        df['+DI'] = 100 * (df['+DM'].rolling(window=period).sum() / df['TR_smooth'])
-        df['-DI'] = 100 * (df['-DM'].rolling(window=period).sum() / df['TR_smooth'])
-        df['DX'] = 100 * (abs(df['+DI'] - df['-DI']) / (df['+DI'] + df['-DI']))
-        df['ADX'] = df['DX'].rolling(window=period).mean()
-
-        return df[['+DI', '-DI', 'ADX']]
\ No newline at end of file
+        mais_di, menos_di, adx = IndicatorCalculator.adx_arrays(df['high'], df['low'], df['close'], period)
+        return pd.DataFrame({'+DI': mais_di, '-DI': menos_di, 'ADX': adx}, index=df.index)
@@ -1,33 +1,162 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
+from config import LOG_JSON
+
+# Símbolo em análise na thread/tarefa atual, anexado a cada registro de log
+_simbolo_atual = contextvars.ContextVar("simbolo_atual", default=None)
+
+
+class _FiltroContexto(logging.Filter):
+    def filter(self, record):
+        record.simbolo = _simbolo_atual.get()
+        return True
+
+
+class _ArquivoDiario(logging.FileHandler):
+    """Arquivo `logs/<nome_base>_<AAAA-MM-DD><extensao>`, trocado na virada do dia."""
+
+    def __init__(self, nome_base: str, extensao: str = ".log"):
+        self.nome_base = nome_base
+        self.extensao = extensao
+        self.data = datetime.now().strftime("%Y-%m-%d")
+        super().__init__(self._caminho(), encoding='utf-8')
+
+    def _caminho(self) -> str:
+        return f"logs/{self.nome_base}_{self.data}{self.extensao}"
+
+    def emit(self, record):
+        data = datetime.fromtimestamp(record.created).strftime("%Y-%m-%d")
+        if data != self.data:
+            self.data = data
+            self.acquire()
+            try:
+                if self.stream is not None:
+                    self.stream.close()
+                    self.stream = None
+                self.baseFilename = os.path.abspath(self._caminho())
+            finally:
+                self.release()
+        super().emit(record)
+
+
+class _FormatadorJson(logging.Formatter):
+    def format(self, record):
+        return json.dumps({
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'simbolo': getattr(record, 'simbolo', None),
+            'thread': record.threadName,
+            'mensagem': record.getMessage(),
+        }, ensure_ascii=False)
+
+
+class _HandlerFila(logging.handlers.QueueHandler):
+    """
+    Enfileira sem bloquear; com a fila cheia o registro é descartado e contado.
+    Em processos filhos (pool de processos) não há listener, então grava direto.
+    """
+
+    def __init__(self, fila, destinos):
+        super().__init__(fila)
+        self.destinos = destinos
+        self.pid = os.getpid()
+        self.enfileirados = 0
+        self.descartados = 0
+
+    def emit(self, record):
+        if os.getpid() != self.pid:
+            for destino in self.destinos:
+                destino.handle(record)
+            return
+        try:
+            self.queue.put_nowait(self.prepare(record))
+            self.enfileirados += 1
+        except queue.Full:
+            self.descartados += 1
+
+
 class Logger:
+    _handler = None
+    _listener = None
+    _lock = threading.Lock()
+
     @staticmethod
-    def configurar(nome_base: str = "trader"):
-        if not os.path.exists("logs"):
-            os.makedirs("logs")
+    def configurar(nome_base: str = "trader", json_saida: bool = LOG_JSON, tamanho_fila: int = 10000):
+        # Configura uma única vez por processo; chamadas seguintes (imports) não fazem nada
+        with Logger._lock:
+            if Logger._handler is not None and Logger._handler.pid == os.getpid():
+                return
+
+            if not os.path.exists("logs"):
+                os.makedirs("logs")
+
+            arquivo = _ArquivoDiario(nome_base)
+            arquivo.setFormatter(logging.Formatter(
+                fmt="%(asctime)s [%(levelname)s] %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S"
+            ))
+            destinos = [arquivo]
+            if json_saida:
+                arquivo_json = _ArquivoDiario(nome_base, ".jsonl")
+                arquivo_json.setFormatter(_FormatadorJson())
+                destinos.append(arquivo_json)
+
+            handler = _HandlerFila(queue.Queue(maxsize=tamanho_fila), destinos)
+            handler.addFilter(_FiltroContexto())
 
-        data_hoje = datetime.now().strftime("%Y-%m-%d")
-        nome_arquivo = f"logs/{nome_base}_{data_hoje}.log"
+            logger = logging.getLogger()
+            logger.setLevel(logging.INFO)
+            # Remove handlers antigos para evitar duplicidade
+            for antigo in logger.handlers[:]:
+                logger.removeHandler(antigo)
+            logger.addHandler(handler)
 
-        # Cria logger manualmente
-        logger = logging.getLogger()
-        logger.setLevel(logging.INFO)
+            # A escrita em disco acontece na thread do listener, fora do loop de avaliação
+            listener = logging.handlers.QueueListener(handler.queue, *destinos)
+            listener.start()
+            Logger._handler, Logger._listener = handler, listener
+            atexit.register(Logger.encerrar)
 
-        # Remove handlers antigos para evitar duplicidade
-        for handler in logger.handlers[:]:
-            logger.removeHandler(handler)
+    @staticmethod
+    def encerrar():
+        """Esvazia a fila e fecha os arquivos."""
+        with Logger._lock:
+            if Logger._listener is not None and Logger._handler.pid == os.getpid():
+                Logger._listener.stop()
+                for destino in Logger._handler.destinos:
+                    destino.close()
+            Logger._listener = None
+            Logger._handler = None
+
+    @staticmethod
+    @contextmanager
+    def contexto(simbolo: str):
+        token = _simbolo_atual.set(simbolo)
+        try:
+            yield
+        finally:
+            _simbolo_atual.reset(token)
+
+    @staticmethod
+    def estatisticas() -> dict:
+        handler = Logger._handler
+        if handler is None:
+            return {'enfileirados': 0, 'descartados': 0, 'na_fila': 0}
+        return {
+            'enfileirados': handler.enfileirados,
+            'descartados': handler.descartados,
+            'na_fila': handler.queue.qsize(),
+        }
 
-        # Cria handler com codificação UTF-8
-        handler = logging.FileHandler(nome_arquivo, encoding='utf-8')
-        formatter = logging.Formatter(
-            fmt="%(asctime)s [%(levelname)s] %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S"
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-    
     @staticmethod
     def info(msg: str):
         logging.info(msg)
@@ -42,10 +171,18 @@ class Logger:
 
     @staticmethod
     def registrar_sinal_processado(sinal: dict, status: str):
+        Logger.registrar_sinais_processados([sinal], status)
+
+    @staticmethod
+    def registrar_sinais_processados(sinais: list, status: str = None):
+        # Um único open/append por lote; sem status explícito usa o de cada sinal
         if not os.path.exists("logs"):
             os.makedirs("logs")
 
         caminho = "logs/sinais_processados.log"
+        agora = datetime.now().isoformat()
         with open(caminho, "a", encoding="utf-8") as f:
-            linha = f"{datetime.now().isoformat()},{sinal['simbolo']},{sinal['direcao']},{sinal['preco_entrada']},{sinal['sl']},{sinal['tp']},{status}\n"
-            f.write(linha)
+            f.writelines(
+                f"{agora},{sinal['simbolo']},{sinal['direcao']},{sinal['preco_entrada']},{sinal['sl']},{sinal['tp']},{status or sinal['status']}\n"
+                for sinal in sinais
+            )
@@ -1,12 +1,20 @@
+import threading
 import time
 from datetime import datetime, timedelta
-import MetaTrader5 as mt5
-import pandas as pd
 
-from symbol_manager import SymbolManager
-from strategy import MarketAnalyst
+from symbol_manager import symbol_manager
 from market_scanner import MarketScanner, ScannerConfig
+from parallel_executor import (ExecutorEstrategias, ResultadoAnalise, TarefaAnalise, ciclo_derivado,
+                               quantidade_base)
+from scheduler import AgendadorFechamentos
+from signal_index import IndiceSinais
+from signal_sink import GravadorSinais
 from logger import Logger
+from bar_cache import cache_barras
+from mt5_gateway import gateway_mt5 as mt5
+from config import ARQUIVAR_CANDLES
+from bars import Barras
+from metrics import metricas
 
 Logger.configurar()
 
@@ -20,23 +28,50 @@ QTD_CRYPTO  = 5
 QTD_ACOES  = 0
 SPREAD_MAX  = 50
 INTERVALO_SCANNER = timedelta(hours=1)
-INTERVALO_ESTRATEGIA = timedelta(minutes=2)
+CARENCIA_FECHAMENTO = 2.0     # segundos após o fechamento do candle antes de avaliar
 N_CANDLES_ANALISE = 300
 N_CANDLES_CICLO = 500
+MODO_EXECUCAO = "serial"      # "serial", "thread" ou "process"
+MAX_WORKERS = None            # None = padrão do pool (nº de CPUs)
+
+# Timeframe de ciclo, indicadores e pivôs de cada ativo ficam com o executor (parallel_executor.EstadoAtivo)
+executor_estrategias = ExecutorEstrategias(MODO_EXECUCAO, MAX_WORKERS)
+agendador = AgendadorFechamentos(CARENCIA_FECHAMENTO)
+indice_sinais = IndiceSinais()
+gravador_sinais = GravadorSinais(indice_sinais=indice_sinais)
 
 # ================================
 # 📥 OBTENÇÃO DE DADOS
 # ================================
 
-def obter_candles(simbolo: str, timeframe: int, n_barras: int) -> pd.DataFrame:
-    mt5.initialize()
-    rates = mt5.copy_rates_from_pos(simbolo, timeframe, 0, n_barras)
-    if rates is None or len(rates) == 0:
-        return pd.DataFrame()
-    df = pd.DataFrame(rates)
-    df['time'] = pd.to_datetime(df['time'], unit='s')
-    df.set_index('time', inplace=True)
-    return df
+def obter_candles(simbolo: str, timeframe: int, n_barras: int) -> Barras:
+    # Busca incremental: só os candles novos desde a última chamada vão ao terminal.
+    # Barras são visões do array do MT5 em cache, sem DataFrame no caminho quente.
+    return cache_barras.obter_barras(simbolo, timeframe, n_barras)
+
+
+def ate_fechamento(barras: Barras, fechamento: int = None) -> Barras:
+    """Candles abertos antes de `fechamento` (horário do servidor): descarta o que acabou de abrir."""
+    if fechamento is None:
+        return barras
+    return barras[:barras.posicao(fechamento)]
+
+
+def obter_candles_com_ciclo(config, fechamento: int = None) -> tuple:
+    """
+    Candles principais e, quando o timeframe de ciclo não é múltiplo deles, os de
+    ciclo (senão None: ele é montado a partir dos principais onde o ativo é analisado).
+
+    Com `fechamento`, o último candle principal é o que acabou de fechar (como no
+    backtest) e o candle de ciclo em formação só contém candles até ele.
+    """
+    simbolo = config.simbolo
+    n_base = quantidade_base(config, N_CANDLES_ANALISE, N_CANDLES_CICLO)
+    barras = ate_fechamento(obter_candles(simbolo, config.timeframe, n_base), fechamento)
+    if ciclo_derivado(config):
+        return barras, None
+    return barras, ate_fechamento(obter_candles(simbolo, config.timeframe_ciclo, N_CANDLES_CICLO), fechamento)
+
 
 # ================================
 # 🔍 EXECUÇÃO DO MARKET SCANNER
@@ -52,49 +87,141 @@ def executar_market_scanner():
         spread_maximo=SPREAD_MAX
     )
     scanner = MarketScanner(config)
-    scanner.carregar_dados_mt5()
-    scanner.salvar_no_banco()
+    try:
+        scanner.carregar_dados_mt5()
+        scanner.salvar_no_banco()
+    except Exception as e:
+        Logger.erro(f"❌ Erro no Market Scanner: {e}")
     Logger.info("📊 Finalizando Market Scanner.")
 
+
+def iniciar_market_scanner_em_segundo_plano(thread_atual: threading.Thread = None) -> threading.Thread:
+    # Não sobrepõe varreduras: se a anterior ainda roda, mantém a mesma thread
+    if thread_atual is not None and thread_atual.is_alive():
+        Logger.aviso("⏳ Market Scanner anterior ainda em execução; nova varredura adiada.")
+        return thread_atual
+    thread = threading.Thread(target=executar_market_scanner, name="market-scanner", daemon=True)
+    thread.start()
+    return thread
+
 # ================================
 # 🤖 EXECUÇÃO DAS ESTRATÉGIAS
 # ================================
 
-def executar_estrategias():
+def preparar_tarefa(config, horario, fechamento: int = None) -> TarefaAnalise:
+    # Só a busca ao terminal; o resto da análise (e o arquivo local) roda no executor
+    simbolo = config.simbolo
+    Logger.info(f"🧠 Analisando ativo: {simbolo}")
+    with metricas.medir('coleta_candles', simbolo):
+        barras, barras_ciclo = obter_candles_com_ciclo(config, fechamento)
+
+    if barras.vazio:
+        raise ValueError("Dados insuficientes (candles principais)")
+    if barras_ciclo is not None and barras_ciclo.vazio:
+        raise ValueError("Dados insuficientes (candles de ciclo)")
+
+    return TarefaAnalise(config, barras, horario, barras_ciclo=barras_ciclo,
+                         fechamento=fechamento, arquivar=ARQUIVAR_CANDLES,
+                         n_candles_analise=N_CANDLES_ANALISE, n_candles_ciclo=N_CANDLES_CICLO,
+                         indice_sinais=indice_sinais, gravar_sinal=False)
+
+
+def carregar_ativos_observados() -> list:
+    # Uma consulta à tabela controle; ativos/configuracoes só são relidos quando mudam
+    if symbol_manager.atualizar():
+        Logger.info(f"🔄 Configurações recarregadas: {len(symbol_manager.simbolos)} ativos observados")
+    return symbol_manager.configuracoes()
+
+
+def sincronizar_relogio_servidor(ativos_config: list):
+    # O horário do tick é o do servidor; um ativo basta se estiver cotando
+    for config in ativos_config:
+        tick = mt5.symbol_info_tick(config.simbolo)
+        if tick is not None:
+            agendador.registrar_hora_servidor(tick.time)
+            return
+
+
+def executar_estrategias(ativos_config: list = None, fechamento: int = None):
     Logger.info("📈 Iniciando geração de sinais...")
+    inicio_ciclo = time.perf_counter()
 
-    symbol_manager = SymbolManager()
-    symbol_manager.carregar_do_banco()
-    ativos_config = list(symbol_manager.simbolos.values())
+    if ativos_config is None:
+        ativos_config = carregar_ativos_observados()
+    horario = datetime.now().time()
+    # Sinais gravados ou alterados por outras conexões (EAs, processos do pool) desde o último lote
+    with metricas.medir('sincronizar_indice_sinais'):
+        indice_sinais.sincronizar()
 
+    # Etapa 1 (série): só a coleta de candles. A conexão com o MT5 é única, então esta parte não vai para o pool.
+    tarefas, falhas_coleta = [], {}
     for config in ativos_config:
+        inicio = time.perf_counter()
         try:
-            simbolo = config.simbolo
-            Logger.info(f"🧠 Analisando ativo: {simbolo}")
+            with Logger.contexto(config.simbolo):
+                tarefa = preparar_tarefa(config, horario, fechamento)
+            tarefa.duracao_dados = time.perf_counter() - inicio
+            tarefas.append(tarefa)
+        except Exception as e:
+            falhas_coleta[config.simbolo] = ResultadoAnalise(
+                config.simbolo, erro=str(e), duracao_dados=time.perf_counter() - inicio)
 
-            df_principal = obter_candles(simbolo, config.timeframe, N_CANDLES_ANALISE)
-            df_ciclo = obter_candles(simbolo, config.timeframe_ciclo, N_CANDLES_CICLO)
+    # Etapa 2: ciclo, indicadores, pivôs e filtros por ativo (serial, threads ou processos)
+    with metricas.medir('analise_lote'):
+        analisados = {r.simbolo: r for r in executor_estrategias.executar(tarefas)}
 
-            if df_principal.empty:
-                Logger.aviso(f"⚠️ Dados insuficientes (candles principais) para {simbolo}")
-                continue
+    # Etapa 3: os sinais do lote vão ao banco numa única transação
+    for resultado in analisados.values():
+        if resultado.sinal:
+            gravador_sinais.adicionar(resultado.sinal)
+    with metricas.medir('gravacao_sinais'):
+        gravados = gravador_sinais.descarregar()
 
-            if df_ciclo.empty:
-                Logger.aviso(f"⚠️ Dados insuficientes (candles de ciclo) para {simbolo}")
-                continue
+    for config in ativos_config:
+        simbolo = config.simbolo
+        resultado = falhas_coleta.get(simbolo) or analisados[simbolo]
 
-            analista = MarketAnalyst(df_principal, df_ciclo, simbolo)
-            sinal = analista.gerar_sinal_detalhado(config, datetime.now().time())
+        metricas.registrar_etapas(resultado.etapas, simbolo)
+        if resultado.motivo_rejeicao:
+            metricas.incrementar(f"rejeicao_{resultado.motivo_rejeicao}", simbolo)
 
-            if sinal:
-                Logger.info(f"✅ Sinal gerado para {simbolo}: {sinal['direcao']} @ {sinal['preco_entrada']}")
-            else:
-                Logger.info(f"ℹ️ Nenhum sinal gerado para {simbolo}")
+        if resultado.erro:
+            metricas.incrementar("erro", simbolo)
+            Logger.erro(f"❌ Erro ao processar {simbolo}: {resultado.erro}")
+        elif resultado.sinal:
+            metricas.incrementar("sinal", simbolo)
+            Logger.info(f"✅ Sinal gerado para {simbolo}: {resultado.sinal['direcao']} @ {resultado.sinal['preco_entrada']}")
+            if fechamento is not None and gravados:
+                latencia = agendador.registrar_latencia(fechamento)
+                metricas.registrar_tempo('fechamento_ate_sinal', latencia, simbolo)
+                Logger.info(f"⏱️ {simbolo}: sinal gravado {latencia:.2f}s após o fechamento do candle")
+        else:
+            Logger.info(f"ℹ️ Nenhum sinal gerado para {simbolo}")
 
-        except Exception as e:
-            Logger.erro(f"❌ Erro ao processar {simbolo}: {e}")
+        Logger.info(f"⏱️ {simbolo}: dados {resultado.duracao_dados * 1000:.1f} ms | "
+                    f"análise {resultado.duracao_analise * 1000:.1f} ms")
 
-    Logger.info("🏁 Geração de sinais concluída.")
+    metricas.registrar_tempo('ciclo_estrategias', time.perf_counter() - inicio_ciclo)
+    estatisticas_logs = Logger.estatisticas()
+    metricas.definir('logs_na_fila', estatisticas_logs['na_fila'])
+    metricas.definir('logs_descartados', estatisticas_logs['descartados'])
+    metricas.definir('cache_candles_taxa_acerto', cache_barras.estatisticas()['taxa_acerto'])
+    estatisticas_mt5 = mt5.estatisticas()
+    metricas.definir('mt5_chamadas_terminal', estatisticas_mt5['chamadas_terminal'])
+    metricas.definir('mt5_pedidos_economizados', estatisticas_mt5['unidos'] + estatisticas_mt5['acertos_cache'])
+    try:
+        metricas.exportar()
+    except Exception as e:
+        Logger.erro(f"❌ Erro ao exportar métricas: {e}")
+
+    Logger.info(f"🏁 Geração de sinais concluída em {time.perf_counter() - inicio_ciclo:.2f}s "
+                f"({len(ativos_config)} ativos, modo {executor_estrategias.modo}). "
+                f"Cache de candles: {cache_barras.estatisticas()} | Gateway MT5: {estatisticas_mt5} | "
+                f"Logs: {Logger.estatisticas()}")
+    if gravados:
+        Logger.info(f"💾 Gravação de sinais: {gravador_sinais.estatisticas()}")
+    if fechamento is not None:
+        Logger.info(f"📏 Latência fechamento → sinal: {agendador.estatisticas()}")
 
 # ================================
 # 🚀 EXECUÇÃO PRINCIPAL
@@ -102,23 +229,41 @@ def executar_estrategias():
 
 if __name__ == "__main__":
 
-    proxima_execucao_scanner = datetime.now()
-    ultima_execucao_estrategia = datetime.now() - INTERVALO_ESTRATEGIA
+    if not mt5.initialize():
+        raise RuntimeError("Erro ao inicializar conexão com o MetaTrader 5")
+
+    # A primeira varredura é síncrona para a lista de observados existir no primeiro ciclo
+    executar_market_scanner()
+    thread_scanner = None
+    proxima_execucao_scanner = datetime.now() + INTERVALO_SCANNER
 
     try:
         while True:
-            agora = datetime.now()
+            if datetime.now() >= proxima_execucao_scanner:
+                thread_scanner = iniciar_market_scanner_em_segundo_plano(thread_scanner)
+                proxima_execucao_scanner = datetime.now() + INTERVALO_SCANNER
 
-            if agora >= proxima_execucao_scanner:
-                executar_market_scanner()
-                proxima_execucao_scanner = agora + INTERVALO_SCANNER
+            ativos_config = carregar_ativos_observados()
+            if not ativos_config:
+                time.sleep(5)
+                continue
 
-            if agora - ultima_execucao_estrategia >= INTERVALO_ESTRATEGIA:
-                executar_estrategias()
-                ultima_execucao_estrategia = agora
+            # Avalia logo após o fechamento do candle; ativos que fecham juntos formam um lote
+            sincronizar_relogio_servidor(ativos_config)
+            fechamento, simbolos = agendador.proximo_lote({c.simbolo: c.timeframe for c in ativos_config})
+            if not agendador.aguardar(fechamento, limite_local=proxima_execucao_scanner.timestamp()):
+                continue
 
-            time.sleep(5)
+            executar_estrategias([c for c in ativos_config if c.simbolo in simbolos], fechamento)
 
     finally:
-        mt5.shutdown()
+        executor_estrategias.encerrar()
+        gravador_sinais.descarregar()
+        try:
+            # Últimas métricas no SQLite, mesmo fora do intervalo de gravação
+            metricas.exportar(forcar=True)
+        except Exception as e:
+            Logger.erro(f"❌ Erro ao exportar métricas: {e}")
+        indice_sinais.fechar()
+        mt5.encerrar()
         Logger.aviso("🛑 Conexão com MetaTrader 5 encerrada.")
@@ -1,12 +1,14 @@
+import asyncio
 import os
-import sqlite3
+import time
 from typing import List, Dict
 from dataclasses import dataclass
-import MetaTrader5 as mt5
-import pandas as pd
 
 from logger import Logger
 from config import DB_PATH
+from database import VERSAO_ATIVOS, incrementar_versao, ler_versao, obter_banco
+from mt5_gateway import gateway_mt5 as mt5
+from metrics import metricas
 
 Logger.configurar()
 
@@ -19,16 +21,18 @@ class ScannerConfig:
     max_acoes: int = 0
     spread_maximo: float = 40.0
     caminho_banco: str = DB_PATH
+    n_barras_volume: int = 200
+    max_consultas_simultaneas: int = 8
 
 
-def calcular_volume_ajustado(simbolo: str, n_barras: int = 100) -> float:
-    if not mt5.symbol_select(simbolo, True):
+async def calcular_volume_ajustado(simbolo: str, n_barras: int = 100) -> float:
+    if not await mt5.chamar_async('symbol_select', simbolo, True):
         return 0.0
-    rates = mt5.copy_rates_from_pos(simbolo, mt5.TIMEFRAME_M5, 0, n_barras)
+    # Direto pelo gateway, fora do cache_barras: o universo varrido não ocupa o cache do loop de estratégias
+    rates = await mt5.chamar_async('copy_rates_from_pos', simbolo, mt5.TIMEFRAME_M5, 0, n_barras)
     if rates is None or len(rates) == 0:
         return 0.0
-    df = pd.DataFrame(rates)
-    return df['tick_volume'].sum()
+    return float(rates['tick_volume'].sum())
 
 
 class Ativo:
@@ -56,24 +60,82 @@ class Ativo:
             return "outro"
 
 
+# Volume da última varredura por símbolo: (horário da última cotação, volume)
+_volumes_anteriores: Dict[str, tuple] = {}
+
+
 class MarketScanner:
     def __init__(self, config: ScannerConfig):
         self.config = config
         self.ativos: List[Ativo] = []
+        self.estatisticas: Dict[str, float] = {}
+
+    def elegivel(self, ativo: Ativo) -> bool:
+        # Mesmos critérios de gerar_lista_observados, aplicados antes de buscar candles
+        return getattr(self.config, f"max_{ativo.tipo}", 0) > 0 and ativo.spread <= self.config.spread_maximo
+
+    async def _consultar_volumes(self, ativos: List[Ativo]):
+        # Até max_consultas_simultaneas pedidos na fila do gateway: o terminal nunca fica ocioso
+        # entre um símbolo e outro, sem afogar as chamadas do loop de estratégias
+        limite = asyncio.Semaphore(max(1, self.config.max_consultas_simultaneas))
+
+        async def consultar(ativo: Ativo):
+            async with limite:
+                with metricas.medir('scanner_volume', ativo.symbol):
+                    ativo.volume_ajustado = await calcular_volume_ajustado(
+                        ativo.symbol, n_barras=self.config.n_barras_volume)
+
+        await asyncio.gather(*(consultar(ativo) for ativo in ativos))
 
     def carregar_dados_mt5(self):
+        """
+        Varre os ativos visíveis: descarta pelo tipo/spread antes de buscar
+        candles e reaproveita o volume de quem não tem cotação nova desde a
+        última varredura. Os demais são consultados em paralelo pelo gateway
+        MT5 (chamar_async), no máximo `max_consultas_simultaneas` por vez.
+        """
+        inicio = time.perf_counter()
+        # Conexão única do processo: o gateway só chama o initialize do terminal uma vez
         if not mt5.initialize():
             raise RuntimeError("Erro ao inicializar conexão com o MetaTrader 5")
-
         ativos_mt5 = mt5.symbols_get()
+
         ativos_visiveis = [s for s in ativos_mt5 if s.visible]
+        candidatos = [(s, Ativo(s)) for s in ativos_visiveis]
+        candidatos = [(s, ativo) for s, ativo in candidatos if self.elegivel(ativo)]
 
         self.ativos = []
-        for s in ativos_visiveis:
-            volume = calcular_volume_ajustado(s.name, n_barras=200)
-            self.ativos.append(Ativo(s, volume_ajustado=volume))
-
-        mt5.shutdown()
+        consultar = []
+        for s, ativo in candidatos:
+            anterior = _volumes_anteriores.get(s.name)
+            if anterior is not None and anterior[0] == s.time:
+                # Sem cotação nova desde a última varredura: reaproveita o volume
+                ativo.volume_ajustado = anterior[1]
+            else:
+                consultar.append((s, ativo))
+            self.ativos.append(ativo)
+        reaproveitados = len(candidatos) - len(consultar)
+
+        # Roda na thread do scanner (ou no script avulso), fora de qualquer loop asyncio
+        asyncio.run(self._consultar_volumes([ativo for _, ativo in consultar]))
+        for s, ativo in consultar:
+            _volumes_anteriores[s.name] = (s.time, ativo.volume_ajustado)
+
+        metricas.registrar_tempo('scanner_varredura', time.perf_counter() - inicio)
+        metricas.incrementar('scanner_volume_reaproveitado', valor=reaproveitados)
+        self.estatisticas = {
+            'duracao': time.perf_counter() - inicio,
+            'visiveis': len(ativos_visiveis),
+            'descartados_filtro': len(ativos_visiveis) - len(candidatos),
+            'reaproveitados': reaproveitados,
+            'consultados': len(candidatos) - reaproveitados,
+        }
+        Logger.info(
+            f"🔍 Varredura concluída em {self.estatisticas['duracao']:.2f}s | "
+            f"visíveis: {self.estatisticas['visiveis']} | "
+            f"ignorados (spread/tipo): {self.estatisticas['descartados_filtro']} | "
+            f"sem dados novos: {reaproveitados} | consultados: {self.estatisticas['consultados']}"
+        )
 
     def gerar_lista_observados(self) -> Dict[str, List[Ativo]]:
         tipos = {"forex": [], "indices": [], "crypto": [], "acoes": []}
@@ -84,38 +146,65 @@ class MarketScanner:
             tipos[tipo] = ativos_ordenados[:limite]
         return tipos
 
-    def salvar_no_banco(self):
+    def salvar_no_banco(self) -> dict:
+        """
+        Aplica a nova lista de observados como diferença sobre a tabela `ativos`:
+        insere os novos, atualiza os que mudaram e desliga `observando` dos que
+        saíram, sem apagar a tabela. A versão da lista (controle.versao_ativos)
+        só sobe quando o conjunto de observados ou o tipo de algum deles muda.
+        """
         ativos_por_tipo = self.gerar_lista_observados()
-        conn = sqlite3.connect(self.config.caminho_banco)
-        cursor = conn.cursor()
-
-        cursor.execute("DELETE FROM ativos")
-
-        for tipo, lista in ativos_por_tipo.items():
-            for ativo in lista:
-                cursor.execute(
-                    """
-                    INSERT INTO ativos (
-                        simbolo, tipo, descricao, path, spread, volume_ajustado, observando
-                    ) VALUES (?, ?, ?, ?, ?, ?, 1)
-                    """,
-                    (
-                        ativo.symbol,
-                        tipo,
-                        ativo.description,
-                        ativo.path,
-                        ativo.spread,
-                        float(ativo.volume_ajustado)
-                    )
-                )
-
-        conn.commit()
-        conn.close()
-        Logger.info("✅ Ativos observados atualizados com dados completos no banco.")
-
+        novos = {
+            ativo.symbol: (tipo, ativo.description, ativo.path, ativo.spread, float(ativo.volume_ajustado))
+            for tipo, lista in ativos_por_tipo.items()
+            for ativo in lista
+        }
+
+        inserir, atualizar, desligar, duplicados = [], [], [], []
+        # Uma transação só: os EAs e o loop de estratégias nunca enxergam a troca pela metade
+        with obter_banco(self.config.caminho_banco).transacao() as conn:
+            atuais = {}
+            for linha in conn.execute(
+                    "SELECT id, simbolo, tipo, descricao, path, spread, volume_ajustado, observando FROM ativos ORDER BY id"):
+                if linha[1] in atuais:
+                    duplicados.append((linha[0],))
+                else:
+                    atuais[linha[1]] = linha
+
+            for simbolo, dados in novos.items():
+                atual = atuais.get(simbolo)
+                if atual is None:
+                    inserir.append((simbolo, *dados))
+                elif tuple(atual[2:7]) != dados or atual[7] != 1:
+                    atualizar.append((*dados, atual[0]))
+            for simbolo, atual in atuais.items():
+                if simbolo not in novos and atual[7]:
+                    desligar.append((atual[0],))
+
+            mudou_lista = bool(inserir or desligar or duplicados) or any(
+                atuais[simbolo][7] != 1 or atuais[simbolo][2] != dados[0]
+                for simbolo, dados in novos.items() if simbolo in atuais)
+
+            conn.executemany("DELETE FROM ativos WHERE id = ?", duplicados)
+            conn.executemany("""
+                INSERT INTO ativos (simbolo, tipo, descricao, path, spread, volume_ajustado, observando)
+                VALUES (?, ?, ?, ?, ?, ?, 1)
+            """, inserir)
+            conn.executemany("""
+                UPDATE ativos SET tipo = ?, descricao = ?, path = ?, spread = ?, volume_ajustado = ?, observando = 1
+                WHERE id = ?
+            """, atualizar)
+            conn.executemany("UPDATE ativos SET observando = 0 WHERE id = ?", desligar)
+            versao = incrementar_versao(conn, VERSAO_ATIVOS) if mudou_lista else ler_versao(conn, VERSAO_ATIVOS)
+
+        resumo = {'inseridos': len(inserir), 'atualizados': len(atualizar), 'desligados': len(desligar),
+                  'duplicados_removidos': len(duplicados), 'versao': versao, 'lista_mudou': mudou_lista}
+        Logger.info(f"✅ Ativos observados sincronizados no banco: {resumo}")
+        return resumo
 
 if __name__ == "__main__":
     config = ScannerConfig()
     scanner = MarketScanner(config)
     scanner.carregar_dados_mt5()
     scanner.salvar_no_banco()
+    mt5.shutdown()
@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from config import DB_PATH, METRICAS_HABILITADAS, METRICAS_INTERVALO_SQLITE
+from database import obter_banco
+
+TODOS = '*'   # rótulo de símbolo para o agregado de todos os ativos
+_NULO = nullcontext()
+
+
+def cronometrar(destino: dict, etapa: str):
+    """
+    Soma em `destino[etapa]` o tempo do bloco. Usado onde o resultado viaja
+    entre processos; com as métricas desligadas é um contexto nulo.
+    """
+    if not METRICAS_HABILITADAS:
+        return _NULO
+    return _cronometrar(destino, etapa)
+
+
+@contextmanager
+def _cronometrar(destino: dict, etapa: str):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        destino[etapa] = destino.get(etapa, 0.0) + time.perf_counter() - inicio
+
+
+class Metricas:
+    """
+    Tempos por etapa e contadores, por ativo, com p50/p95/máximo sobre as
+    últimas `amostras` medições. Desabilitada, `medir` devolve um contexto nulo
+    e os registros retornam na primeira linha.
+
+    `exportar` reescreve o arquivo Prometheus a cada chamada, mas só grava no
+    SQLite (o mesmo arquivo que os EAs consultam) a cada `intervalo_sqlite` segundos.
+    """
+
+    def __init__(self, habilitado: bool = True, amostras: int = 1000,
+                 intervalo_sqlite: float = METRICAS_INTERVALO_SQLITE):
+        self.habilitado = habilitado
+        self.amostras = amostras
+        self.intervalo_sqlite = intervalo_sqlite
+        self._ultimo_sqlite = None
+        self._tempos = defaultdict(lambda: deque(maxlen=self.amostras))
+        self._contadores = Counter()
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    # ================================
+    # 📝 REGISTRO
+    # ================================
+
+    def medir(self, etapa: str, simbolo: str = None):
+        if not self.habilitado:
+            return _NULO
+        return self._medir(etapa, simbolo)
+
+    @contextmanager
+    def _medir(self, etapa: str, simbolo: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_tempo(etapa, time.perf_counter() - inicio, simbolo)
+
+    def registrar_tempo(self, etapa: str, segundos: float, simbolo: str = None):
+        if not self.habilitado:
+            return
+        with self._lock:
+            self._tempos[(etapa, simbolo or TODOS)].append(segundos)
+            if simbolo:
+                self._tempos[(etapa, TODOS)].append(segundos)
+
+    def registrar_etapas(self, etapas: dict, simbolo: str = None):
+        if not self.habilitado:
+            return
+        for etapa, segundos in etapas.items():
+            self.registrar_tempo(etapa, segundos, simbolo)
+
+    def incrementar(self, nome: str, simbolo: str = None, valor: int = 1):
+        if not self.habilitado:
+            return
+        with self._lock:
+            self._contadores[(nome, simbolo or TODOS)] += valor
+            if simbolo:
+                self._contadores[(nome, TODOS)] += valor
+
+    def definir(self, nome: str, valor: float):
+        """Valor instantâneo (gauge), ex.: tamanho da fila de logs."""
+        if not self.habilitado:
+            return
+        self._valores[nome] = valor
+
+    # ================================
+    # 📊 CONSULTA E EXPORTAÇÃO
+    # ================================
+
+    def resumo(self) -> list:
+        with self._lock:
+            tempos = {chave: np.fromiter(valores, float) for chave, valores in self._tempos.items()}
+            contadores = dict(self._contadores)
+            valores = dict(self._valores)
+
+        linhas = []
+        for (etapa, simbolo), amostras in sorted(tempos.items()):
+            p50, p95 = np.percentile(amostras, [50, 95])
+            linhas.append({'tipo': 'tempo', 'nome': etapa, 'simbolo': simbolo, 'amostras': len(amostras),
+                           'p50': p50, 'p95': p95, 'max': amostras.max(), 'valor': amostras.sum()})
+        for (nome, simbolo), total in sorted(contadores.items()):
+            linhas.append({'tipo': 'contador', 'nome': nome, 'simbolo': simbolo, 'amostras': None,
+                           'p50': None, 'p95': None, 'max': None, 'valor': total})
+        for nome, valor in sorted(valores.items()):
+            linhas.append({'tipo': 'valor', 'nome': nome, 'simbolo': TODOS, 'amostras': None,
+                           'p50': None, 'p95': None, 'max': None, 'valor': valor})
+        return linhas
+
+    def exportar_prometheus(self, caminho: str = "logs/metricas.prom"):
+        # Cada família em bloco contínuo, logo após o seu # TYPE (exigência do formato texto)
+        familias = {
+            'bot_etapa_segundos': ('summary', []),
+            'bot_etapa_segundos_max': ('gauge', []),
+            'bot_contador_total': ('counter', []),
+            'bot_valor': ('gauge', []),
+        }
+        for m in self.resumo():
+            rotulos = f'nome="{m["nome"]}",simbolo="{m["simbolo"]}"'
+            if m['tipo'] == 'tempo':
+                etapa = familias['bot_etapa_segundos'][1]
+                etapa.append(f'bot_etapa_segundos{{{rotulos},quantile="0.5"}} {m["p50"]:.6f}')
+                etapa.append(f'bot_etapa_segundos{{{rotulos},quantile="0.95"}} {m["p95"]:.6f}')
+                etapa.append(f'bot_etapa_segundos_sum{{{rotulos}}} {m["valor"]:.6f}')
+                etapa.append(f'bot_etapa_segundos_count{{{rotulos}}} {m["amostras"]}')
+                familias['bot_etapa_segundos_max'][1].append(f'bot_etapa_segundos_max{{{rotulos}}} {m["max"]:.6f}')
+            elif m['tipo'] == 'contador':
+                familias['bot_contador_total'][1].append(f'bot_contador_total{{{rotulos}}} {m["valor"]}')
+            else:
+                familias['bot_valor'][1].append(f'bot_valor{{nome="{m["nome"]}"}} {m["valor"]}')
+
+        saida = []
+        for nome, (tipo, amostras) in familias.items():
+            saida.append(f"# TYPE {nome} {tipo}")
+            saida.extend(amostras)
+
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        temporario = caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write("\n".join(saida) + "\n")
+        os.replace(temporario, caminho)   # quem coleta nunca lê um arquivo pela metade
+
+    def exportar_sqlite(self, caminho_banco: str = DB_PATH, retencao: timedelta = timedelta(days=7)):
+        agora = datetime.now()
+        linhas = [
+            (agora.isoformat(), m['tipo'], m['nome'], m['simbolo'], m['amostras'],
+             m['p50'], m['p95'], m['max'], m['valor'])
+            for m in self.resumo()
+        ]
+        with obter_banco(caminho_banco).transacao() as conn:
+            conn.execute("DELETE FROM metricas WHERE timestamp < ?", ((agora - retencao).isoformat(),))
+            conn.executemany("""
+                INSERT INTO metricas (timestamp, tipo, nome, simbolo, amostras, p50, p95, max, valor)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, linhas)
+
+    def exportar(self, caminho_banco: str = DB_PATH, forcar: bool = False) -> bool:
+        """Exporta o Prometheus; retorna True se também gravou no SQLite."""
+        if not self.habilitado:
+            return False
+        self.exportar_prometheus()
+        agora = time.monotonic()
+        if not forcar and self._ultimo_sqlite is not None and agora - self._ultimo_sqlite < self.intervalo_sqlite:
+            return False
+        self.exportar_sqlite(caminho_banco)
+        self._ultimo_sqlite = agora
+        return True
+
+
+# Instância do processo principal (loop de estratégias + scanner)
+metricas = Metricas(habilitado=METRICAS_HABILITADAS)
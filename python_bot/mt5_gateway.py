@@ -0,0 +1,353 @@
+"""
+Gateway único para o terminal MetaTrader5.
+
+Uma thread dedicada é dona da conexão e executa as chamadas em ordem; loop de
+estratégias, scanner e scripts avulsos falam com ela pela API síncrona (o
+próprio objeto imita o módulo MetaTrader5: `gateway_mt5.copy_rates_from_pos(...)`)
+ou por `await gateway_mt5.chamar_async(...)`.
+
+- Consultas idênticas em andamento são unidas: quem chega depois recebe o mesmo
+  resultado, sem nova ida ao terminal.
+- Resultados de consultas ficam em cache por um TTL curto (por função);
+  copy_rates_* só entra no cache com MT5_CACHE_TTL > 0. symbol_select altera o
+  terminal: nunca é guardado e descarta o cache de symbols_get/symbol_info.
+- A fila é limitada (back-pressure): sem espaço, quem chama espera até
+  `espera_max` e então recebe GatewaySobrecarregado. `max_por_segundo` limita
+  o ritmo de chamadas ao terminal.
+- initialize() só conecta na primeira vez e shutdown() fecha a conexão; a
+  próxima chamada reconecta sozinha.
+
+Os resultados são compartilhados entre quem pediu a mesma consulta: não os altere.
+
+Teste de carga com o fake_mt5:
+    python mt5_gateway.py --latencia 0.01 --clientes 40 --pedidos 25
+"""
+import argparse
+import asyncio
+import functools
+import importlib
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+from config import MT5_CACHE_TTL, MT5_MAX_POR_SEGUNDO
+
+# Chamadas que podem ser unidas quando idênticas; TTL > 0 só para consultas sem efeito colateral
+TTL_PADRAO = {
+    'copy_rates_from_pos': MT5_CACHE_TTL,
+    'copy_rates_from': MT5_CACHE_TTL,
+    'copy_rates_range': MT5_CACHE_TTL,
+    'symbol_info_tick': 0.0,     # só une pedidos simultâneos: o horário do tick sincroniza o agendador
+    'symbols_get': 10.0,
+    'symbols_total': 10.0,
+    'symbol_info': 10.0,
+    'symbol_select': 0.0,        # muda a Observação do Mercado: só une pedidos simultâneos
+    'account_info': 1.0,
+    'terminal_info': 1.0,
+    'last_error': 0.0,
+}
+MAX_ITENS_CACHE = 4096
+
+# Consultas cujo resultado inclui a visibilidade na Observação do Mercado
+AFETADAS_POR_SELECAO = ('symbols_get', 'symbols_total', 'symbol_info')
+
+
+class GatewaySobrecarregado(RuntimeError):
+    pass
+
+
+class GatewayMT5:
+    def __init__(self, mt5_modulo=None, ttl: dict = None, max_fila: int = 256,
+                 max_por_segundo: float = MT5_MAX_POR_SEGUNDO, espera_max: float = 30.0):
+        self._mt5 = mt5_modulo
+        self.ttl = {**TTL_PADRAO, **(ttl or {})}
+        self.max_fila = max_fila
+        self.max_por_segundo = max_por_segundo
+        self.espera_max = espera_max
+        self._lock = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        # Estado por processo: um filho (fork) começa sem worker, fila nem conexão
+        self._pid = os.getpid()
+        self._fila = queue.Queue(maxsize=self.max_fila)
+        self._worker = None
+        self._em_voo = {}
+        self._cache = {}
+        self._conectado = False
+        self._args_inicializacao = ((), {})
+        self._fichas = float(self.max_por_segundo or 0)
+        self._ultima_ficha = time.monotonic()
+        self.pedidos = 0
+        self.chamadas_terminal = 0
+        self.unidos = 0
+        self.acertos_cache = 0
+        self.rejeitados = 0
+        self.espera_limite = 0.0
+        self.maior_fila = 0
+
+    @property
+    def mt5(self):
+        if self._mt5 is None:
+            self._mt5 = importlib.import_module('MetaTrader5')
+        return self._mt5
+
+    def __getattr__(self, nome: str):
+        # Constantes (TIMEFRAME_M5, ORDER_TYPE_BUY, ...) vêm do módulo; funções passam pela thread do gateway
+        if nome.startswith('_'):
+            raise AttributeError(nome)
+        atributo = getattr(self.mt5, nome)
+        if not callable(atributo) or isinstance(atributo, type):
+            return atributo
+        return functools.partial(self.chamar, nome)
+
+    # ================================
+    # 📨 SUBMISSÃO
+    # ================================
+
+    def _garantir_worker(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reiniciar()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._executar, name="mt5-gateway", daemon=True)
+                self._worker.start()
+
+    def _chave(self, nome: str, args: tuple, kwargs: dict):
+        if nome not in self.ttl:
+            return None
+        chave = (nome, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(chave)
+        except TypeError:
+            return None
+        return chave
+
+    def _submeter(self, nome: str, args: tuple, kwargs: dict, espera: float) -> Future:
+        """Futuro com o resultado; `espera` = segundos aguardando vaga na fila (0 = não espera)."""
+        self._garantir_worker()
+        chave = self._chave(nome, args, kwargs)
+        with self._lock:
+            self.pedidos += 1
+            if chave is not None:
+                item = self._cache.get(chave)
+                if item is not None and item[0] > time.monotonic():
+                    self.acertos_cache += 1
+                    futuro = Future()
+                    futuro.set_result(item[1])
+                    return futuro
+                futuro = self._em_voo.get(chave)
+                if futuro is not None:
+                    self.unidos += 1
+                    return futuro
+            futuro = Future()
+            if chave is not None:
+                self._em_voo[chave] = futuro
+
+        try:
+            self._fila.put((nome, args, kwargs, chave, futuro), block=espera > 0, timeout=espera or None)
+        except queue.Full:
+            with self._lock:
+                self._em_voo.pop(chave, None)
+                self.pedidos -= 1
+            raise GatewaySobrecarregado(f"Fila do gateway MT5 cheia ({self.max_fila} pedidos)") from None
+        self.maior_fila = max(self.maior_fila, self._fila.qsize())
+        return futuro
+
+    def chamar(self, nome: str, *args, **kwargs):
+        """Executa `mt5.<nome>(*args, **kwargs)` na thread do gateway e devolve o resultado."""
+        try:
+            futuro = self._submeter(nome, args, kwargs, espera=self.espera_max)
+        except GatewaySobrecarregado:
+            self.rejeitados += 1
+            raise
+        return futuro.result()
+
+    async def chamar_async(self, nome: str, *args, **kwargs):
+        inicio = time.monotonic()
+        while True:
+            try:
+                futuro = self._submeter(nome, args, kwargs, espera=0)
+                break
+            except GatewaySobrecarregado:
+                if time.monotonic() - inicio >= self.espera_max:
+                    self.rejeitados += 1
+                    raise
+                await asyncio.sleep(0.002)
+        return await asyncio.wrap_future(futuro)
+
+    def initialize(self, *args, **kwargs) -> bool:
+        return self.chamar('initialize', *args, **kwargs)
+
+    def shutdown(self):
+        return self.chamar('shutdown')
+
+    # ================================
+    # 🧵 THREAD DO TERMINAL
+    # ================================
+
+    def _aguardar_limite(self):
+        if not self.max_por_segundo:
+            return
+        agora = time.monotonic()
+        self._fichas = min(self.max_por_segundo, self._fichas + (agora - self._ultima_ficha) * self.max_por_segundo)
+        self._ultima_ficha = agora
+        if self._fichas < 1:
+            espera = (1 - self._fichas) / self.max_por_segundo
+            time.sleep(espera)
+            self.espera_limite += espera
+            self._fichas, self._ultima_ficha = 1.0, time.monotonic()
+        self._fichas -= 1
+
+    def _chamar_terminal(self, nome: str, args: tuple, kwargs: dict):
+        if nome == 'initialize':
+            self._args_inicializacao = (args, kwargs)
+            if not self._conectado:
+                self.chamadas_terminal += 1
+                self._conectado = bool(self.mt5.initialize(*args, **kwargs))
+            return self._conectado
+        if nome == 'shutdown':
+            if self._conectado:
+                self.chamadas_terminal += 1
+                self.mt5.shutdown()
+                self._conectado = False
+            with self._lock:
+                self._cache.clear()
+            return None
+
+        if not self._conectado:
+            # Reconecta com os mesmos argumentos do último initialize()
+            args_init, kwargs_init = self._args_inicializacao
+            self._conectado = bool(self.mt5.initialize(*args_init, **kwargs_init))
+        self._aguardar_limite()
+        self.chamadas_terminal += 1
+        return getattr(self.mt5, nome)(*args, **kwargs)
+
+    def _guardar(self, chave, nome: str, resultado):
+        ttl = self.ttl.get(nome, 0)
+        # None é falha no MT5: não fica em cache
+        if chave is None or ttl <= 0 or resultado is None:
+            return
+        agora = time.monotonic()
+        if len(self._cache) >= MAX_ITENS_CACHE:
+            self._cache = {c: item for c, item in self._cache.items() if item[0] > agora}
+            if len(self._cache) >= MAX_ITENS_CACHE:
+                self._cache.clear()
+        self._cache[chave] = (agora + ttl, resultado)
+
+    def _executar(self):
+        while True:
+            pedido = self._fila.get()
+            if pedido is None:
+                return
+            nome, args, kwargs, chave, futuro = pedido
+            try:
+                resultado = self._chamar_terminal(nome, args, kwargs)
+            except BaseException as e:
+                with self._lock:
+                    self._em_voo.pop(chave, None)
+                futuro.set_exception(e)
+                continue
+            with self._lock:
+                self._em_voo.pop(chave, None)
+                if nome == 'symbol_select':
+                    self._cache = {c: item for c, item in self._cache.items() if c[0] not in AFETADAS_POR_SELECAO}
+                self._guardar(chave, nome, resultado)
+            futuro.set_result(resultado)
+
+    def encerrar(self, fechar_terminal: bool = True):
+        """Fecha a conexão (opcional) e para a thread do gateway."""
+        if self._worker is None or self._pid != os.getpid():
+            return
+        if fechar_terminal:
+            self.shutdown()
+        self._fila.put(None)
+        self._worker.join()
+        self._worker = None
+
+    def limpar_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def estatisticas(self) -> dict:
+        return {
+            'pedidos': self.pedidos,
+            'chamadas_terminal': self.chamadas_terminal,
+            'unidos': self.unidos,
+            'acertos_cache': self.acertos_cache,
+            'rejeitados': self.rejeitados,
+            'na_fila': self._fila.qsize(),
+            'maior_fila': self.maior_fila,
+            'espera_limite_s': round(self.espera_limite, 3),
+        }
+
+
+# Instância do processo: robô, scanner e scripts avulsos usam a mesma conexão
+gateway_mt5 = GatewayMT5()
+
+
+# ================================
+# 🧪 TESTE DE CARGA (FAKE_MT5)
+# ================================
+
+def main_carga(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga do gateway MT5 sobre o fake_mt5")
+    parser.add_argument("--latencia", type=float, default=0.01, help="segundos por chamada ao terminal simulado")
+    parser.add_argument("--clientes", type=int, default=40, help="tarefas asyncio concorrentes")
+    parser.add_argument("--threads", type=int, default=4, help="clientes síncronos em threads")
+    parser.add_argument("--pedidos", type=int, default=25, help="pedidos por cliente")
+    parser.add_argument("--max-por-segundo", type=float, default=None)
+    parser.add_argument("--max-fila", type=int, default=64)
+    parser.add_argument("--ttl", type=float, default=1.0, help="TTL dos copy_rates_* neste teste")
+    args = parser.parse_args(argv)
+
+    import fake_mt5
+    from timeframes import TIMEFRAME_M5, TIMEFRAME_M30
+
+    fake_mt5.configurar()
+    fake_mt5.definir_latencia(args.latencia)
+    simbolos = [s[0] for s in fake_mt5.SIMBOLOS_PADRAO]
+    consultas = [(s, tf, n) for s in simbolos for tf in (TIMEFRAME_M5, TIMEFRAME_M30) for n in (100, 500)]
+    gateway = GatewayMT5(fake_mt5, ttl={'copy_rates_from_pos': args.ttl}, max_fila=args.max_fila,
+                         max_por_segundo=args.max_por_segundo)
+    gateway.initialize()
+
+    def cliente_sync(k: int):
+        for i in range(args.pedidos):
+            gateway.copy_rates_from_pos(*consultas[(k * 7 + i) % len(consultas)][:2], 0,
+                                        consultas[(k * 7 + i) % len(consultas)][2])
+
+    async def cliente_async(k: int):
+        for i in range(args.pedidos):
+            simbolo, tf, n = consultas[(k * 3 + i) % len(consultas)]
+            await gateway.chamar_async('copy_rates_from_pos', simbolo, tf, 0, n)
+            if i % 5 == 0:
+                await gateway.chamar_async('symbol_info_tick', simbolo)
+
+    async def rodar():
+        threads = [threading.Thread(target=cliente_sync, args=(k,)) for k in range(args.threads)]
+        for t in threads:
+            t.start()
+        await asyncio.gather(*(cliente_async(k) for k in range(args.clientes)))
+        await asyncio.get_running_loop().run_in_executor(None, lambda: [t.join() for t in threads])
+
+    inicio = time.perf_counter()
+    asyncio.run(rodar())
+    duracao = time.perf_counter() - inicio
+    gateway.encerrar()
+
+    estatisticas = gateway.estatisticas()
+    sem_gateway = estatisticas['pedidos'] * args.latencia
+    print(f"⏱️ {estatisticas['pedidos']} pedidos em {duracao:.2f}s "
+          f"(chamadas diretas em série levariam ~{sem_gateway:.2f}s)")
+    for chave, valor in estatisticas.items():
+        print(f"   {chave}: {valor}")
+    print(f"   chamadas ao fake_mt5: {dict(fake_mt5.chamadas())}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_carga())
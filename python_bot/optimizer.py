@@ -0,0 +1,303 @@
+"""
+Otimização dos parâmetros da estratégia por ativo.
+
+Busca em grade ou aleatória sobre o espaço de parâmetros, validada em janelas
+walk-forward: cada combinação roda uma única vez sobre todo o histórico (o
+backtest não olha adiante) e as operações são separadas por janela de treino e
+de teste pelo candle de entrada. O ranking e o vencedor de cada ativo usam só
+o treino (o vencedor é a combinação escolhida na janela de treino mais recente);
+o desempenho no teste vem ao lado, apenas como medida fora da amostra.
+
+Os candles de cada ativo são gravados uma vez como arrays .npy e abertos pelos
+processos do pool com mmap, sem serem serializados por tarefa. Combinações com
+os mesmos parâmetros de pivô vão juntas para a mesma tarefa e reaproveitam o
+ADX/VWAP e o estado de ciclo (cache do executar_backtest).
+
+Uso:
+    python optimizer.py --simbolos EURUSD GBPUSD --dias 365 --folds 4
+    python optimizer.py --simbolos EURUSD --aleatoria 100 --processos 8 --gravar
+"""
+import argparse
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backtest import ParametrosEstrategia, carregar_candles_fake, chave_ciclo, executar_backtest, resumir
+from config import DB_PATH
+from database import obter_banco
+
+ESPACO_PADRAO = {
+    'adx_min': [15, 20, 25, 30],
+    'engolfo_pct_max': [1.0, 2.5, 5.0],
+    'distancia_vwap_max': [0.0025, 0.005, 0.01],
+    'grupo_candles': [2, 3, 4],
+    'distancia_pivo': [0.0002, 0.0005, 0.001],
+}
+OBJETIVOS = ('r_total', 'r_medio', 'fator_lucro', 'taxa_acerto')
+COLUNAS_BARRAS = ('time', 'open', 'high', 'low', 'close', 'tick_volume')
+
+# Campos de ParametrosEstrategia que existem na tabela `configuracoes`
+CAMPOS_CONFIGURACAO = ('adx_min', 'engolfo_pct_max', 'distancia_vwap_max', 'grupo_candles',
+                       'distancia_pivo', 'distancia_sl')
+
+
+@dataclass
+class ResultadoOtimizacao:
+    ranking: pd.DataFrame          # uma linha por (ativo, combinação), melhor no treino primeiro
+    walk_forward: pd.DataFrame     # por janela: combinação escolhida no treino e seu resultado no teste
+    vencedores: dict = field(default_factory=dict)   # ativo -> parâmetros
+
+
+# ================================
+# 🎲 ESPAÇO DE BUSCA E JANELAS
+# ================================
+
+def gerar_combinacoes(espaco: dict, amostras: int = None, seed: int = 0) -> list:
+    """Grade completa, ou `amostras` combinações sorteadas sem repetição da mesma grade."""
+    campos = list(espaco)
+    grade = list(itertools.product(*(espaco[c] for c in campos)))
+    if amostras is not None and amostras < len(grade):
+        escolhidas = np.random.default_rng(seed).choice(len(grade), size=amostras, replace=False)
+        grade = [grade[i] for i in sorted(escolhidas)]
+    return [dict(zip(campos, valores)) for valores in grade]
+
+
+def janelas_walk_forward(total: int, folds: int = 4, blocos_treino: int = 2, ancorado: bool = False) -> list:
+    """
+    Divide `total` candles em `folds + blocos_treino` blocos. A janela k treina
+    nos `blocos_treino` blocos anteriores ao bloco de teste k (ou em todos desde
+    o início, se ancorado). Devolve (início treino, início teste, fim teste).
+    """
+    limites = np.linspace(0, total, folds + blocos_treino + 1).astype(int)
+    janelas = []
+    for k in range(folds):
+        teste = k + blocos_treino
+        inicio = 0 if ancorado else limites[k]
+        janelas.append((int(inicio), int(limites[teste]), int(limites[teste + 1])))
+    return janelas
+
+
+# ================================
+# 🗂️ CANDLES COMPARTILHADOS
+# ================================
+
+def publicar_barras(df: pd.DataFrame, diretorio: str, simbolo: str) -> dict:
+    """Grava uma coluna por arquivo .npy; os processos abrem com mmap (page cache compartilhado)."""
+    caminhos = {}
+    for coluna in COLUNAS_BARRAS:
+        valores = df.index.values.astype('datetime64[ns]').astype(np.int64) if coluna == 'time' \
+            else df[coluna].to_numpy()
+        caminhos[coluna] = os.path.join(diretorio, f"{simbolo}_{coluna}.npy")
+        np.save(caminhos[coluna], valores)
+    return caminhos
+
+
+# Por processo do pool: ativo -> (DataFrame sobre os arrays mapeados, cache do backtest)
+_barras_abertas = {}
+
+
+def _abrir_barras(simbolo: str, caminhos: dict):
+    if simbolo not in _barras_abertas:
+        # Índice e colunas são visões dos arrays mapeados: nada é copiado para o processo
+        colunas = {c: np.load(caminho, mmap_mode='r') for c, caminho in caminhos.items()}
+        indice = pd.DatetimeIndex(colunas.pop('time').view('datetime64[ns]'), name='time', copy=False)
+        _barras_abertas[simbolo] = (pd.DataFrame(colunas, index=indice, copy=False), {})
+    return _barras_abertas[simbolo]
+
+
+# ================================
+# 🧮 AVALIAÇÃO (PROCESSOS DO POOL)
+# ================================
+
+def _metricas_segmento(operacoes: pd.DataFrame, inicio: int, fim: int) -> dict:
+    recorte = operacoes[(operacoes['indice_entrada'] >= inicio) & (operacoes['indice_entrada'] < fim)]
+    resumo = resumir(recorte, pd.Series(dtype=object))
+    resumo.pop('rejeicoes')
+    return resumo
+
+
+def avaliar_combinacoes(simbolo: str, caminhos: dict, combinacoes: list, base: dict, janelas: list) -> list:
+    """Roda o backtest de cada combinação e mede cada janela de treino e teste."""
+    df, cache = _abrir_barras(simbolo, caminhos)
+    linhas = []
+    for numero, combinacao in combinacoes:
+        parametros = ParametrosEstrategia(**{**base, **combinacao})
+        operacoes = executar_backtest(df, parametros, simbolo, cache=cache).operacoes
+        for janela, (inicio, meio, fim) in enumerate(janelas):
+            for segmento, (a, b) in (('treino', (inicio, meio)), ('teste', (meio, fim))):
+                linhas.append({'simbolo': simbolo, 'combinacao': numero, 'janela': janela,
+                               'segmento': segmento, **_metricas_segmento(operacoes, a, b)})
+    return linhas
+
+
+def _agrupar_tarefas(combinacoes: list, tamanho_tarefa: int) -> list:
+    """Mesma chave de ciclo na mesma tarefa, para o estado de pivôs ser calculado uma vez."""
+    grupos = {}
+    for numero, combinacao in enumerate(combinacoes):
+        chave = chave_ciclo(ParametrosEstrategia(**{
+            c: v for c, v in combinacao.items() if c in ParametrosEstrategia.__dataclass_fields__}))
+        grupos.setdefault(chave, []).append((numero, combinacao))
+    tarefas = []
+    for grupo in grupos.values():
+        tarefas.extend(grupo[i:i + tamanho_tarefa] for i in range(0, len(grupo), tamanho_tarefa))
+    return tarefas
+
+
+# ================================
+# 🏆 RANKING E WALK-FORWARD
+# ================================
+
+def _ranking(medidas: pd.DataFrame, combinacoes: list, objetivo: str, min_operacoes: int) -> pd.DataFrame:
+    """Ordena pelo treino; as colunas de teste são só reportadas, nunca usadas na ordem."""
+    tabela = medidas.pivot_table(index=['simbolo', 'combinacao'], columns='segmento',
+                                 values=[objetivo, 'operacoes'], aggfunc={objetivo: 'mean', 'operacoes': 'sum'})
+    tabela.columns = [f"{segmento}_{medida}" for medida, segmento in tabela.columns]
+    tabela = tabela.reset_index()
+    parametros = pd.DataFrame(combinacoes).rename_axis('combinacao').reset_index()
+    tabela = tabela.merge(parametros, on='combinacao')
+    tabela['valida'] = tabela['treino_operacoes'] >= min_operacoes
+    tabela = tabela.sort_values(['simbolo', 'valida', f"treino_{objetivo}", 'combinacao'],
+                                ascending=[True, False, False, True], kind='stable')
+    tabela['posicao'] = tabela.groupby('simbolo').cumcount() + 1
+    return tabela.reset_index(drop=True)
+
+
+def _walk_forward(medidas: pd.DataFrame, objetivo: str, min_operacoes: int) -> pd.DataFrame:
+    """Em cada janela, a melhor combinação no treino e o que ela fez no teste seguinte."""
+    treino = medidas[(medidas['segmento'] == 'treino') & (medidas['operacoes'] >= min_operacoes)]
+    teste = medidas[medidas['segmento'] == 'teste'].set_index(['simbolo', 'janela', 'combinacao'])
+    linhas = []
+    for (simbolo, janela), grupo in treino.groupby(['simbolo', 'janela']):
+        melhor = grupo.loc[grupo[objetivo].idxmax()]
+        fora = teste.loc[(simbolo, janela, melhor['combinacao'])]
+        linhas.append({'simbolo': simbolo, 'janela': janela, 'combinacao': int(melhor['combinacao']),
+                       f"treino_{objetivo}": melhor[objetivo], f"teste_{objetivo}": fora[objetivo],
+                       'teste_operacoes': fora['operacoes']})
+    return pd.DataFrame(linhas)
+
+
+def otimizar(dados: dict, espaco: dict = None, amostras: int = None, seed: int = 0, folds: int = 4,
+             blocos_treino: int = 2, ancorado: bool = False, objetivo: str = 'r_total', min_operacoes: int = 10,
+             base: ParametrosEstrategia = None, processos: int = None, tamanho_tarefa: int = 8) -> ResultadoOtimizacao:
+    """`dados`: ativo -> candles M5. `processos=0` roda tudo no processo atual."""
+    if objetivo not in OBJETIVOS:
+        raise ValueError(f"Objetivo inválido: {objetivo} (use um de {OBJETIVOS})")
+    combinacoes = gerar_combinacoes(espaco or ESPACO_PADRAO, amostras, seed)
+    base = asdict(base or ParametrosEstrategia())
+    tarefas = _agrupar_tarefas(combinacoes, tamanho_tarefa)
+
+    diretorio = tempfile.mkdtemp(prefix="otimizador_")
+    medidas = []
+    try:
+        envios = []
+        for simbolo, df in dados.items():
+            janelas = janelas_walk_forward(len(df), folds, blocos_treino, ancorado)
+            caminhos = publicar_barras(df, diretorio, simbolo)
+            envios.extend((simbolo, caminhos, tarefa, base, janelas) for tarefa in tarefas)
+
+        if processos == 0:
+            for envio in envios:
+                medidas.extend(avaliar_combinacoes(*envio))
+        else:
+            with ProcessPoolExecutor(max_workers=processos) as pool:
+                for futuro in as_completed([pool.submit(avaliar_combinacoes, *envio) for envio in envios]):
+                    medidas.extend(futuro.result())
+    finally:
+        _barras_abertas.clear()
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    medidas = pd.DataFrame(medidas)
+    ranking = _ranking(medidas, combinacoes, objetivo, min_operacoes)
+    walk_forward = _walk_forward(medidas, objetivo, min_operacoes)
+    return ResultadoOtimizacao(ranking, walk_forward, _vencedores(walk_forward, combinacoes, base, folds))
+
+
+def _vencedores(walk_forward: pd.DataFrame, combinacoes: list, base: dict, folds: int) -> dict:
+    """A combinação escolhida no treino da última janela; o teste dela não pesa na escolha."""
+    if walk_forward.empty:
+        return {}
+    ultima = walk_forward[walk_forward['janela'] == folds - 1]
+    return {linha.simbolo: {**base, **combinacoes[linha.combinacao]} for linha in ultima.itertuples()}
+
+
+# ================================
+# 💾 CONFIGURAÇÕES POR ATIVO
+# ================================
+
+def gravar_configuracoes(vencedores: dict, caminho_banco: str = DB_PATH, origem: str = "optimizer"):
+    """Upsert dos parâmetros vencedores; lote, ponto e horários existentes são preservados."""
+    agora = datetime.now().isoformat()
+    colunas = ", ".join(CAMPOS_CONFIGURACAO)
+    marcadores = ", ".join("?" for _ in CAMPOS_CONFIGURACAO)
+    atualizar = ", ".join(f"{c} = excluded.{c}" for c in CAMPOS_CONFIGURACAO + ('origem', 'atualizado_em'))
+    linhas = [
+        (simbolo, *(parametros[c] for c in CAMPOS_CONFIGURACAO), origem, agora)
+        for simbolo, parametros in vencedores.items()
+    ]
+    with obter_banco(caminho_banco).transacao() as conn:
+        conn.executemany(f"""
+            INSERT INTO configuracoes (simbolo, {colunas}, origem, atualizado_em)
+            VALUES (?, {marcadores}, ?, ?)
+            ON CONFLICT(simbolo) DO UPDATE SET {atualizar}
+        """, linhas)
+
+
+# ================================
+# 🖥️ LINHA DE COMANDO
+# ================================
+
+def main_otimizador(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Otimização walk-forward dos parâmetros por ativo")
+    parser.add_argument("--simbolos", nargs="+", default=["EURUSD"], help="símbolos do fake_mt5")
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--blocos-treino", type=int, default=2)
+    parser.add_argument("--ancorado", action="store_true", help="treino sempre desde o início do histórico")
+    parser.add_argument("--aleatoria", type=int, help="sorteia N combinações em vez da grade completa")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--objetivo", choices=OBJETIVOS, default="r_total")
+    parser.add_argument("--min-operacoes", type=int, default=10, help="operações mínimas no treino")
+    parser.add_argument("--processos", type=int, help="0 = sem pool")
+    parser.add_argument("--saida", help="CSV para gravar o ranking completo")
+    parser.add_argument("--gravar", action="store_true", help="grava os vencedores na tabela configuracoes")
+    args = parser.parse_args(argv)
+
+    dados = {simbolo: carregar_candles_fake(simbolo, args.dias) for simbolo in args.simbolos}
+    inicio = time.perf_counter()
+    resultado = otimizar(dados, amostras=args.aleatoria, seed=args.seed, folds=args.folds,
+                         blocos_treino=args.blocos_treino, ancorado=args.ancorado, objetivo=args.objetivo,
+                         min_operacoes=args.min_operacoes, processos=args.processos)
+    print(f"🧪 {resultado.ranking['combinacao'].nunique()} combinações x {len(dados)} ativos "
+          f"em {time.perf_counter() - inicio:.1f}s")
+
+    for simbolo, grupo in resultado.ranking.groupby('simbolo'):
+        print(f"\n🏆 {simbolo}")
+        print(grupo.head(5).to_string(index=False))
+        janelas = resultado.walk_forward[resultado.walk_forward['simbolo'] == simbolo]
+        if not janelas.empty:
+            print(f"   walk-forward (melhor do treino no teste seguinte):")
+            print(janelas.to_string(index=False))
+            ultima = janelas.iloc[-1]
+            if simbolo in resultado.vencedores:
+                print(f"   vencedor: combinação {ultima['combinacao']} (última janela) | "
+                      f"treino {ultima[f'treino_{args.objetivo}']:.2f} | teste {ultima[f'teste_{args.objetivo}']:.2f}")
+
+    if args.saida:
+        resultado.ranking.to_csv(args.saida, index=False)
+    if args.gravar:
+        gravar_configuracoes(resultado.vencedores)
+        print(f"\n💾 {len(resultado.vencedores)} configurações gravadas em {DB_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_otimizador())
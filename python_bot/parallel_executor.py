@@ -0,0 +1,302 @@
+import os
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import time as dt_time
+from typing import List, Optional
+
+from bar_archive import ArquivoBarras
+from bars import Barras
+from metrics import cronometrar
+from pivot_tracker import PivotTracker
+from resampler import ResamplerMultiTimeframe
+from strategy import MarketAnalyst
+from streaming_indicators import IndicadoresIncrementais
+from timeframes import segundos_timeframe
+from logger import Logger
+
+MODOS_EXECUCAO = ("serial", "thread", "process")
+
+
+@dataclass
+class TarefaAnalise:
+    config: object
+    barras: Barras                 # candles principais: o histórico todo ou, sem `desde_inicio`, os novos
+    horario: dt_time
+    barras_ciclo: Barras = None    # candles de ciclo do terminal, quando não dá para montá-los dos principais
+    desde_inicio: bool = True
+    fechamento: int = None         # com ele os candles terminam no que acabou de fechar; sem, o último está em formação
+    arquivar: bool = False         # grava os candles fechados no arquivo local (bar_archive), lido pelo painel
+    n_candles_analise: int = 300
+    n_candles_ciclo: int = 500
+    indice_sinais: object = None
+    gravar_sinal: bool = True
+    duracao_dados: float = 0.0
+
+
+@dataclass
+class ResultadoAnalise:
+    simbolo: str
+    sinal: dict = field(default_factory=dict)
+    erro: Optional[str] = None
+    duracao_dados: float = 0.0
+    duracao_analise: float = 0.0
+    etapas: dict = field(default_factory=dict)
+    motivo_rejeicao: Optional[str] = None
+
+    @property
+    def duracao_total(self) -> float:
+        return self.duracao_dados + self.duracao_analise
+
+
+# ================================
+# 🧠 ESTADO INCREMENTAL POR ATIVO
+# ================================
+
+def ciclo_derivado(config) -> bool:
+    """O timeframe de ciclo é montado a partir dos candles principais (múltiplo deles)."""
+    return ResamplerMultiTimeframe(config.simbolo, config.timeframe).suporta(config.timeframe_ciclo)
+
+
+def quantidade_base(config, n_candles_analise: int, n_candles_ciclo: int) -> int:
+    """Candles principais a buscar para a análise e, se derivado, para o timeframe de ciclo."""
+    if not ciclo_derivado(config):
+        return n_candles_analise
+    # +1 candle maior para compensar um primeiro candle parcial descartado
+    proporcao = segundos_timeframe(config.timeframe_ciclo) // segundos_timeframe(config.timeframe)
+    return max(n_candles_analise, (n_candles_ciclo + 1) * proporcao)
+
+
+def chave_estado(config) -> tuple:
+    # Parâmetros dos pivôs na chave: uma configuração nova recomeça o estado
+    return (config.timeframe, config.timeframe_ciclo, config.grupo_candles, config.distancia_pivo)
+
+
+class EstadoAusente(Exception):
+    """Candles novos sem o histórico anterior no processo (ex.: processo do pool reiniciado)."""
+
+
+class EstadoAtivo:
+    """
+    Candles recebidos, timeframe de ciclo, indicadores e pivôs de um ativo,
+    mantidos entre ciclos no processo que o analisa. Recebe só os candles novos.
+    """
+
+    def __init__(self, tarefa: TarefaAnalise):
+        config = tarefa.config
+        self.chave = chave_estado(config)
+        self.n_candles_analise = tarefa.n_candles_analise
+        self.n_candles_ciclo = tarefa.n_candles_ciclo
+        self.n_base = quantidade_base(config, tarefa.n_candles_analise, tarefa.n_candles_ciclo)
+        self.timeframe_ciclo = config.timeframe_ciclo
+        self.resampler = ResamplerMultiTimeframe(config.simbolo, config.timeframe, max_barras=tarefa.n_candles_ciclo)
+        self.derivar_ciclo = self.resampler.suporta(config.timeframe_ciclo)
+        self.indicadores = IndicadoresIncrementais(config.simbolo, config.timeframe)
+        self.pivos = PivotTracker(grupo_candles=config.grupo_candles, distancia_minima=config.distancia_pivo)
+        self.barras = Barras.vazia()
+        self.barras_ciclo = Barras.vazia()
+
+    @staticmethod
+    def _juntar(atuais: Barras, novas: Barras, desde_inicio: bool, maximo: int) -> Barras:
+        if desde_inicio:
+            return novas.ultimas(maximo)
+        if novas is None or novas.vazio:
+            return atuais
+        # As novas começam pelo último candle já recebido (revisado, se estava em formação)
+        posicao = atuais.posicao(int(novas.tempo[0]))
+        if posicao == len(atuais) or atuais.tempo[posicao] != novas.tempo[0]:
+            raise EstadoAusente("Candles novos sem o histórico anterior neste processo")
+        return Barras.concatenar([atuais[:posicao], novas]).ultimas(maximo)
+
+    def receber(self, tarefa: TarefaAnalise) -> tuple:
+        """Acrescenta os candles da tarefa e devolve (candles principais, candles de ciclo) da análise."""
+        self.barras = self._juntar(self.barras, tarefa.barras, tarefa.desde_inicio, self.n_base)
+        if self.derivar_ciclo:
+            self.resampler.atualizar(self.barras, timeframes=[self.timeframe_ciclo])
+            ciclo = self.resampler.obter(self.timeframe_ciclo, self.n_candles_ciclo)
+        else:
+            self.barras_ciclo = self._juntar(self.barras_ciclo, tarefa.barras_ciclo, tarefa.desde_inicio,
+                                             self.n_candles_ciclo)
+            ciclo = self.barras_ciclo
+        return self.barras.ultimas(self.n_candles_analise), ciclo
+
+
+# Por processo (ou compartilhado pelas threads): ativo -> EstadoAtivo
+_estados_ativos = {}
+_arquivo_barras = None
+
+
+def _arquivar_candles(tarefa: TarefaAnalise, barras: Barras):
+    # Cada ativo é gravado só pelo processo que o analisa; o painel desenha o gráfico a partir daqui
+    global _arquivo_barras
+    if _arquivo_barras is None:
+        _arquivo_barras = ArquivoBarras()
+    try:
+        _arquivo_barras.acrescentar(tarefa.config.simbolo, tarefa.config.timeframe,
+                                    barras if tarefa.fechamento is not None else barras[:-1])
+    except Exception as e:
+        Logger.aviso(f"⚠️ Falha ao arquivar candles de {tarefa.config.simbolo}: {e}")
+
+
+def _estado_do_ativo(tarefa: TarefaAnalise) -> EstadoAtivo:
+    simbolo = tarefa.config.simbolo
+    estado = _estados_ativos.get(simbolo)
+    if estado is None or estado.chave != chave_estado(tarefa.config):
+        if not tarefa.desde_inicio:
+            raise EstadoAusente(f"Sem estado de {simbolo} neste processo")
+        estado = _estados_ativos[simbolo] = EstadoAtivo(tarefa)
+    return estado
+
+
+def analisar_ativo(tarefa: TarefaAnalise) -> ResultadoAnalise:
+    # Função de módulo para poder ser enviada a um ProcessPoolExecutor
+    simbolo = tarefa.config.simbolo
+    inicio = time.perf_counter()
+    etapas = {}
+    try:
+        with Logger.contexto(simbolo):
+            estado = _estado_do_ativo(tarefa)
+            with cronometrar(etapas, 'montar_candles'):
+                df_principal, df_ciclo = estado.receber(tarefa)
+            if df_principal.vazio:
+                raise ValueError("Dados insuficientes (candles principais)")
+            if df_ciclo.vazio:
+                raise ValueError("Dados insuficientes (candles de ciclo)")
+            if tarefa.arquivar:
+                with cronometrar(etapas, 'arquivo_candles'):
+                    _arquivar_candles(tarefa, df_principal)
+            with cronometrar(etapas, 'sincronizar_indicadores'):
+                estado.indicadores.sincronizar(df_principal)
+            with cronometrar(etapas, 'sincronizar_pivos'):
+                estado.pivos.sincronizar(df_ciclo)
+
+            analista = MarketAnalyst(df_principal, df_ciclo, simbolo,
+                                     indicadores=estado.indicadores, pivos=estado.pivos,
+                                     indice_sinais=tarefa.indice_sinais, gravar_sinal=tarefa.gravar_sinal)
+            sinal = analista.gerar_sinal_detalhado(tarefa.config, tarefa.horario)
+        etapas.update(analista.tempos)
+        return ResultadoAnalise(simbolo, sinal=sinal, duracao_dados=tarefa.duracao_dados,
+                                duracao_analise=time.perf_counter() - inicio,
+                                etapas=etapas, motivo_rejeicao=analista.motivo_rejeicao)
+    except Exception as e:
+        # Estado possivelmente pela metade: o próximo envio completo recomeça do zero
+        _estados_ativos.pop(simbolo, None)
+        return ResultadoAnalise(simbolo, erro=str(e), duracao_dados=tarefa.duracao_dados,
+                                duracao_analise=time.perf_counter() - inicio)
+
+
+def _novas_desde(barras: Barras, tempo) -> Optional[Barras]:
+    """Candles a partir de `tempo` (inclusive); None se `tempo` não está em `barras`."""
+    if barras is None or tempo is None:
+        return barras
+    posicao = barras.posicao(tempo)
+    if posicao == len(barras) or barras.tempo[posicao] != tempo:
+        return None
+    return barras[posicao:]
+
+
+def _ultimo_tempo(barras: Barras):
+    return int(barras.tempo[-1]) if barras is not None and not barras.vazio else None
+
+
+class ExecutorEstrategias:
+    """
+    Executa a análise por ativo em série, em threads ou em processos.
+
+    O chamador só busca os candles (a conexão com o MT5 é única e serializada);
+    a montagem do timeframe de ciclo, os indicadores, os pivôs, os filtros e a
+    gravação no arquivo local rodam no pool, com o estado incremental de cada ativo guardado onde ele é analisado.
+    No modo "process" cada ativo vai sempre para o mesmo processo, que recebe só
+    os candles novos desde o ciclo anterior. Os resultados voltam na mesma ordem
+    das tarefas e o erro de um ativo não interrompe os demais.
+    """
+
+    def __init__(self, modo: str = "serial", max_workers: int = None):
+        if modo not in MODOS_EXECUCAO:
+            raise ValueError(f"Modo de execução inválido: {modo} (use um de {MODOS_EXECUCAO})")
+        self.modo = modo
+        self.max_workers = max_workers
+        self._pool = None
+        # Modo "process": um processo por posição, ativo -> posição e o que ele já recebeu
+        self._processos = []
+        self._afinidade = {}
+        self._enviado = {}
+
+    def _obter_pool(self):
+        if self._pool is None and self.modo == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="estrategia")
+        return self._pool
+
+    def _obter_processo(self, simbolo: str):
+        if not self._processos:
+            self._processos = [None] * (self.max_workers or os.cpu_count() or 1)
+        posicao = self._afinidade.setdefault(simbolo, len(self._afinidade) % len(self._processos))
+        if self._processos[posicao] is None:
+            self._processos[posicao] = ProcessPoolExecutor(max_workers=1)
+        return self._processos[posicao]
+
+    def _para_envio(self, tarefa: TarefaAnalise) -> TarefaAnalise:
+        """Só os candles que o processo do ativo ainda não tem (ou tudo, se ele não tem nada)."""
+        simbolo = tarefa.config.simbolo
+        chave = chave_estado(tarefa.config)
+        anterior = self._enviado.get(simbolo)
+        self._enviado[simbolo] = (chave, _ultimo_tempo(tarefa.barras), _ultimo_tempo(tarefa.barras_ciclo))
+        if anterior is None or anterior[0] != chave:
+            return replace(tarefa, desde_inicio=True)
+        barras = _novas_desde(tarefa.barras, anterior[1])
+        barras_ciclo = _novas_desde(tarefa.barras_ciclo, anterior[2])
+        if barras is None or (tarefa.barras_ciclo is not None and barras_ciclo is None):
+            return replace(tarefa, desde_inicio=True)
+        return replace(tarefa, barras=barras, barras_ciclo=barras_ciclo, desde_inicio=False)
+
+    def _esquecer_processo(self, simbolo: str):
+        # Processo morto: ele e os demais ativos dele recomeçam com histórico completo
+        posicao = self._afinidade.get(simbolo)
+        if posicao is not None and self._processos[posicao] is not None:
+            self._processos[posicao].shutdown(wait=False, cancel_futures=True)
+            self._processos[posicao] = None
+        for outro, posicao_outro in self._afinidade.items():
+            if posicao_outro == posicao:
+                self._enviado.pop(outro, None)
+
+    def executar(self, tarefas: List[TarefaAnalise]) -> List[ResultadoAnalise]:
+        if self.modo == "serial" or (self.modo == "thread" and len(tarefas) <= 1):
+            return [analisar_ativo(tarefa) for tarefa in tarefas]
+
+        if self.modo == "process":
+            futuros = [self._obter_processo(t.config.simbolo).submit(analisar_ativo, self._para_envio(t))
+                       for t in tarefas]
+        else:
+            pool = self._obter_pool()
+            futuros = [pool.submit(analisar_ativo, tarefa) for tarefa in tarefas]
+
+        resultados = []
+        for tarefa, futuro in zip(tarefas, futuros):
+            simbolo = tarefa.config.simbolo
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                # Falha do próprio pool (ex.: processo filho morto ou tarefa não serializável)
+                if isinstance(e, BrokenExecutor):
+                    if self.modo == "process":
+                        self._esquecer_processo(simbolo)
+                    else:
+                        self._pool = None
+                resultado = ResultadoAnalise(simbolo, erro=f"{type(e).__name__}: {e}",
+                                             duracao_dados=tarefa.duracao_dados)
+            if resultado.erro:
+                # O processo descartou o estado do ativo: o próximo envio leva o histórico todo
+                self._enviado.pop(simbolo, None)
+            resultados.append(resultado)
+        return resultados
+
+    def encerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        for processo in self._processos:
+            if processo is not None:
+                processo.shutdown(wait=True)
+        self._processos = []
+        self._afinidade.clear()
+        self._enviado.clear()
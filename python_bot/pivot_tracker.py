@@ -0,0 +1,170 @@
+from bisect import bisect_left
+from collections import deque
+from bars import Barras
+from indicators import IndicatorCalculator
+
+
+def _topo_superado(antigo: float, novo: float) -> bool:
+    return antigo <= novo
+
+
+def _fundo_superado(antigo: float, novo: float) -> bool:
+    return antigo >= novo
+
+
+class LadoPivos:
+    """
+    Topos ou fundos confirmados, em ordem cronológica, mais o pivô provisório
+    que depende do candle em formação.
+
+    Além da lista cronológica, mantém uma "escada" monotônica: só ficam nela os
+    pivôs que não foram superados por um pivô mais recente e mais extremo. Assim
+    "o pivô mais recente além do preço P" vira uma bisseção na escada.
+    """
+
+    def __init__(self, dominado):
+        # dominado(preco_antigo, preco_novo) -> o antigo nunca mais será o mais recente válido
+        self._dominado = dominado
+        self._itens = []
+        self._escada = []
+        self.provisorio = None
+
+    def adicionar(self, tempo, preco):
+        self._itens.append((tempo, preco))
+        while self._escada and self._dominado(self._escada[-1][1], preco):
+            self._escada.pop()
+        self._escada.append((tempo, preco))
+
+    def descartar_antes(self, tempo):
+        del self._itens[:bisect_left(self._itens, tempo, key=lambda item: item[0])]
+        del self._escada[:bisect_left(self._escada, tempo, key=lambda item: item[0])]
+
+    def limpar(self):
+        self._itens.clear()
+        self._escada.clear()
+        self.provisorio = None
+
+    def __len__(self):
+        return len(self._itens) + (self.provisorio is not None)
+
+    def __getitem__(self, i):
+        total = len(self)
+        if i < 0:
+            i += total
+        if not 0 <= i < total:
+            raise IndexError("índice de pivô fora do intervalo")
+        if i == len(self._itens):
+            return self.provisorio
+        return self._itens[i]
+
+    def __iter__(self):
+        yield from self._itens
+        if self.provisorio is not None:
+            yield self.provisorio
+
+    def mais_recente(self, valido):
+        """Pivô mais recente cujo preço satisfaz `valido` (monotônico ao longo da escada)."""
+        if self.provisorio is not None and valido(self.provisorio[1]):
+            return self.provisorio
+
+        # Na escada, `valido` é verdadeiro num prefixo: busca o fim desse prefixo
+        inicio, fim = 0, len(self._escada)
+        while inicio < fim:
+            meio = (inicio + fim) // 2
+            if valido(self._escada[meio][1]):
+                inicio = meio + 1
+            else:
+                fim = meio
+        return self._escada[inicio - 1] if inicio > 0 else None
+
+
+class PivotTracker:
+    """
+    Pivôs de um par (símbolo, timeframe) confirmados à medida que os candles fecham.
+
+    Um pivô no candle i só é confirmado quando o candle i + grupo_candles fecha.
+    O pivô que depende do candle em formação fica como provisório e é refeito a
+    cada sincronização, reproduzindo o resultado de detectar_pivos sobre o mesmo
+    DataFrame.
+    """
+
+    def __init__(self, grupo_candles: int = 3, distancia_minima: float = 0.0005):
+        self.grupo_candles = grupo_candles
+        self.distancia_minima = distancia_minima
+        # Funções de módulo (e não lambdas) para o tracker poder ir a outro processo
+        self.topos = LadoPivos(dominado=_topo_superado)
+        self.fundos = LadoPivos(dominado=_fundo_superado)
+        self._janela = deque(maxlen=2 * grupo_candles + 1)
+        self.ultimo_fechado = None
+
+    def _avaliar(self, janela):
+        n = self.grupo_candles
+        tempo, high, low = janela[n]
+        _, high_ant, low_ant = janela[n - 1]
+        _, high_prox, low_prox = janela[n + 1]
+
+        topo = fundo = None
+        if high == max(b[1] for b in janela) and high - max(high_ant, high_prox) >= self.distancia_minima:
+            topo = (tempo, high)
+        if low == min(b[2] for b in janela) and min(low_ant, low_prox) - low >= self.distancia_minima:
+            fundo = (tempo, low)
+        return topo, fundo
+
+    def _fechar(self, tempo, high, low):
+        self._janela.append((tempo, high, low))
+        self.ultimo_fechado = tempo
+        if len(self._janela) == self._janela.maxlen:
+            topo, fundo = self._avaliar(self._janela)
+            if topo:
+                self.topos.adicionar(*topo)
+            if fundo:
+                self.fundos.adicionar(*fundo)
+
+    def _semear(self, fechados: Barras):
+        self.topos.limpar()
+        self.fundos.limpar()
+        self._janela.clear()
+        self.ultimo_fechado = None
+
+        tempo = fechados.tempo
+        high = fechados.high.astype(float, copy=False)
+        low = fechados.low.astype(float, copy=False)
+        idx_topos, idx_fundos = IndicatorCalculator._indices_pivos(
+            high, low, self.grupo_candles, self.distancia_minima)
+        for i in idx_topos:
+            self.topos.adicionar(int(tempo[i]), float(high[i]))
+        for i in idx_fundos:
+            self.fundos.adicionar(int(tempo[i]), float(low[i]))
+
+        cauda = fechados.ultimas(self._janela.maxlen - 1)
+        self._janela.extend(zip(cauda.tempo.tolist(), cauda.high.tolist(), cauda.low.tolist()))
+        if len(fechados):
+            self.ultimo_fechado = int(tempo[-1])
+
+    def sincronizar(self, dados):
+        """
+        Processa os candles fechados novos de `dados` (Barras ou DataFrame); o
+        último candle é o em formação. Os tempos dos pivôs ficam em segundos.
+        """
+        barras = Barras.de(dados)
+        if barras.vazio:
+            return
+        fechados = barras[:-1]
+
+        inicio = fechados.posicao(self.ultimo_fechado) if self.ultimo_fechado is not None else len(fechados)
+        if inicio == len(fechados) or fechados.tempo[inicio] != self.ultimo_fechado:
+            self._semear(fechados)
+        else:
+            novos = fechados[inicio + 1:]
+            for tempo, high, low in zip(novos.tempo.tolist(), novos.high.tolist(), novos.low.tolist()):
+                self._fechar(tempo, high, low)
+            # Mantém só os pivôs que detectar_pivos enxergaria nestes mesmos candles
+            limite = int(barras.tempo[min(self.grupo_candles, len(barras) - 1)])
+            self.topos.descartar_antes(limite)
+            self.fundos.descartar_antes(limite)
+
+        self.topos.provisorio = self.fundos.provisorio = None
+        if len(self._janela) >= self._janela.maxlen - 1:
+            janela = list(self._janela)[-(self._janela.maxlen - 1):]
+            janela.append((int(barras.tempo[-1]), float(barras.high[-1]), float(barras.low[-1])))
+            self.topos.provisorio, self.fundos.provisorio = self._avaliar(janela)
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from bars import Barras
+from timeframes import segundos_timeframe
+
+# Como cada coluna do MT5 é agregada ao montar um candle maior
+AGREGACOES = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'tick_volume': 'sum',
+    'spread': 'min',
+    'real_volume': 'sum',
+}
+
+
+def _reduzir(valores: np.ndarray, cortes: np.ndarray, agregacao: str) -> np.ndarray:
+    if agregacao == 'first':
+        return valores[cortes]
+    if agregacao == 'last':
+        return valores[np.append(cortes[1:], len(valores)) - 1]
+    funcao = {'max': np.maximum, 'min': np.minimum, 'sum': np.add}[agregacao]
+    return funcao.reduceat(valores, cortes)
+
+
+def _agregar(tempos: np.ndarray, colunas: dict, segundos: int):
+    """Baldes de `segundos` sobre `tempos` (segundos) e as colunas reduzidas por balde."""
+    baldes = tempos // segundos * segundos
+    cortes = np.flatnonzero(np.r_[True, baldes[1:] != baldes[:-1]])
+    reduzidas = {
+        coluna: _reduzir(colunas[coluna], cortes, agregacao)
+        for coluna, agregacao in AGREGACOES.items() if coluna in colunas
+    }
+    return baldes[cortes], reduzidas, tempos[0] != baldes[0]
+
+
+def reamostrar(df_base: pd.DataFrame, timeframe: int, descartar_parcial: bool = True) -> pd.DataFrame:
+    """
+    Monta candles de `timeframe` a partir de candles menores já indexados por tempo.
+
+    Os limites seguem o MT5: cada candle começa num múltiplo exato da duração do
+    timeframe no horário do servidor (M30 em :00 e :30, H4 em 00h, 04h, ...). O
+    primeiro candle é descartado quando o histórico começa no meio dele.
+    """
+    if df_base.empty:
+        return df_base.iloc[:0]
+
+    tempos = df_base.index.values.astype('datetime64[s]').astype(np.int64)
+    inicios, colunas, parcial = _agregar(tempos, {c: df_base[c].to_numpy() for c in df_base.columns},
+                                         segundos_timeframe(timeframe))
+    indice = pd.DatetimeIndex(pd.to_datetime(inicios, unit='s'), name=df_base.index.name)
+    df = pd.DataFrame(colunas, index=indice)
+
+    if descartar_parcial and parcial:
+        df = df.iloc[1:]
+    return df
+
+
+def reamostrar_barras(base: Barras, timeframe: int, descartar_parcial: bool = True) -> Barras:
+    """Mesmo que `reamostrar`, direto sobre os arrays de `Barras`."""
+    if base.vazio:
+        return base
+    inicios, colunas, parcial = _agregar(base.tempo, {c: base.coluna(c) for c in base.colunas},
+                                         segundos_timeframe(timeframe))
+    barras = Barras(inicios, colunas)
+    return barras[1:] if descartar_parcial and parcial else barras
+
+
+class ResamplerMultiTimeframe:
+    """
+    Timeframes maiores (M15/M30/H1/H4) de um símbolo derivados dos candles base.
+
+    A cada atualização só os candles maiores afetados pelos candles base novos
+    (ou pela revisão do candle em formação) são recalculados; o restante é reaproveitado.
+    """
+
+    def __init__(self, simbolo: str, timeframe_base: int, max_barras: int = 1000):
+        self.simbolo = simbolo
+        self.timeframe_base = timeframe_base
+        self.max_barras = max_barras
+        self._frames = {}
+        self._ultimo_base = None
+
+    def suporta(self, timeframe: int) -> bool:
+        base = segundos_timeframe(self.timeframe_base)
+        destino = segundos_timeframe(timeframe)
+        return destino > base and destino % base == 0
+
+    def atualizar(self, base, timeframes=()):
+        """`base`: Barras (ou DataFrame) do timeframe base, em ordem cronológica."""
+        for timeframe in timeframes:
+            if timeframe not in self._frames:
+                if not self.suporta(timeframe):
+                    raise ValueError(f"Timeframe {timeframe} não é múltiplo do timeframe base {self.timeframe_base}")
+                self._frames[timeframe] = None
+
+        base = Barras.de(base)
+        if base.vazio:
+            return
+
+        for timeframe, atual in self._frames.items():
+            segundos = segundos_timeframe(timeframe)
+            inicio = None
+            if atual is not None and not atual.vazio and self._ultimo_base is not None:
+                # Primeiro candle maior afetado: o que contém o último candle base processado
+                # (ou o último recebido agora, se a base voltou atrás, ex.: cortada no fechamento)
+                inicio = min(self._ultimo_base, int(base.tempo[-1])) // segundos * segundos
+                if inicio < base.tempo[0]:
+                    inicio = None
+
+            if inicio is None:
+                self._frames[timeframe] = reamostrar_barras(base, timeframe).ultimas(self.max_barras)
+            else:
+                novos = reamostrar_barras(base[base.posicao(inicio):], timeframe, descartar_parcial=False)
+                mantidos = atual[:atual.posicao(inicio)]
+                self._frames[timeframe] = Barras.concatenar([mantidos, novos]).ultimas(self.max_barras)
+
+        self._ultimo_base = int(base.tempo[-1])
+
+    def obter(self, timeframe: int, n_barras: int) -> Barras:
+        barras = self._frames.get(timeframe)
+        if barras is None:
+            return Barras.vazia()
+        return barras.ultimas(n_barras)
@@ -0,0 +1,92 @@
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+
+from timeframes import segundos_timeframe
+
+
+class AgendadorFechamentos:
+    """
+    Agenda a avaliação dos ativos logo após o fechamento de cada candle.
+
+    Os horários de fechamento seguem o relógio do servidor MT5, estimado pela
+    diferença entre o horário dos ticks e o relógio local. Ativos cujo próximo
+    fechamento cai no mesmo instante são avaliados juntos num único lote.
+    """
+
+    def __init__(self, carencia: float = 2.0, amostras_relogio: int = 20,
+                 relogio=time.time, dormir=time.sleep):
+        self.carencia = carencia
+        self._relogio = relogio
+        self._dormir = dormir
+        self._amostras = deque(maxlen=amostras_relogio)
+        self._latencias = deque(maxlen=500)
+
+    # ================================
+    # 🕒 RELÓGIO DO SERVIDOR
+    # ================================
+
+    def registrar_hora_servidor(self, hora_servidor: int):
+        """Registra o horário (em segundos) do último tick recebido do servidor."""
+        self._amostras.append(hora_servidor - self._relogio())
+
+    @property
+    def offset_servidor(self) -> float:
+        # Ticks antigos (mercado parado) subestimam o relógio do servidor: vale a maior amostra
+        return max(self._amostras) if self._amostras else 0.0
+
+    def agora_servidor(self) -> float:
+        return self._relogio() + self.offset_servidor
+
+    def para_local(self, hora_servidor: float) -> float:
+        return hora_servidor - self.offset_servidor
+
+    # ================================
+    # 📅 PRÓXIMOS FECHAMENTOS
+    # ================================
+
+    def proximo_fechamento(self, timeframe: int, agora_servidor: float = None) -> int:
+        if agora_servidor is None:
+            agora_servidor = self.agora_servidor()
+        segundos = segundos_timeframe(timeframe)
+        return (int(agora_servidor) // segundos + 1) * segundos
+
+    def proximo_lote(self, timeframes_por_ativo: Dict[str, int]) -> Tuple[int, List[str]]:
+        """Próximo fechamento (horário do servidor) e os ativos que fecham nele."""
+        if not timeframes_por_ativo:
+            return None, []
+        agora = self.agora_servidor()
+        fechamentos = {simbolo: self.proximo_fechamento(tf, agora) for simbolo, tf in timeframes_por_ativo.items()}
+        proximo = min(fechamentos.values())
+        return proximo, [simbolo for simbolo, fechamento in fechamentos.items() if fechamento == proximo]
+
+    def aguardar(self, fechamento: int, limite_local: float = None) -> bool:
+        """
+        Dorme até o fechamento mais a carência. Retorna False se acordou antes
+        por causa de `limite_local` (outro compromisso, ex.: o scanner).
+        """
+        disparo = self.para_local(fechamento) + self.carencia
+        if limite_local is not None and limite_local < disparo:
+            self._dormir(max(0.0, limite_local - self._relogio()))
+            return False
+        self._dormir(max(0.0, disparo - self._relogio()))
+        return True
+
+    # ================================
+    # 📏 LATÊNCIA FECHAMENTO → SINAL
+    # ================================
+
+    def registrar_latencia(self, fechamento: int) -> float:
+        latencia = self._relogio() - self.para_local(fechamento)
+        self._latencias.append(latencia)
+        return latencia
+
+    def estatisticas(self) -> dict:
+        if not self._latencias:
+            return {'sinais': 0, 'latencia_media': 0.0, 'latencia_max': 0.0, 'latencia_ultima': 0.0}
+        return {
+            'sinais': len(self._latencias),
+            'latencia_media': sum(self._latencias) / len(self._latencias),
+            'latencia_max': max(self._latencias),
+            'latencia_ultima': self._latencias[-1],
+        }
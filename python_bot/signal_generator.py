@@ -1,38 +1,31 @@
-import pandas as pd
 from datetime import datetime
-import sqlite3
-import MetaTrader5 as mt5
 
 from strategy import MarketAnalyst
-from symbol_manager import SymbolManager
+from symbol_manager import symbol_manager
 from logger import Logger
 from config import DB_PATH
+from database import obter_banco
+from bar_cache import cache_barras
+from mt5_gateway import gateway_mt5
+from bars import Barras
 
 Logger.configurar()
 
 def obter_ativos_observados(banco_path: str = DB_PATH) -> list:
-    conn = sqlite3.connect(banco_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT simbolo FROM ativos WHERE observando = 1")
-    ativos = [row[0] for row in cursor.fetchall()]
-    conn.close()
+    linhas = obter_banco(banco_path).consultar("SELECT simbolo FROM ativos WHERE observando = 1")
+    ativos = [row[0] for row in linhas]
     return ativos
 
 
-def obter_candles(symbol: str, timeframe: int, barras: int = 1000) -> pd.DataFrame:
-    rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, barras)
-    if rates is None or len(rates) == 0:
-        return pd.DataFrame()
-    df = pd.DataFrame(rates)
-    df['time'] = pd.to_datetime(df['time'], unit='s')
-    return df
+def obter_candles(symbol: str, timeframe: int, barras: int = 1000) -> Barras:
+    return cache_barras.obter_barras(symbol, timeframe, barras)
 
 
 def executar_geracao_sinais():
-    if not mt5.initialize():
+    if not gateway_mt5.initialize():
         return
 
-    symbol_manager = SymbolManager()
+    symbol_manager.atualizar()
     ativos = obter_ativos_observados()
 
     for simbolo in ativos:
@@ -43,7 +36,7 @@ def executar_geracao_sinais():
         df = obter_candles(simbolo, config.timeframe, barras=200)
         df_ciclo = obter_candles(simbolo, config.timeframe_ciclo, barras=200)
 
-        if df.empty or df_ciclo.empty:
+        if df.vazio or df_ciclo.vazio:
             continue
 
         analista = MarketAnalyst(df, df_ciclo, simbolo)
@@ -54,7 +47,7 @@ def executar_geracao_sinais():
         else:
             Logger.info(f"{simbolo}: nenhum sinal gerado")
 
-    mt5.shutdown()
+    gateway_mt5.shutdown()
 
 
 if __name__ == "__main__":
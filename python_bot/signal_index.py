@@ -0,0 +1,84 @@
+import threading
+from datetime import datetime, timedelta
+
+from config import DB_PATH
+from database import obter_banco
+
+STATUS_ATIVOS = ('pendente', 'em_execucao')
+
+
+class IndiceSinais:
+    """
+    Índice em memória dos sinais ativos (pendente / em execução) por (símbolo, direção).
+
+    Guarda o timestamp mais recente de cada par, então a checagem de duplicidade
+    não vai ao banco. O índice é recarregado quando `PRAGMA data_version` indica
+    que outra conexão (EA, scanner, processo do pool) alterou o arquivo; os sinais
+    gravados por este processo entram direto via `registrar`.
+    """
+
+    def __init__(self, caminho_banco: str = DB_PATH):
+        self.caminho_banco = caminho_banco
+        self._ativos = {}
+        self._versao = None
+        self._conn = None
+        self._lock = threading.Lock()
+        self.recargas = 0
+
+    # Vai junto com as tarefas para processos do pool como um retrato do último sincronizar()
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado['_conn'] = None
+        estado['_lock'] = None
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.Lock()
+
+    def _conexao(self):
+        # Conexão própria: data_version só muda para commits de outras conexões
+        if self._conn is None:
+            self._conn = obter_banco(self.caminho_banco).nova_conexao()
+        return self._conn
+
+    def _recarregar(self, conn):
+        linhas = conn.execute(f"""
+            SELECT simbolo, direcao, MAX(timestamp) FROM sinais
+            WHERE status IN ({', '.join('?' * len(STATUS_ATIVOS))})
+            GROUP BY simbolo, direcao
+        """, STATUS_ATIVOS).fetchall()
+        self._ativos = {(simbolo, direcao): ts for simbolo, direcao, ts in linhas if ts}
+        self.recargas += 1
+
+    def sincronizar(self) -> bool:
+        """Recarrega se o banco mudou desde a última chamada. Retorna True se recarregou."""
+        with self._lock:
+            conn = self._conexao()
+            versao = conn.execute("PRAGMA data_version").fetchone()[0]
+            if versao == self._versao:
+                return False
+            self._recarregar(conn)
+            self._versao = versao
+            return True
+
+    def repetido(self, simbolo: str, direcao: str, horas: int = 1) -> bool:
+        ultimo = self._ativos.get((simbolo, direcao))
+        if ultimo is None:
+            return False
+        # Mesma comparação de strings ISO que a consulta SQL original
+        return ultimo >= (datetime.now() - timedelta(hours=horas)).isoformat()
+
+    def registrar(self, sinal: dict):
+        if sinal.get('status') not in STATUS_ATIVOS:
+            return
+        chave = (sinal['simbolo'], sinal['direcao'])
+        with self._lock:
+            if sinal['timestamp'] > self._ativos.get(chave, ''):
+                self._ativos[chave] = sinal['timestamp']
+
+    def fechar(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
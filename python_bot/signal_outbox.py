@@ -0,0 +1,210 @@
+"""
+Outbox de sinais entre o Python e os EA_Executor.
+
+Cada sinal pendente gravado também vai para `outbox_sinais` com um `seq`
+crescente, e `outbox_publicado` guarda o último seq por ativo. O consumidor
+(EA_Executor, um por gráfico) primeiro compara esse número com o último que já
+viu — uma leitura pela chave primária — e só então tenta reivindicar o
+pendente mais antigo do ativo com um único UPDATE. Como o SQLite serializa as
+escritas, dois consumidores nunca reivindicam o mesmo sinal; o gatilho
+trg_outbox_reivindicado passa o sinal para 'em_execucao' na mesma instrução.
+
+Simulação com consumidores concorrentes sobre um arquivo:
+    python signal_outbox.py --simbolos EURUSD GBPUSD --consumidores 4 --sinais 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import Manager
+
+from config import DB_PATH
+from database import AGORA_SQL, obter_banco
+
+SQL_INSERIR_SINAL = """
+    INSERT INTO sinais (simbolo, direcao, preco_entrada, sl, tp, status, ciclo, adx, corpo_pct, lote, timestamp,
+                        candle_servidor)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SQL_PUBLICAR = """
+    INSERT INTO outbox_sinais (sinal_id, simbolo, direcao, preco_entrada, sl, tp, lote, publicado_em)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SQL_MARCAR_PUBLICADO = """
+    INSERT INTO outbox_publicado (simbolo, ultimo_seq) VALUES (?, ?)
+    ON CONFLICT (simbolo) DO UPDATE SET ultimo_seq = MAX(ultimo_seq, excluded.ultimo_seq)
+"""
+
+SQL_ULTIMO_PUBLICADO = "SELECT ultimo_seq FROM outbox_publicado WHERE simbolo = ?"
+
+# Mesma instrução do EA_Executor.mq5, que relê a linha pelo `consumidor` em vez de RETURNING
+SQL_REIVINDICAR = f"""
+    UPDATE outbox_sinais
+    SET estado = 'reivindicado', consumidor = ?, reivindicado_em = {AGORA_SQL}
+    WHERE seq = (SELECT seq FROM outbox_sinais WHERE simbolo = ? AND estado = 'pendente' ORDER BY seq LIMIT 1)
+      AND estado = 'pendente'
+    RETURNING seq, sinal_id, direcao, preco_entrada, sl, tp, lote
+"""
+
+
+def linha_sinal(sinal: dict) -> tuple:
+    return (
+        sinal['simbolo'], sinal['direcao'], sinal['preco_entrada'],
+        sinal['sl'], sinal['tp'], sinal['status'], sinal['ciclo'],
+        sinal['adx'], sinal['corpo_pct'], sinal['lote'], sinal['timestamp'],
+        sinal.get('candle_servidor')
+    )
+
+
+def publicar_sinais(conn, sinais: list) -> list:
+    """Grava os sinais e publica os pendentes no outbox. Chame dentro de uma transação."""
+    agora = datetime.now().isoformat()
+    ultimos, seqs = {}, []
+    for sinal in sinais:
+        sinal_id = conn.execute(SQL_INSERIR_SINAL, linha_sinal(sinal)).lastrowid
+        if sinal['status'] != 'pendente':
+            continue
+        seq = conn.execute(SQL_PUBLICAR, (
+            sinal_id, sinal['simbolo'], sinal['direcao'], sinal['preco_entrada'],
+            sinal['sl'], sinal['tp'], sinal['lote'], agora,
+        )).lastrowid
+        ultimos[sinal['simbolo']] = seq
+        seqs.append(seq)
+    conn.executemany(SQL_MARCAR_PUBLICADO, ultimos.items())
+    return seqs
+
+
+class ConsumidorOutbox:
+    """Lado do EA_Executor em Python: mesma sequência de consultas, para testes e simulações."""
+
+    def __init__(self, simbolo: str, nome: str, caminho_banco: str = DB_PATH):
+        self.simbolo = simbolo
+        self.nome = nome
+        self.ultimo_seq_visto = -1
+        self._conn = obter_banco(caminho_banco).nova_conexao()
+        self.verificacoes = 0
+        self.sem_novidade = 0
+        self.reivindicados = 0
+
+    def publicado(self) -> int:
+        linha = self._conn.execute(SQL_ULTIMO_PUBLICADO, (self.simbolo,)).fetchone()
+        return linha[0] if linha else 0
+
+    def buscar(self):
+        """Reivindica o pendente mais antigo do ativo; None se não houver nada novo."""
+        self.verificacoes += 1
+        publicado = self.publicado()
+        if publicado <= self.ultimo_seq_visto:
+            self.sem_novidade += 1
+            return None
+
+        linhas = self._conn.execute(SQL_REIVINDICAR, (self.nome, self.simbolo)).fetchall()
+        if not linhas:
+            # Tudo até `publicado` já foi reivindicado (por este ou outro consumidor)
+            self.ultimo_seq_visto = publicado
+            return None
+        # Sem avançar o último visto: pode haver outros pendentes, buscados na próxima barra
+        self.reivindicados += 1
+        seq, sinal_id, direcao, preco, sl, tp, lote = linhas[0]
+        return {'seq': seq, 'sinal_id': sinal_id, 'direcao': direcao,
+                'preco_entrada': preco, 'sl': sl, 'tp': tp, 'lote': lote}
+
+    def fechar(self):
+        self._conn.close()
+
+
+# ================================
+# 🧪 SIMULAÇÃO CONCORRENTE
+# ================================
+
+def _rodar_consumidor(caminho_banco: str, simbolo: str, nome: str, fim_publicacao, pausa: float) -> dict:
+    consumidor = ConsumidorOutbox(simbolo, nome, caminho_banco)
+    seqs = []
+    while True:
+        # Lido antes da busca: depois do aviso, uma busca vazia garante que nada ficou para trás
+        encerrar = fim_publicacao.is_set()
+        sinal = consumidor.buscar()
+        if sinal is not None:
+            seqs.append(sinal['seq'])
+            continue
+        if encerrar:
+            break
+        time.sleep(pausa)
+    consumidor.fechar()
+    return {'nome': nome, 'simbolo': simbolo, 'seqs': seqs,
+            'verificacoes': consumidor.verificacoes, 'sem_novidade': consumidor.sem_novidade}
+
+
+def _sinal_simulado(simbolo: str, i: int) -> dict:
+    return {'simbolo': simbolo, 'direcao': 'buy' if i % 2 else 'sell', 'preco_entrada': 1.0 + i * 1e-4,
+            'sl': 0.99, 'tp': 1.02, 'status': 'pendente', 'ciclo': 'bull', 'adx': 25.0,
+            'corpo_pct': 0.1, 'lote': 0.01, 'timestamp': datetime.now().isoformat()}
+
+
+def simular(caminho_banco: str, simbolos: list, consumidores: int = 4, sinais: int = 100,
+            lote: int = 5, pausa: float = 0.001) -> dict:
+    """
+    Publica `sinais` por ativo em lotes enquanto `consumidores` processos por
+    ativo disputam o outbox. Confere que cada seq foi reivindicado uma única vez.
+    """
+    banco = obter_banco(caminho_banco)
+    with Manager() as gerente, ProcessPoolExecutor(max_workers=consumidores * len(simbolos)) as pool:
+        fim_publicacao = gerente.Event()
+        futuros = [pool.submit(_rodar_consumidor, caminho_banco, simbolo, f"{simbolo}#{k}", fim_publicacao, pausa)
+                   for simbolo in simbolos for k in range(consumidores)]
+
+        publicados, inicio = [], time.perf_counter()
+        for i in range(0, sinais, lote):
+            with banco.transacao() as conn:
+                publicados += publicar_sinais(conn, [_sinal_simulado(s, j) for s in simbolos
+                                                     for j in range(i, min(i + lote, sinais))])
+            time.sleep(pausa)
+        fim_publicacao.set()
+        resultados = [f.result() for f in futuros]
+        duracao = time.perf_counter() - inicio
+
+    reivindicados = [seq for r in resultados for seq in r['seqs']]
+    pendentes = banco.consultar_um("SELECT COUNT(*) FROM outbox_sinais WHERE estado = 'pendente'")[0]
+    em_execucao = banco.consultar_um("""
+        SELECT COUNT(*) FROM sinais s JOIN outbox_sinais o ON o.sinal_id = s.id
+        WHERE s.status = 'em_execucao'
+    """)[0]
+    return {
+        'publicados': len(publicados),
+        'reivindicados': len(reivindicados),
+        'duplicados': len(reivindicados) - len(set(reivindicados)),
+        'pendentes': pendentes,
+        'sinais_em_execucao': em_execucao,
+        'verificacoes': sum(r['verificacoes'] for r in resultados),
+        'sem_novidade': sum(r['sem_novidade'] for r in resultados),
+        'por_consumidor': {r['nome']: len(r['seqs']) for r in resultados},
+        'duracao': duracao,
+    }
+
+
+def main_simulacao(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Consumidores concorrentes do outbox de sinais num banco temporário")
+    parser.add_argument("--simbolos", nargs="+", default=["EURUSD", "GBPUSD"])
+    parser.add_argument("--consumidores", type=int, default=4, help="processos por ativo")
+    parser.add_argument("--sinais", type=int, default=200, help="sinais publicados por ativo")
+    parser.add_argument("--lote", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    caminho = os.path.join(tempfile.mkdtemp(), "outbox.sqlite")
+    resumo = simular(caminho, args.simbolos, args.consumidores, args.sinais, args.lote)
+    for chave, valor in resumo.items():
+        print(f"   {chave}: {valor}")
+
+    ok = (resumo['duplicados'] == 0 and resumo['pendentes'] == 0
+          and resumo['reivindicados'] == resumo['publicados'] == resumo['sinais_em_execucao'])
+    print("✅ Cada sinal foi reivindicado uma única vez" if ok else "❌ Outbox inconsistente")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_simulacao())
@@ -0,0 +1,85 @@
+import atexit
+import threading
+import time
+from typing import List
+
+from config import DB_PATH
+from database import obter_banco
+from logger import Logger
+from signal_outbox import publicar_sinais
+
+
+class GravadorSinais:
+    """
+    Fila de sinais gravada em lote: sinais e outbox dos EAs numa única transação
+    por descarga, seguido do registro de auditoria em `logs/sinais_processados.log`.
+
+    A descarga acontece no fim de cada lote de avaliação (`descarregar()`) ou,
+    para produtores avulsos, `prazo` segundos após o primeiro sinal enfileirado.
+    Na saída do processo o que restar na fila é gravado (atexit).
+    """
+
+    def __init__(self, caminho_banco: str = DB_PATH, prazo: float = 1.0, indice_sinais=None):
+        self.caminho_banco = caminho_banco
+        self.prazo = prazo
+        self.indice_sinais = indice_sinais
+        self._fila: List[dict] = []
+        self._lock = threading.Lock()
+        self._timer = None
+        self.lotes = 0
+        self.sinais_gravados = 0
+        self.maior_lote = 0
+        self.latencia_ultima = 0.0
+        self.latencia_max = 0.0
+        atexit.register(self.descarregar)
+
+    def adicionar(self, sinal: dict):
+        with self._lock:
+            self._fila.append(sinal)
+            if self._timer is None and self.prazo is not None:
+                self._timer = threading.Timer(self.prazo, self.descarregar)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def descarregar(self) -> int:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            sinais, self._fila = self._fila, []
+            if not sinais:
+                return 0
+
+            inicio = time.perf_counter()
+            try:
+                with obter_banco(self.caminho_banco).transacao() as conn:
+                    publicar_sinais(conn, sinais)
+            except Exception as e:
+                # Mantém os sinais na fila para a próxima descarga
+                self._fila = sinais + self._fila
+                Logger.erro(f"❌ Erro ao gravar {len(sinais)} sinais: {e}")
+                return 0
+
+            Logger.registrar_sinais_processados(sinais)
+            if self.indice_sinais is not None:
+                for sinal in sinais:
+                    self.indice_sinais.registrar(sinal)
+
+            latencia = time.perf_counter() - inicio
+            self.lotes += 1
+            self.sinais_gravados += len(sinais)
+            self.maior_lote = max(self.maior_lote, len(sinais))
+            self.latencia_ultima = latencia
+            self.latencia_max = max(self.latencia_max, latencia)
+            return len(sinais)
+
+    def estatisticas(self) -> dict:
+        return {
+            'lotes': self.lotes,
+            'sinais_gravados': self.sinais_gravados,
+            'media_por_lote': self.sinais_gravados / self.lotes if self.lotes else 0.0,
+            'maior_lote': self.maior_lote,
+            'latencia_ultima_ms': self.latencia_ultima * 1000,
+            'latencia_max_ms': self.latencia_max * 1000,
+            'na_fila': len(self._fila),
+        }
@@ -1,10 +1,13 @@
-import sqlite3
 from datetime import datetime, timedelta
-import pandas as pd
 
+from bars import Barras
 from indicators import IndicatorCalculator
+from pivot_tracker import PivotTracker
 from logger import Logger
-from config import DB_PATH
+from config import DB_PATH, METRICAS_HABILITADAS
+from database import obter_banco
+from metrics import cronometrar
+from signal_outbox import publicar_sinais
 
 Logger.configurar()
 
@@ -15,16 +18,41 @@ class MarketCycle:
 
 
 class MarketAnalyst:
-    def __init__(self, df: pd.DataFrame, df_ciclo: pd.DataFrame, simbolo: str):
+    def __init__(self, df, df_ciclo, simbolo: str, indicadores=None, pivos: PivotTracker = None,
+                 indice_sinais=None, gravar_sinal: bool = True, registrar_motivos: bool = None):
+        # `df`/`df_ciclo`: Barras (caminho do robô) ou DataFrames indexados por tempo
         self.simbolo = simbolo
         self.df = df
         self.df_ciclo = df_ciclo
+        self.barras = Barras.de(df)
         self.db_path = DB_PATH
-
-        self.adx_data = IndicatorCalculator.calcular_adx(df)
-        self.vwap_df = IndicatorCalculator.calcular_vwap(df)
-        self.vwap_diaria = self.vwap_df['vwap_diaria']
-        self.topos, self.fundos = IndicatorCalculator.detectar_pivos(df_ciclo, janela=500, grupo_candles=3, distancia_minima=0.0005)
+        # Tempos por etapa e motivo de descarte, lidos por quem registra as métricas;
+        # sem métricas ficam vazios (o backtest pede os motivos explicitamente)
+        self.tempos = {}
+        self.motivo_rejeicao = None
+        self.registrar_motivos = METRICAS_HABILITADAS if registrar_motivos is None else registrar_motivos
+
+        with cronometrar(self.tempos, 'indicadores'):
+            self._iniciar_indicadores(self.barras, indicadores)
+        with cronometrar(self.tempos, 'pivos'):
+            if pivos is None:
+                pivos = PivotTracker(grupo_candles=3, distancia_minima=0.0005)
+                pivos.sincronizar(df_ciclo)
+        self.pivos = pivos
+        self.topos, self.fundos = pivos.topos, pivos.fundos
+        self.indice_sinais = indice_sinais
+        # False: o chamador grava o sinal retornado (GravadorSinais, em lote)
+        self.gravar_sinal = gravar_sinal
+
+    def _iniciar_indicadores(self, barras: Barras, indicadores):
+        if indicadores is None:
+            _, _, adx = IndicatorCalculator.adx_barras(barras)
+            self.adx_atual = adx[-1]
+            self.vwap_atual = IndicatorCalculator.vwap_barras(barras)['vwap_diaria'][-1]
+        else:
+            # Indicadores incrementais já sincronizados com `df` (IndicadoresIncrementais)
+            self.adx_atual = indicadores.adx
+            self.vwap_atual = indicadores.vwap_diaria
 
     def identificar_ciclo(self) -> str:
         if len(self.topos) < 3 or len(self.fundos) < 3:
@@ -55,77 +83,84 @@ class MarketAnalyst:
         return MarketCycle.NEUTRO
 
     def _sinal_repetido(self, direcao: str, horas: int = 1) -> bool:
+        if self.indice_sinais is not None:
+            return self.indice_sinais.repetido(self.simbolo, direcao, horas)
+
         limite_tempo = datetime.now() - timedelta(hours=horas)
         limite_str = limite_tempo.isoformat()
 
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT 1 FROM sinais
-                WHERE simbolo = ? AND direcao = ?
-                  AND status IN ('pendente', 'em_execucao')
-                  AND timestamp >= ?
-                LIMIT 1
-            """, (self.simbolo, direcao, limite_str))
-            return cursor.fetchone() is not None
-
-    def verificar_sl(self, direcao: str, preco_atual: float, distancia_minima: float = 0.0005):
+        linha = obter_banco(self.db_path).consultar_um("""
+            SELECT 1 FROM sinais
+            WHERE simbolo = ? AND direcao = ?
+              AND status IN ('pendente', 'em_execucao')
+              AND timestamp >= ?
+            LIMIT 1
+        """, (self.simbolo, direcao, limite_str))
+        return linha is not None
+
+    def verificar_sl(self, direcao: str, preco_atual: float, distancia_minima: float = 0.0005,
+                     relacao_risco_retorno: float = 2.0):
+        # Pivô mais recente além do preço com a distância mínima (bisseção no PivotTracker)
         if direcao == 'buy':
-            candidatos = sorted(
-                [(t, p) for t, p in self.fundos if p < preco_atual],
-                key=lambda x: x[0], reverse=True
-            )
-            for _, fundo in candidatos:
+            pivo = self.fundos.mais_recente(
+                lambda fundo: fundo < preco_atual and preco_atual - fundo >= distancia_minima)
+            if pivo is not None:
+                _, fundo = pivo
                 distancia = preco_atual - fundo
-                if distancia >= distancia_minima:
-                    return {
-                        'sl': round(fundo, 5),
-                        'tp': round(preco_atual + 2 * distancia, 5)
-                    }
+                return {
+                    'sl': round(fundo, 5),
+                    'tp': round(preco_atual + relacao_risco_retorno * distancia, 5)
+                }
 
         elif direcao == 'sell':
-            candidatos = sorted(
-                [(t, p) for t, p in self.topos if p > preco_atual],
-                key=lambda x: x[0], reverse=True
-            )
-            for _, topo in candidatos:
+            pivo = self.topos.mais_recente(
+                lambda topo: topo > preco_atual and topo - preco_atual >= distancia_minima)
+            if pivo is not None:
+                _, topo = pivo
                 distancia = topo - preco_atual
-                if distancia >= distancia_minima:
-                    return {
-                        'sl': round(topo, 5),
-                        'tp': round(preco_atual - 2 * distancia, 5)
-                    }
+                return {
+                    'sl': round(topo, 5),
+                    'tp': round(preco_atual - relacao_risco_retorno * distancia, 5)
+                }
 
         return None
 
     def gerar_sinal_detalhado(self, config, horario_atual: datetime.time) -> dict:
+        with cronometrar(self.tempos, 'gerar_sinal'):
+            return self._gerar_sinal_detalhado(config, horario_atual)
+
+    def _rejeitar(self, motivo: str) -> dict:
+        if self.registrar_motivos:
+            self.motivo_rejeicao = motivo
+        return {}
+
+    def _gerar_sinal_detalhado(self, config, horario_atual: datetime.time) -> dict:
         ciclo = self.identificar_ciclo()
-        adx = round(self.adx_data['ADX'].iloc[-1], 2)
+        adx = round(self.adx_atual, 2)
 
         # Filtro de horário
         if not (config.horario_inicio <= horario_atual <= config.horario_fim):
             Logger.aviso("Fora de horario de operação")
-            return {}
+            return self._rejeitar('horario')
 
         # Filtro de ADX
         if 20 < adx < config.adx_min:
             Logger.aviso("ADX sem força | ADX: {adx}")
-            return {}
+            return self._rejeitar('adx')
 
         # Filtro de corpo
-        candle_atual = self.df.iloc[-1]
-        corpo_pct = abs(candle_atual['close'] - candle_atual['open']) / candle_atual['open'] * 100
+        abertura, preco = float(self.barras.open[-1]), float(self.barras.close[-1])
+        corpo_pct = abs(preco - abertura) / abertura * 100
         if corpo_pct > config.engolfo_pct_max:
             Logger.aviso("Anomalia no mercado (engolfo forte)")
 
-            return {}
+            return self._rejeitar('corpo')
 
         # Filtro de distância VWAP
-        preco = candle_atual['close']
-        vwap = self.vwap_diaria.iloc[-1]
-        if abs(preco - vwap) / vwap > 0.005:
+        vwap = self.vwap_atual
+        if abs(preco - vwap) / vwap > config.distancia_vwap_max:
             Logger.aviso("Preço distante da VWAP | Preço: {preco} | VWAP: {vwap}")
-            return {}
+            return self._rejeitar('distancia_vwap')
 
         # Direção baseada no ciclo
         if ciclo == MarketCycle.BULL:
@@ -133,16 +168,17 @@ class MarketAnalyst:
         elif ciclo == MarketCycle.BEAR:
             direcao = 'sell'
         else:
-            return {}
+            return self._rejeitar('ciclo_neutro')
 
         # Verificar duplicidade
         if self._sinal_repetido(direcao):
-            return {}
+            return self._rejeitar('duplicado')
 
         # SL/TP
-        sl_tp = self.verificar_sl(direcao, preco, distancia_minima=0.0003)
+        sl_tp = self.verificar_sl(direcao, preco, distancia_minima=config.distancia_sl,
+                                  relacao_risco_retorno=config.relacao_risco_retorno)
         if sl_tp is None:
-            return {}
+            return self._rejeitar('sem_sl')
 
         timestamp = datetime.now().isoformat()
         sinal = {
@@ -151,26 +187,22 @@ class MarketAnalyst:
             'preco_entrada': preco,
             'sl': sl_tp['sl'],
             'tp': sl_tp['tp'],
-            'lote': 0.01,
+            'lote': config.lote,
             'ciclo': ciclo,
             'adx': adx,
             'corpo_pct': round(corpo_pct, 2),
             'status': 'pendente',
             'timestamp': timestamp,
+            # Abertura do candle analisado no relógio do servidor MT5 (o mesmo do arquivo histórico)
+            'candle_servidor': str(self.barras.tempos[-1]),
         }
 
-        self.salvar_sinal(sinal)
+        if self.gravar_sinal:
+            self.salvar_sinal(sinal)
         return sinal
 
     def salvar_sinal(self, sinal: dict):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO sinais (simbolo, direcao, preco_entrada, sl, tp, status, ciclo, adx, corpo_pct, lote, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                sinal['simbolo'], sinal['direcao'], sinal['preco_entrada'],
-                sinal['sl'], sinal['tp'], sinal['status'], sinal['ciclo'],
-                sinal['adx'], sinal['corpo_pct'], sinal['lote'], sinal['timestamp']
-            ))
-            conn.commit()
+        with obter_banco(self.db_path).transacao() as conn:
+            publicar_sinais(conn, [sinal])
+        if self.indice_sinais is not None:
+            self.indice_sinais.registrar(sinal)
@@ -0,0 +1,190 @@
+import math
+from collections import deque
+import pandas as pd
+
+from bars import Barras
+
+
+def _dividir(a: float, b: float) -> float:
+    # Mesma semântica da divisão do pandas: x/0 -> ±inf e 0/0 -> NaN
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def _soma_janela(valores: deque, periodo: int) -> float:
+    # Soma das últimas `periodo` entradas; NaN se a janela ainda não está completa
+    if len(valores) < periodo:
+        return math.nan
+    janela = list(valores)[-periodo:]
+    if any(math.isnan(v) for v in janela):
+        return math.nan
+    return sum(janela)
+
+
+class ADXIncremental:
+    """ADX/DI com médias móveis simples, equivalente a IndicatorCalculator.calcular_adx."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        # Uma posição a mais em cada janela permite revisar o último candle
+        self._barras = deque(maxlen=2)
+        self._tr = deque(maxlen=period + 1)
+        self._mais_dm = deque(maxlen=period + 1)
+        self._menos_dm = deque(maxlen=period + 1)
+        self._dx = deque(maxlen=period + 1)
+        self.mais_di = math.nan
+        self.menos_di = math.nan
+        self.adx = math.nan
+
+    def atualizar(self, high: float, low: float, close: float, nova_barra: bool = True):
+        if not nova_barra and self._barras:
+            for janela in (self._barras, self._tr, self._mais_dm, self._menos_dm, self._dx):
+                janela.pop()
+
+        if self._barras:
+            high_ant, low_ant, close_ant = self._barras[-1]
+            tr = max(high - low, max(abs(high - close_ant), abs(low - close_ant)))
+            subida = high - high_ant
+            descida = low_ant - low
+            mais_dm = max(subida, 0) if subida > descida else 0.0
+            menos_dm = max(descida, 0) if descida > subida else 0.0
+        else:
+            # Primeiro candle: sem fechamento anterior, TR fica indefinido como no batch
+            tr, mais_dm, menos_dm = math.nan, 0.0, 0.0
+
+        self._barras.append((high, low, close))
+        self._tr.append(tr)
+        self._mais_dm.append(float(mais_dm))
+        self._menos_dm.append(float(menos_dm))
+
+        tr_suave = _soma_janela(self._tr, self.period)
+        self.mais_di = 100 * _dividir(_soma_janela(self._mais_dm, self.period), tr_suave)
+        self.menos_di = 100 * _dividir(_soma_janela(self._menos_dm, self.period), tr_suave)
+        dx = 100 * _dividir(abs(self.mais_di - self.menos_di), self.mais_di + self.menos_di)
+        self._dx.append(dx)
+        self.adx = _dividir(_soma_janela(self._dx, self.period), self.period)
+
+        return self.mais_di, self.menos_di, self.adx
+
+
+class VWAPIncremental:
+    """VWAP diária e semanal acumuladas, equivalente a IndicatorCalculator.calcular_vwap."""
+
+    def __init__(self):
+        self._estado = (None, 0.0, 0.0, None, 0.0, 0.0)
+        self._estado_anterior = self._estado
+        self.vwap_diaria = math.nan
+        self.vwap_semanal = math.nan
+
+    def atualizar(self, tempo: int, high: float, low: float, close: float,
+                  tick_volume: float, volume: float = 0, nova_barra: bool = True):
+        """`tempo` em segundos (horário do servidor, como no MT5)."""
+        if nova_barra:
+            self._estado_anterior = self._estado
+        dia, tpv_dia, vol_dia, semana, tpv_semana, vol_semana = self._estado_anterior
+
+        vol = float(tick_volume if tick_volume > 0 else volume)
+        tpv = (high + low + close) / 3 * vol
+
+        data = tempo // 86400
+        # 1970-01-01 foi uma quinta-feira; semanas começam na segunda
+        inicio_semana = data - (data + 3) % 7
+        if data != dia:
+            dia, tpv_dia, vol_dia = data, 0.0, 0.0
+        if inicio_semana != semana:
+            semana, tpv_semana, vol_semana = inicio_semana, 0.0, 0.0
+
+        tpv_dia += tpv
+        vol_dia += vol
+        tpv_semana += tpv
+        vol_semana += vol
+        self._estado = (dia, tpv_dia, vol_dia, semana, tpv_semana, vol_semana)
+
+        self.vwap_diaria = tpv_dia / vol_dia if vol_dia > 0 else math.nan
+        self.vwap_semanal = tpv_semana / vol_semana if vol_semana > 0 else math.nan
+        return self.vwap_diaria, self.vwap_semanal
+
+
+class IndicadoresIncrementais:
+    """
+    Indicadores de um par (símbolo, timeframe) mantidos entre ciclos.
+
+    É semeado uma vez com o histórico e depois atualizado em O(1) a cada candle
+    novo ou revisão do candle em formação, em vez de recalcular tudo.
+    """
+
+    COLUNAS = ['+DI', '-DI', 'ADX', 'vwap_diaria', 'vwap_semanal']
+
+    def __init__(self, simbolo: str, timeframe: int, period: int = 14, historico: int = 500):
+        self.simbolo = simbolo
+        self.timeframe = timeframe
+        self.period = period
+        self._historico = deque(maxlen=historico)
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._adx = ADXIncremental(self.period)
+        self._vwap = VWAPIncremental()
+        self._historico.clear()
+        self.ultimo_tempo = None
+
+    def _aplicar(self, tempo: int, high: float, low: float, close: float, tick_volume: float, volume: float,
+                 nova_barra: bool):
+        mais_di, menos_di, adx = self._adx.atualizar(high, low, close, nova_barra)
+        vwap_diaria, vwap_semanal = self._vwap.atualizar(tempo, high, low, close, tick_volume, volume, nova_barra)
+
+        if not nova_barra:
+            self._historico.pop()
+        self._historico.append((tempo, mais_di, menos_di, adx, vwap_diaria, vwap_semanal))
+        self.ultimo_tempo = tempo
+
+    def _linhas(self, barras: Barras, inicio: int = 0):
+        # tolist() converte cada coluna de uma vez para tipos Python
+        fatia = barras[inicio:]
+        return zip(fatia.tempo.tolist(), fatia.high.tolist(), fatia.low.tolist(), fatia.close.tolist(),
+                   fatia.tick_volume.tolist(), fatia.coluna('volume').tolist())
+
+    def atualizar(self, tempo: int, high: float, low: float, close: float, tick_volume: float, volume: float = 0):
+        """Aplica um candle (tempo em segundos): revisa o candle em formação ou abre um novo."""
+        if self.ultimo_tempo is not None and tempo < self.ultimo_tempo:
+            raise ValueError(f"Candle fora de ordem para {self.simbolo}: {tempo} < {self.ultimo_tempo}")
+        self._aplicar(tempo, high, low, close, tick_volume, volume, nova_barra=tempo != self.ultimo_tempo)
+
+    def semear(self, dados) -> None:
+        self._reiniciar()
+        for linha in self._linhas(Barras.de(dados)):
+            self._aplicar(*linha, nova_barra=True)
+
+    def sincronizar(self, dados) -> None:
+        """Aplica apenas os candles de `dados` (Barras ou DataFrame) a partir do último já processado."""
+        barras = Barras.de(dados)
+        if barras.vazio:
+            return
+        inicio = barras.posicao(self.ultimo_tempo) if self.ultimo_tempo is not None else len(barras)
+        if inicio == len(barras) or barras.tempo[inicio] != self.ultimo_tempo:
+            # Primeiro uso ou lacuna no histórico: recomeça a partir dos candles recebidos
+            self.semear(barras)
+            return
+
+        for linha in self._linhas(barras, inicio):
+            self.atualizar(*linha)
+
+    @property
+    def adx(self) -> float:
+        return self._adx.adx
+
+    @property
+    def vwap_diaria(self) -> float:
+        return self._vwap.vwap_diaria
+
+    @property
+    def vwap_semanal(self) -> float:
+        return self._vwap.vwap_semanal
+
+    def como_dataframe(self) -> pd.DataFrame:
+        tempos = pd.to_datetime([linha[0] for linha in self._historico], unit='s')
+        valores = [linha[1:] for linha in self._historico]
+        return pd.DataFrame(valores, index=pd.DatetimeIndex(tempos, name='time'), columns=self.COLUNAS)
@@ -1,9 +1,11 @@
+import math
+from dataclasses import replace
+
 import streamlit as st
-import sqlite3
 import pandas as pd
-from config import DB_PATH
 import plotly.graph_objects as go
-import MetaTrader5 as mt5
+from dashboard_data import DadosPainel, FiltroSinais
+from timeframes import TIMEFRAME_M5
 
 # ========================
 # 🎛️ CONFIGURAÇÃO INICIAL
@@ -11,6 +13,22 @@ import MetaTrader5 as mt5
 st.set_page_config(page_title="Painel do Robô Trader", layout="wide")
 st.title("🤖 Painel do Robô Trader Híbrido")
 
+
+SINAIS_POR_PAGINA = 100
+# Janela do gráfico do sinal: candles M5 antes e depois do horário do sinal
+CANDLES_ANTES_SINAL = 70
+CANDLES_DEPOIS_SINAL = 30
+
+
+@st.cache_resource
+def dados_painel() -> DadosPainel:
+    # Uma instância (e um cache) para todas as sessões abertas do painel
+    return DadosPainel(ttl=5.0)
+
+
+dados = dados_painel()
+
+
 # ========================
 # 📌 NAVEGAÇÃO LATERAL
 # ========================
@@ -29,29 +47,30 @@ aba = st.sidebar.selectbox("Escolha a seção:", [
 if aba == "📋 Sinais Gerados":
     st.subheader("📋 Lista de Sinais Gerados")
 
-    with sqlite3.connect(DB_PATH) as conn:
-        df = pd.read_sql_query("SELECT * FROM sinais ORDER BY timestamp DESC LIMIT 500", conn)
-
-    # Filtros
-    col1, col2, col3 = st.columns(3)
-    simbolos = ["Todos"] + sorted(df['simbolo'].unique())
-    status_options = ["Todos"] + sorted(df['status'].unique())
-    datas = pd.to_datetime(df['timestamp'])
+    opcoes = dados.opcoes_sinais()
 
+    # Filtros (aplicados no SQL)
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        simbolo_sel = st.selectbox("Filtrar por símbolo", simbolos)
+        simbolo_sel = st.selectbox("Filtrar por símbolo", ["Todos"] + opcoes['simbolos'])
     with col2:
-        status_sel = st.selectbox("Filtrar por status", status_options)
+        status_sel = st.selectbox("Filtrar por status", ["Todos"] + opcoes['status'])
     with col3:
-        data_min = st.date_input("A partir de:", datas.min().date())
-
-    # Aplicar filtros
-    if simbolo_sel != "Todos":
-        df = df[df['simbolo'] == simbolo_sel]
-    if status_sel != "Todos":
-        df = df[df['status'] == status_sel]
-    df = df[pd.to_datetime(df['timestamp']).dt.date >= data_min]
-
+        data_min = st.date_input("A partir de:", opcoes['data_min'])
+    with col4:
+        data_max = st.date_input("Até:", opcoes['data_max'])
+
+    filtro = FiltroSinais(
+        simbolo=None if simbolo_sel == "Todos" else simbolo_sel,
+        status=None if status_sel == "Todos" else status_sel,
+        inicio=data_min, fim=data_max, por_pagina=SINAIS_POR_PAGINA,
+    )
+    total = dados.contar_sinais(filtro)
+    paginas = max(1, math.ceil(total / SINAIS_POR_PAGINA))
+    pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1)
+    df = dados.sinais(replace(filtro, pagina=pagina - 1))
+
+    st.caption(f"{total} sinais encontrados")
     st.dataframe(df, use_container_width=True)
 
 # ========================
@@ -60,14 +79,13 @@ if aba == "📋 Sinais Gerados":
 elif aba == "📈 Gráfico do Sinal":
     st.subheader("📈 Visualização do Sinal Selecionado")
 
-    with sqlite3.connect(DB_PATH) as conn:
-        sinais_df = pd.read_sql_query("SELECT * FROM sinais ORDER BY timestamp DESC LIMIT 100", conn)
+    sinais_df = dados.sinais(FiltroSinais(por_pagina=100))
 
     if sinais_df.empty:
         st.warning("Nenhum sinal disponível para exibição.")
     else:
         sinal_id = st.selectbox("Selecione um sinal:", sinais_df.index,
-            format_func=lambda idx: f"{sinais_df.loc[idx, 'simbolo']} - {sinais_df.loc[idx, 'direcao']} @ {sinais_df.loc[idx, 'timestamp'][:16]}"
+            format_func=lambda idx: f"{sinais_df.loc[idx, 'simbolo']} - {sinais_df.loc[idx, 'direcao']} @ {sinais_df.loc[idx, 'timestamp']:%Y-%m-%d %H:%M}"
         )
 
         sinal = sinais_df.loc[sinal_id]
@@ -76,19 +94,24 @@ elif aba == "📈 Gráfico do Sinal":
         sl = sinal['sl']
         tp = sinal['tp']
 
-        # Obtém candles do ativo
-        mt5.initialize()
-        rates = mt5.copy_rates_from_pos(simbolo, mt5.TIMEFRAME_M5, 0, 100)
-        mt5.shutdown()
-
-        if rates is None or len(rates) == 0:
-            st.error("Não foi possível obter dados do ativo no MetaTrader.")
+        # Candles do arquivo local gravado pelo robô em torno do candle do sinal, sem chamadas ao terminal.
+        # candle_servidor está no relógio do servidor MT5, como o arquivo; sinais antigos só têm o do PC
+        horario_servidor = pd.notna(sinal['candle_servidor'])
+        referencia = sinal['candle_servidor'] if horario_servidor else sinal['timestamp']
+        fim = referencia + pd.Timedelta(minutes=5 * CANDLES_DEPOIS_SINAL)
+        df = dados.candles(simbolo, TIMEFRAME_M5, CANDLES_ANTES_SINAL + CANDLES_DEPOIS_SINAL, fim=fim)
+        if not df.empty:
+            df = df[df.index >= referencia - pd.Timedelta(minutes=5 * CANDLES_ANTES_SINAL)]
+
+        if df.empty:
+            st.error("Nenhum candle arquivado no horário deste sinal (o robô grava o histórico em HISTORICO_DIR).")
         else:
-            df = pd.DataFrame(rates)
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-            df.set_index('time', inplace=True)
-            entrada_candle = df.iloc[(df['close'] - preco_entrada).abs().argsort()[:1]]
-            entrada_time = entrada_candle.index[0]
+            if horario_servidor and referencia in df.index:
+                entrada_time = referencia
+            else:
+                # Sinal sem horário do servidor: a entrada é o candle cujo fechamento é o preço do sinal
+                entrada_candle = df.iloc[(df['close'] - preco_entrada).abs().argsort()[:1]]
+                entrada_time = entrada_candle.index[0]
             entrada_preco = preco_entrada
 
             # Gráfico
@@ -124,8 +147,7 @@ elif aba == "📈 Gráfico do Sinal":
 elif aba == "📊 Ativos Observáveis":
     st.subheader("📊 Lista de Ativos Observados")
 
-    with sqlite3.connect(DB_PATH) as conn:
-        ativos_df = pd.read_sql_query("SELECT * FROM ativos WHERE observando = 1", conn)
+    ativos_df = dados.ativos_observados()
 
     if ativos_df.empty:
         st.info("Nenhum ativo está sendo observado no momento.")
@@ -133,11 +155,42 @@ elif aba == "📊 Ativos Observáveis":
         st.dataframe(ativos_df, use_container_width=True)
 
 # ========================
-# 🧠 ABA 4: DIAGNÓSTICO (em breve)
+# 🧠 ABA 4: DIAGNÓSTICO
 # ========================
 elif aba == "🧠 Diagnóstico":
     st.subheader("🧠 Diagnóstico dos ativos")
-    st.info("Esta funcionalidade será implementada nas próximas etapas.")
+
+    ultimo, metricas_df = dados.metricas_recentes()
+
+    if ultimo is None:
+        st.info("Nenhuma métrica registrada ainda. O main.py as grava a cada METRICAS_INTERVALO_SQLITE segundos.")
+    else:
+        st.caption(f"Última atualização: {ultimo[:19]}")
+
+        simbolos_metricas = sorted(metricas_df['simbolo'].dropna().unique())
+        simbolo_sel = st.selectbox("Ativo (* = todos)", simbolos_metricas,
+                                   index=simbolos_metricas.index('*') if '*' in simbolos_metricas else 0)
+        selecao = metricas_df[metricas_df['simbolo'] == simbolo_sel]
+
+        st.markdown("#### ⏱️ Tempo por etapa (ms)")
+        tempos = selecao[selecao['tipo'] == 'tempo'].set_index('nome')[['amostras', 'p50', 'p95', 'max']]
+        tempos[['p50', 'p95', 'max']] *= 1000
+        st.dataframe(tempos.round(2), use_container_width=True)
+        if not tempos.empty:
+            st.bar_chart(tempos[['p50', 'p95']])
+
+        st.markdown("#### 🚫 Sinais descartados por filtro")
+        contadores = selecao[selecao['tipo'] == 'contador']
+        rejeicoes = contadores[contadores['nome'].str.startswith('rejeicao_')]
+        if rejeicoes.empty:
+            st.info("Nenhum descarte registrado.")
+        else:
+            st.bar_chart(rejeicoes.assign(filtro=rejeicoes['nome'].str.removeprefix('rejeicao_')).set_index('filtro')['valor'])
+
+        st.markdown("#### 📌 Contadores e indicadores")
+        outros = pd.concat([contadores[~contadores['nome'].str.startswith('rejeicao_')],
+                            metricas_df[metricas_df['tipo'] == 'valor']])
+        st.dataframe(outros.set_index('nome')[['valor']], use_container_width=True)
 
 # ========================
 # ⚙️ ABA 5: CONFIGURAÇÕES (em breve)
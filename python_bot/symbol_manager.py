@@ -1,27 +1,83 @@
-import sqlite3
-from datetime import datetime
-import MetaTrader5 as mt5
+import threading
+from dataclasses import dataclass
+from datetime import datetime, time
+from functools import lru_cache
 
 from config import DB_PATH
+from database import VERSAO_ATIVOS, VERSAO_CONFIGURACOES, obter_banco
+from timeframes import TIMEFRAME_M5, TIMEFRAME_M30
 
+
+@lru_cache(maxsize=256)
+def _horario(texto: str) -> time:
+    return datetime.strptime(texto, "%H:%M").time()
+
+
+def ponto_padrao(simbolo: str) -> float:
+    return 0.01 if "JPY" in simbolo else 0.0001
+
+
+@dataclass(frozen=True, slots=True)
 class SymbolConfig:
-    def __init__(self, simbolo, lote, adx_min, horario_inicio, horario_fim, tipo, volume_ajustado, ponto, engolfo_pct_max=2.5):
-        self.simbolo = simbolo
-        self.lote = lote
-        self.adx_min = adx_min
-        self.horario_inicio = horario_inicio
-        self.horario_fim = horario_fim
-        self.tipo = tipo
-        self.volume_ajustado = volume_ajustado
-        self.ponto = ponto
-        self.engolfo_pct_max = engolfo_pct_max
-        self.timeframe = mt5.TIMEFRAME_M5         # Timeframe principal de operação
-        self.timeframe_ciclo = mt5.TIMEFRAME_M30  # Timeframe para identificar o ciclo
+    """Configuração imutável de um ativo; os padrões são os valores históricos do robô."""
+    simbolo: str
+    lote: float = 0.01
+    adx_min: float = 20
+    horario_inicio: time = time(0, 0)
+    horario_fim: time = time(23, 59)
+    tipo: str = None
+    volume_ajustado: float = 0.0
+    ponto: float = 0.0001
+    engolfo_pct_max: float = 2.5
+    distancia_vwap_max: float = 0.005
+    grupo_candles: int = 3
+    distancia_pivo: float = 0.0005
+    distancia_sl: float = 0.0003
+    relacao_risco_retorno: float = 2.0
+    timeframe: int = TIMEFRAME_M5         # Timeframe principal de operação
+    timeframe_ciclo: int = TIMEFRAME_M30  # Timeframe para identificar o ciclo
+
+
+# Colunas de `configuracoes` que viram campos do SymbolConfig (NULL = padrão do robô)
+CAMPOS_CONFIGURACAO = ('lote', 'adx_min', 'engolfo_pct_max', 'distancia_vwap_max', 'grupo_candles',
+                       'distancia_pivo', 'distancia_sl', 'relacao_risco_retorno', 'horario_inicio',
+                       'horario_fim', 'ponto')
+
+SQL_OBSERVADOS = f"""
+    SELECT a.simbolo, a.tipo, a.volume_ajustado, {', '.join(f'c.{c}' for c in CAMPOS_CONFIGURACAO)}
+    FROM ativos a LEFT JOIN configuracoes c ON c.simbolo = a.simbolo
+    WHERE a.observando = 1
+    ORDER BY a.id
+"""
+
+
+def config_da_linha(linha: tuple) -> SymbolConfig:
+    simbolo, tipo, volume = linha[:3]
+    valores = {campo: valor for campo, valor in zip(CAMPOS_CONFIGURACAO, linha[3:]) if valor is not None}
+    for campo in ('horario_inicio', 'horario_fim'):
+        if campo in valores:
+            valores[campo] = _horario(valores[campo])
+    valores.setdefault('ponto', ponto_padrao(simbolo))
+    return SymbolConfig(simbolo=simbolo, tipo=tipo, volume_ajustado=float(volume or 0), **valores)
 
 
 class SymbolManager:
-    def __init__(self):
+    """
+    Cache de longa duração das configurações dos ativos observados.
+
+    `atualizar()` custa uma consulta à tabela `controle`: só relê `ativos` e
+    `configuracoes` quando versao_ativos (MarketScanner) ou versao_configuracoes
+    (gatilhos da tabela) mudou. Linhas iguais às da carga anterior reaproveitam
+    o mesmo SymbolConfig.
+    """
+
+    def __init__(self, caminho_banco: str = DB_PATH):
+        self.caminho_banco = caminho_banco
         self.simbolos = {}
+        self.versao = None   # (versao_ativos, versao_configuracoes) da última carga
+        self.recargas = 0
+        self._linhas = {}
+        self._lock = threading.Lock()
 
     def adicionar_simbolo(self, config: SymbolConfig):
         self.simbolos[config.simbolo] = config
@@ -29,35 +85,43 @@ class SymbolManager:
     def obter_configuracao(self, simbolo: str) -> SymbolConfig:
         return self.simbolos.get(simbolo, None)
 
-    def carregar_do_banco(self, caminho_banco=DB_PATH):
-        conn = sqlite3.connect(caminho_banco)
-        cursor = conn.cursor()
+    def configuracoes(self) -> list:
+        return list(self.simbolos.values())
 
+    def _ler_versao(self, conn) -> tuple:
+        versoes = dict(conn.execute("SELECT chave, valor FROM controle WHERE chave IN (?, ?)",
+                                    (VERSAO_ATIVOS, VERSAO_CONFIGURACOES)).fetchall())
+        return versoes.get(VERSAO_ATIVOS, 0), versoes.get(VERSAO_CONFIGURACOES, 0)
+
+    def desatualizado(self, caminho_banco: str = None) -> bool:
+        """Consulta barata: a lista de observados ou alguma configuração mudou desde a última carga?"""
+        return self._ler_versao(obter_banco(caminho_banco or self.caminho_banco).conexao()) != self.versao
+
+    def atualizar(self) -> bool:
+        """Recarrega só se o banco mudou. Retorna True se recarregou."""
+        if self.versao is not None and not self.desatualizado():
+            return False
+        self.carregar_do_banco()
+        return True
+
+    def carregar_do_banco(self, caminho_banco: str = None):
         try:
-            cursor.execute("SELECT simbolo, tipo, descricao, path, spread, volume_ajustado FROM ativos WHERE observando = 1")
-
-            for row in cursor.fetchall():
-                simbolo, tipo, descricao, path, spread, volume = row
-
-                ponto = 0.0001
-                if "JPY" in simbolo:
-                    ponto = 0.01
-
-                config = SymbolConfig(
-                    simbolo=simbolo,
-                    lote=0.01,
-                    adx_min=20,
-                    horario_inicio=datetime.strptime("00:00", "%H:%M").time(),
-                    horario_fim=datetime.strptime("23:59", "%H:%M").time(),
-                    tipo=tipo,
-                    volume_ajustado=float(volume),
-                    ponto=ponto,
-                    engolfo_pct_max=2.5
-                )
-                self.adicionar_simbolo(config)
+            conn = obter_banco(caminho_banco or self.caminho_banco).conexao()
+            with self._lock:
+                # Versão lida antes das linhas: uma troca no meio só causa uma recarga a mais
+                versao = self._ler_versao(conn)
+                simbolos, linhas = {}, {}
+                for linha in conn.execute(SQL_OBSERVADOS):
+                    simbolo = linha[0]
+                    linhas[simbolo] = linha
+                    anterior = self.simbolos.get(simbolo)
+                    simbolos[simbolo] = anterior if self._linhas.get(simbolo) == linha else config_da_linha(linha)
+                self.simbolos, self._linhas, self.versao = simbolos, linhas, versao
+                self.recargas += 1
 
         except Exception as e:
             print(f"Erro ao carregar configurações do banco: {e}")
 
-        finally:
-            conn.close()
+
+# Instância compartilhada pelo loop de estratégias do processo
+symbol_manager = SymbolManager()
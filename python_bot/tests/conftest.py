@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Os módulos do robô são importados sem pacote (from indicators import ...), como em main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Banco, arquivo histórico e logs (relativos ao diretório atual) num diretório temporário,
+# definidos antes de qualquer import de config; o terminal é o fake_mt5
+_TEMPORARIO = tempfile.mkdtemp(prefix="bot_trader_testes_")
+os.environ["DB_PATH"] = os.path.join(_TEMPORARIO, "sinais.sqlite")
+os.environ["HISTORICO_DIR"] = os.path.join(_TEMPORARIO, "historico")
+os.environ["METRICAS"] = "0"
+os.chdir(_TEMPORARIO)
+
+import fake_mt5  # noqa: E402
+from timeframes import TIMEFRAME_M5  # noqa: E402
+
+sys.modules.setdefault("MetaTrader5", fake_mt5)
+
+
+@pytest.fixture
+def mt5_simulado():
+    """fake_mt5 reiniciado com 10 dias de histórico determinístico."""
+    fake_mt5.configurar(dias_historico=10)
+    fake_mt5.initialize()
+    yield fake_mt5
+    fake_mt5.shutdown()
+
+
+@pytest.fixture
+def rates_m5(mt5_simulado):
+    return mt5_simulado.copy_rates_from_pos("EURUSD", TIMEFRAME_M5, 0, 10_000)
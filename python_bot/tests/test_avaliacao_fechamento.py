@@ -0,0 +1,65 @@
+"""Avaliação ao vivo logo após o fechamento (main.py) contra o backtest no mesmo candle fechado."""
+import pandas as pd
+
+import fake_mt5
+import main
+import parallel_executor
+import strategy
+from backtest import ParametrosEstrategia, executar_backtest
+from bar_cache import rates_para_dataframe
+from parallel_executor import analisar_ativo
+from symbol_manager import SymbolConfig
+from timeframes import TIMEFRAME_M5
+
+SIMBOLO = "EURUSD"
+DIAS = 20
+FECHAMENTOS = 72
+
+
+def _reiniciar_robo():
+    fake_mt5.configurar(dias_historico=DIAS)
+    fake_mt5.initialize()
+    # Começa um dia depois: as últimas horas da janela avaliada geram sinais
+    fake_mt5.avancar(24 * 3600)
+    main.cache_barras.invalidar()
+    parallel_executor._estados_ativos.clear()
+
+
+def test_ao_vivo_decide_como_o_backtest_no_candle_fechado(monkeypatch):
+    # Os motivos de descarte só são registrados com as métricas ligadas
+    monkeypatch.setattr(strategy, 'METRICAS_HABILITADAS', True)
+    _reiniciar_robo()
+    config = SymbolConfig(simbolo=SIMBOLO)
+
+    decisoes = {}
+    for _ in range(FECHAMENTOS):
+        # Logo após o fechamento o terminal já entrega o candle seguinte, recém-aberto
+        fake_mt5.avancar(300)
+        fechamento = fake_mt5.agora()
+        assert fake_mt5.copy_rates_from_pos(SIMBOLO, TIMEFRAME_M5, 0, 1)['time'][-1] == fechamento
+
+        tarefa = main.preparar_tarefa(config, None, fechamento)
+        assert tarefa.barras.tempo[-1] == fechamento - 300
+        tarefa.horario = pd.Timestamp(int(tarefa.barras.tempo[-1]), unit='s').time()
+        resultado = analisar_ativo(tarefa)
+        assert resultado.erro is None
+        sinal = resultado.sinal
+        decisoes[fechamento - 300] = ((sinal['direcao'], sinal['sl'], sinal['tp']) if sinal
+                                      else resultado.motivo_rejeicao)
+
+    # Backtest sobre os candles fechados; sem janela de duplicidade, já que o índice ao vivo está vazio
+    df = rates_para_dataframe(fake_mt5.copy_rates_from_pos(SIMBOLO, TIMEFRAME_M5, 1, DIAS * 288))
+    backtest = executar_backtest(df, ParametrosEstrategia(horas_duplicidade=0), SIMBOLO)
+    operacoes = backtest.operacoes.set_index('indice_entrada')
+    tempos = df.index.values.astype('datetime64[s]').astype(int)
+
+    esperadas = {}
+    for t in range(len(df) - FECHAMENTOS, len(df)):
+        if t in operacoes.index:
+            operacao = operacoes.loc[t]
+            esperadas[tempos[t]] = (operacao['direcao'], operacao['sl'], operacao['tp'])
+        else:
+            esperadas[tempos[t]] = backtest.motivos.iloc[t]
+
+    assert decisoes == esperadas
+    assert any(isinstance(decisao, tuple) for decisao in decisoes.values())
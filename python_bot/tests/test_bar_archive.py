@@ -0,0 +1,101 @@
+"""Arquivo histórico: índice esparso, ingestão só por acréscimo e recuperação de ingestão interrompida."""
+import os
+
+import numpy as np
+import pytest
+
+import bar_archive
+from bar_archive import ArquivoBarras
+from resampler import reamostrar_barras
+from timeframes import TIMEFRAME_H1, TIMEFRAME_M5
+
+
+@pytest.fixture
+def arquivo(tmp_path, monkeypatch):
+    # Blocos pequenos: as bisseções atravessam vários blocos do índice esparso
+    monkeypatch.setattr(bar_archive, 'PASSO_INDICE', 16)
+    return ArquivoBarras(str(tmp_path / "historico"))
+
+
+def _iguais(barras, rates):
+    np.testing.assert_array_equal(barras.tempo, rates['time'])
+    for coluna in ('open', 'high', 'low', 'close', 'tick_volume'):
+        np.testing.assert_array_equal(barras.coluna(coluna), rates[coluna])
+
+
+def test_posicao_igual_a_bissecao_completa(arquivo, rates_m5):
+    rates = rates_m5[:1000]
+    arquivo.acrescentar("EURUSD", TIMEFRAME_M5, rates)
+    serie = arquivo._serie("EURUSD", TIMEFRAME_M5)
+    tempos = rates['time']
+
+    consultas = np.r_[tempos[0] - 600, tempos[[0, 15, 16, 17, 500, -1]], tempos[-1] + 600,
+                      np.random.default_rng(1).integers(tempos[0] - 300, tempos[-1] + 300, 200)]
+    for tempo in consultas:
+        for lado in ('left', 'right'):
+            assert serie.posicao(int(tempo), lado) == np.searchsorted(tempos, tempo, side=lado), (tempo, lado)
+
+
+def test_leitura_por_intervalo_e_ultimas(arquivo, rates_m5):
+    rates = rates_m5[:1000]
+    arquivo.acrescentar("EURUSD", TIMEFRAME_M5, rates)
+    tempos = rates['time']
+
+    inicio, fim = int(tempos[100]) + 1, int(tempos[400])
+    _iguais(arquivo.ler("EURUSD", TIMEFRAME_M5, inicio, fim), rates[(tempos >= inicio) & (tempos <= fim)])
+    _iguais(arquivo.ler("EURUSD", TIMEFRAME_M5), rates)
+    _iguais(arquivo.ultimas("EURUSD", TIMEFRAME_M5, 50, fim=fim), rates[351:401])
+    _iguais(arquivo.ultimas("EURUSD", TIMEFRAME_M5, 5000), rates)
+    assert arquivo.ler("EURUSD", TIMEFRAME_M5, tempos[-1] + 1).vazio
+    assert arquivo.ler("GBPUSD", TIMEFRAME_M5).vazio and arquivo.intervalo("GBPUSD", TIMEFRAME_M5) is None
+
+    reamostrado = arquivo.ler_reamostrado("EURUSD", TIMEFRAME_M5, TIMEFRAME_H1, inicio, fim)
+    esperado = reamostrar_barras(arquivo.ler("EURUSD", TIMEFRAME_M5, int(tempos[100]) // 3600 * 3600, fim),
+                                 TIMEFRAME_H1, descartar_parcial=False)
+    np.testing.assert_array_equal(reamostrado.tempo, esperado.tempo)
+    np.testing.assert_array_equal(reamostrado.close, esperado.close)
+
+
+def test_acrescentar_so_grava_candles_mais_novos(arquivo, rates_m5):
+    assert arquivo.acrescentar("EURUSD", TIMEFRAME_M5, rates_m5[:300]) == 300
+    leitor = ArquivoBarras(arquivo.raiz)
+    assert len(leitor.ler("EURUSD", TIMEFRAME_M5)) == 300
+
+    # Sobreposição: só os candles depois do último gravado entram
+    assert arquivo.acrescentar("EURUSD", TIMEFRAME_M5, rates_m5[250:400]) == 100
+    assert arquivo.acrescentar("EURUSD", TIMEFRAME_M5, rates_m5[100:200]) == 0
+    # Outra instância enxerga a nova quantidade publicada no meta.json
+    _iguais(leitor.ler("EURUSD", TIMEFRAME_M5), rates_m5[:400])
+
+    fora_de_ordem = rates_m5[400:410][::-1].copy()
+    with pytest.raises(ValueError):
+        arquivo.acrescentar("EURUSD", TIMEFRAME_M5, fora_de_ordem)
+    _iguais(arquivo.ler("EURUSD", TIMEFRAME_M5), rates_m5[:400])
+
+
+def test_sobras_de_ingestao_interrompida_sao_descartadas(arquivo, rates_m5):
+    arquivo.acrescentar("EURUSD", TIMEFRAME_M5, rates_m5[:200])
+    diretorio = arquivo.diretorio("EURUSD", TIMEFRAME_M5)
+    # Colunas gravadas, mas o processo caiu antes de publicar o meta.json
+    for nome in os.listdir(diretorio):
+        if nome.endswith(".bin"):
+            with open(os.path.join(diretorio, nome), "ab") as f:
+                f.write(b"\xff" * 24)
+    _iguais(arquivo.ler("EURUSD", TIMEFRAME_M5), rates_m5[:200])
+
+    assert arquivo.acrescentar("EURUSD", TIMEFRAME_M5, rates_m5[200:260]) == 60
+    _iguais(ArquivoBarras(arquivo.raiz).ler("EURUSD", TIMEFRAME_M5), rates_m5[:260])
+    tamanho = os.path.getsize(os.path.join(diretorio, "time.bin"))
+    assert tamanho == 260 * 8
+
+
+def test_ingestao_do_terminal_ignora_o_candle_em_formacao(arquivo, mt5_simulado):
+    assert arquivo.ingerir_mt5("EURUSD", TIMEFRAME_M5, mt5_simulado, max_barras=500, lote_inicial=4) == 500
+    formacao = mt5_simulado.copy_rates_from_pos("EURUSD", TIMEFRAME_M5, 0, 1)['time'][-1]
+    assert arquivo.ler("EURUSD", TIMEFRAME_M5).tempo[-1] == formacao - 300
+
+    # Uma hora depois: a busca incremental cresce o lote até alcançar o arquivo
+    mt5_simulado.avancar(3600)
+    assert arquivo.ingerir_mt5("EURUSD", TIMEFRAME_M5, mt5_simulado, max_barras=500, lote_inicial=4) == 12
+    _iguais(arquivo.ler("EURUSD", TIMEFRAME_M5),
+            mt5_simulado.copy_rates_from_pos("EURUSD", TIMEFRAME_M5, 1, 512))
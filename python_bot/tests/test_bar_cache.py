@@ -0,0 +1,78 @@
+"""BarCache: busca incremental contra a leitura direta do terminal."""
+import numpy as np
+import pytest
+
+from bar_cache import BarCache
+from timeframes import TIMEFRAME_M5
+
+SIMBOLO = "EURUSD"
+
+
+@pytest.fixture
+def cache(mt5_simulado):
+    return BarCache(mt5_modulo=mt5_simulado)
+
+
+def _direto(mt5, n_barras):
+    return mt5.copy_rates_from_pos(SIMBOLO, TIMEFRAME_M5, 0, n_barras)
+
+
+def test_incremental_igual_ao_terminal(cache, mt5_simulado):
+    cache.obter_barras(SIMBOLO, TIMEFRAME_M5, 300)
+    # Revisão do candle em formação, dois candles novos e, por fim, um salto além do lote inicial
+    for segundos in (60, 600, 3 * 3600):
+        mt5_simulado.avancar(segundos)
+        antes = cache.barras_baixadas
+        barras = cache.obter_barras(SIMBOLO, TIMEFRAME_M5, 300)
+        esperado = _direto(mt5_simulado, 300)
+
+        np.testing.assert_array_equal(barras.tempo, esperado['time'])
+        np.testing.assert_array_equal(barras.close, esperado['close'])
+        np.testing.assert_array_equal(barras.tick_volume, esperado['tick_volume'])
+        assert cache.barras_baixadas - antes < 300
+
+    assert cache.estatisticas()['faltas'] == 1
+    assert cache.estatisticas()['acertos'] == 3
+
+
+def test_barras_entregues_nao_mudam(cache, mt5_simulado):
+    antes = cache.obter_barras(SIMBOLO, TIMEFRAME_M5, 50)
+    close = antes.close.copy()
+    mt5_simulado.avancar(120)
+    depois = cache.obter_barras(SIMBOLO, TIMEFRAME_M5, 50)
+
+    np.testing.assert_array_equal(antes.close, close)
+    assert depois.close[-1] != close[-1]
+
+
+def test_poucas_barras_usam_a_busca_incremental(cache, mt5_simulado):
+    # n_barras abaixo do lote inicial: a primeira busca vem limitada à profundidade
+    for _ in range(5):
+        barras = cache.obter_barras(SIMBOLO, TIMEFRAME_M5, 2)
+        np.testing.assert_array_equal(barras.tempo, _direto(mt5_simulado, 2)['time'])
+        mt5_simulado.avancar(300)
+    assert (cache.faltas, cache.acertos) == (1, 4)
+
+
+def test_profundidade_de_um_candle(cache, mt5_simulado):
+    cache.obter_barras(SIMBOLO, TIMEFRAME_M5, 1)
+    mt5_simulado.avancar(600)
+    barras = cache.obter_barras(SIMBOLO, TIMEFRAME_M5, 1)
+    np.testing.assert_array_equal(barras.tempo, _direto(mt5_simulado, 1)['time'])
+
+
+def test_terminal_sem_candles_novos_mantem_o_cache(cache, mt5_simulado):
+    primeiro = cache.obter_barras(SIMBOLO, TIMEFRAME_M5, 100)
+    # O terminal volta a entregar só candles anteriores ao último do cache
+    mt5_simulado.avancar(-900)
+    barras = cache.obter_barras(SIMBOLO, TIMEFRAME_M5, 100)
+
+    np.testing.assert_array_equal(barras.tempo, primeiro.tempo)
+    assert cache.faltas == 1
+
+
+def test_mais_barras_que_a_profundidade_recarrega(cache, mt5_simulado):
+    cache.obter_barras(SIMBOLO, TIMEFRAME_M5, 50)
+    barras = cache.obter_barras(SIMBOLO, TIMEFRAME_M5, 200)
+    assert len(barras) == 200
+    assert cache.faltas == 2
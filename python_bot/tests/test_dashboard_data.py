@@ -0,0 +1,115 @@
+"""Camada de dados do painel: cache com TTL revalidado por data_version, filtros em SQL e candles do arquivo."""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from bar_archive import ArquivoBarras
+from dashboard_data import CacheTTL, DadosPainel, FiltroSinais
+from database import obter_banco
+from signal_outbox import publicar_sinais
+from timeframes import TIMEFRAME_M30, TIMEFRAME_M5
+
+
+def _sinal(simbolo: str, status: str, timestamp: str, candle_servidor: str = None) -> dict:
+    return {'simbolo': simbolo, 'direcao': 'buy', 'preco_entrada': 1.1, 'sl': 1.0, 'tp': 1.3, 'status': status,
+            'ciclo': 'bull', 'adx': 25.0, 'corpo_pct': 0.1, 'lote': 0.01, 'timestamp': timestamp,
+            'candle_servidor': candle_servidor}
+
+
+@pytest.fixture
+def painel(tmp_path):
+    caminho = str(tmp_path / "painel.sqlite")
+    with obter_banco(caminho).transacao() as conn:
+        publicar_sinais(conn, [
+            _sinal('EURUSD', 'pendente', '2026-10-05T00:00:00'),
+            _sinal('EURUSD', 'executado', '2026-10-07T12:30:00.123456'),
+            _sinal('EURUSD', 'pendente', '2026-10-09T23:59:59'),
+            _sinal('EURUSD', 'pendente', '2026-10-10T00:00:00'),
+            _sinal('GBPUSD', 'pendente', '2026-10-08T09:00:00', candle_servidor='2026-10-08T11:55:00'),
+        ])
+    painel = DadosPainel(caminho, ttl=0.0, arquivo=ArquivoBarras(str(tmp_path / "historico")))
+    return painel
+
+
+def test_cache_ttl_revalida_pela_versao():
+    cache = CacheTTL(ttl=0.0)
+    calculos = []
+
+    def calcular():
+        calculos.append(1)
+        return len(calculos)
+
+    # TTL vencido, mesma versão: reaproveita sem recalcular
+    assert cache.obter('a', calcular, versao=1) == 1
+    assert cache.obter('a', calcular, versao=1) == 1
+    assert cache.obter('a', calcular, versao=2) == 2
+    # Sem versão, vencido é recalculado
+    assert cache.obter('b', calcular) == 3
+    assert cache.obter('b', calcular) == 4
+    assert cache.estatisticas()['acertos'] == 1
+
+    cache = CacheTTL(ttl=60.0, max_itens=2)
+    for chave in 'xyz':
+        cache.obter(chave, calcular)
+    assert cache.estatisticas()['itens'] == 2
+    cache.obter('z', calcular)
+    assert cache.estatisticas()['acertos'] == 1
+    cache.limpar()
+    assert cache.estatisticas()['itens'] == 0
+
+
+def test_filtro_em_sql_com_fim_inclusivo_e_paginacao(painel):
+    filtro = FiltroSinais(simbolo='EURUSD', status='pendente', inicio=date(2026, 10, 5), fim=date(2026, 10, 9))
+    where, parametros = filtro.clausulas()
+    assert where == "WHERE simbolo = ? AND status = ? AND timestamp >= ? AND timestamp < ?"
+    assert parametros == ('EURUSD', 'pendente', '2026-10-05', '2026-10-10')
+    assert FiltroSinais().clausulas() == ("", ())
+
+    assert painel.contar_sinais(filtro) == 2
+    assert list(painel.sinais(filtro)['timestamp']) == [pd.Timestamp('2026-10-09T23:59:59'),
+                                                         pd.Timestamp('2026-10-05T00:00:00')]
+
+    paginas = [painel.sinais(FiltroSinais(por_pagina=2, pagina=p))['id'].tolist() for p in range(3)]
+    assert paginas == [[4, 3], [5, 2], [1]]
+    assert painel.contar_sinais(FiltroSinais(pagina=7)) == 5
+
+    opcoes = painel.opcoes_sinais()
+    assert opcoes == {'simbolos': ['EURUSD', 'GBPUSD'], 'status': ['executado', 'pendente'],
+                      'data_min': date(2026, 10, 5), 'data_max': date(2026, 10, 10)}
+
+
+def test_gravacao_de_outra_conexao_invalida_o_cache(painel):
+    filtro = FiltroSinais(simbolo='GBPUSD')
+    antes = painel.sinais(filtro)
+    assert painel.sinais(filtro) is antes
+
+    with obter_banco(painel.caminho_banco).transacao() as conn:
+        publicar_sinais(conn, [_sinal('GBPUSD', 'pendente', '2026-10-08T10:00:00')])
+    assert len(painel.sinais(filtro)) == 2
+    assert painel.contar_sinais(filtro) == 2
+
+
+def test_horario_do_servidor_do_sinal(painel):
+    sinais = painel.sinais().set_index('simbolo')
+    assert sinais.loc['GBPUSD', 'candle_servidor'] == pd.Timestamp('2026-10-08T11:55:00')
+    assert sinais.loc['EURUSD', 'candle_servidor'].isna().all()
+
+
+def test_candles_sem_arquivo_e_reamostrados(painel, mt5_simulado):
+    vazio = painel.candles('EURUSD', TIMEFRAME_M5, 100)
+    assert vazio.empty and isinstance(vazio.index, pd.DatetimeIndex)
+    # O filtro do gráfico por horário não quebra sem candles
+    assert vazio[vazio.index >= pd.Timestamp('2025-01-06')].empty
+
+    painel.arquivo.acrescentar('EURUSD', TIMEFRAME_M5, mt5_simulado.copy_rates_from_pos('EURUSD', TIMEFRAME_M5, 1, 600))
+    painel.cache.limpar()
+    m5 = painel.candles('EURUSD', TIMEFRAME_M5, 100)
+    assert len(m5) == 100 and m5.index[-1] == painel.arquivo.intervalo('EURUSD', TIMEFRAME_M5)[1]
+
+    fim = m5.index[-1] - pd.Timedelta(hours=2)
+    m30 = painel.candles('EURUSD', TIMEFRAME_M30, 10, fim=fim)
+    esperado = mt5_simulado.copy_rates_from_pos('EURUSD', TIMEFRAME_M30, 0, 40)
+    esperado = pd.Series(esperado['close'], index=pd.to_datetime(esperado['time'], unit='s'))
+    assert len(m30) == 10 and m30.index[-1] <= fim
+    assert m30['close'].tolist() == esperado.loc[m30.index].tolist()
@@ -0,0 +1,86 @@
+"""Migração de um banco anterior ao outbox de sinais."""
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import Database
+from signal_outbox import ConsumidorOutbox
+
+ESQUEMA_ANTIGO = """
+CREATE TABLE sinais (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    simbolo TEXT NOT NULL,
+    direcao TEXT NOT NULL,
+    preco_entrada REAL,
+    sl REAL,
+    tp REAL,
+    status TEXT DEFAULT 'pendente',
+    ciclo TEXT,
+    adx REAL,
+    corpo_pct REAL,
+    lote REAL,
+    timestamp TEXT
+);
+"""
+
+
+def _banco_antigo(caminho: str):
+    conn = sqlite3.connect(caminho)
+    conn.executescript(ESQUEMA_ANTIGO)
+    conn.executemany("""
+        INSERT INTO sinais (simbolo, direcao, preco_entrada, sl, tp, status, lote, timestamp)
+        VALUES (?, ?, 1.1, 1.0, 1.3, ?, 0.01, '2025-01-06T12:00:00')
+    """, [('EURUSD', 'buy', 'pendente'), ('EURUSD', 'sell', 'executado'),
+          ('GBPUSD', 'sell', 'pendente'), ('EURUSD', 'sell', 'pendente')])
+    conn.commit()
+    conn.close()
+
+
+def test_migracao_publica_pendentes_antigos_no_outbox(tmp_path):
+    caminho = str(tmp_path / "antigo.sqlite")
+    _banco_antigo(caminho)
+
+    banco = Database(caminho)
+    outbox = banco.consultar("SELECT sinal_id, simbolo, estado FROM outbox_sinais ORDER BY seq")
+    assert outbox == [(1, 'EURUSD', 'pendente'), (3, 'GBPUSD', 'pendente'), (4, 'EURUSD', 'pendente')]
+    assert dict(banco.consultar("SELECT simbolo, ultimo_seq FROM outbox_publicado")) == {'EURUSD': 3, 'GBPUSD': 2}
+
+    # O consumidor vê os sinais antigos na ordem em que foram gravados
+    consumidor = ConsumidorOutbox('EURUSD', 'EURUSD#0', caminho)
+    assert [consumidor.buscar()['sinal_id'], consumidor.buscar()['sinal_id'], consumidor.buscar()] == [1, 4, None]
+    consumidor.fechar()
+    assert banco.consultar("SELECT id, status FROM sinais ORDER BY id") == [
+        (1, 'em_execucao'), (2, 'executado'), (3, 'pendente'), (4, 'em_execucao')]
+
+    # Reabrir o banco (outro processo) não publica de novo
+    banco.fechar()
+    assert Database(caminho).consultar_um("SELECT COUNT(*) FROM outbox_sinais")[0] == 3
+
+
+@pytest.fixture
+def fuso_sao_paulo(monkeypatch):
+    # Fuso diferente de UTC: distingue hora local de datetime('now')
+    monkeypatch.setenv("TZ", "America/Sao_Paulo")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_datas_do_outbox_em_hora_local_como_os_sinais(tmp_path, fuso_sao_paulo):
+    caminho = str(tmp_path / "antigo.sqlite")
+    _banco_antigo(caminho)
+    banco = Database(caminho)
+    consumidor = ConsumidorOutbox('EURUSD', 'EURUSD#0', caminho)
+    assert consumidor.buscar()['sinal_id'] == 1
+    consumidor.fechar()
+
+    # Backfill da migração e reivindicação gravadas pelo SQL, no formato de datetime.now().isoformat()
+    publicado, reivindicado = banco.consultar_um("SELECT publicado_em, reivindicado_em FROM outbox_sinais WHERE seq = 1")
+    agora = datetime.now()
+    for data in (publicado, reivindicado):
+        assert 'T' in data
+        assert abs(datetime.fromisoformat(data) - agora) < timedelta(minutes=1)
+    banco.fechar()
@@ -0,0 +1,113 @@
+"""
+Versões vetorizadas do IndicatorCalculator contra as implementações em laço
+que elas substituíram (copiadas abaixo como referência).
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_cache import rates_para_dataframe
+from indicators import IndicatorCalculator
+
+
+# ================================
+# 📚 REFERÊNCIAS (LAÇOS ORIGINAIS)
+# ================================
+
+def vwap_laco(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.sort_index().copy()
+    df['tp'] = (df['high'] + df['low'] + df['close']) / 3
+    df['data'] = df.index.date
+    df['semana'] = df.index.to_period('W').start_time
+    df['vwap_diaria'] = np.nan
+    df['vwap_semanal'] = np.nan
+    soma_tpv_dia = soma_vol_dia = soma_tpv_semana = soma_vol_semana = 0
+    dia_atual = semana_atual = None
+    for i, row in df.iterrows():
+        vol = row['tick_volume'] if row['tick_volume'] > 0 else row.get('volume', 0)
+        if dia_atual != row['data']:
+            soma_tpv_dia = soma_vol_dia = 0
+            dia_atual = row['data']
+        if semana_atual != row['semana']:
+            soma_tpv_semana = soma_vol_semana = 0
+            semana_atual = row['semana']
+        tpv = row['tp'] * vol
+        soma_tpv_dia += tpv
+        soma_vol_dia += vol
+        df.at[i, 'vwap_diaria'] = soma_tpv_dia / soma_vol_dia if soma_vol_dia > 0 else np.nan
+        soma_tpv_semana += tpv
+        soma_vol_semana += vol
+        df.at[i, 'vwap_semanal'] = soma_tpv_semana / soma_vol_semana if soma_vol_semana > 0 else np.nan
+    return df[['vwap_diaria', 'vwap_semanal']]
+
+
+def pivos_laco(df: pd.DataFrame, grupo_candles: int, distancia_minima: float):
+    topos, fundos = [], []
+    n = grupo_candles
+    for i in range(n, len(df) - n):
+        segmento = df.iloc[i - n:i + n + 1]
+        centro = df.iloc[i]
+        if centro['high'] == segmento['high'].max():
+            if centro['high'] - max(df.iloc[i - 1]['high'], df.iloc[i + 1]['high']) >= distancia_minima:
+                topos.append((df.index[i], centro['high']))
+        if centro['low'] == segmento['low'].min():
+            if min(df.iloc[i - 1]['low'], df.iloc[i + 1]['low']) - centro['low'] >= distancia_minima:
+                fundos.append((df.index[i], centro['low']))
+    return topos, fundos
+
+
+def adx_pandas(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
+    df = df.copy()
+    df['TR'] = np.maximum(df['high'] - df['low'],
+                          np.maximum(abs(df['high'] - df['close'].shift(1)), abs(df['low'] - df['close'].shift(1))))
+    df['+DM'] = np.where((df['high'] - df['high'].shift(1)) > (df['low'].shift(1) - df['low']),
+                         np.maximum(df['high'] - df['high'].shift(1), 0), 0)
+    df['-DM'] = np.where((df['low'].shift(1) - df['low']) > (df['high'] - df['high'].shift(1)),
+                         np.maximum(df['low'].shift(1) - df['low'], 0), 0)
+    df['TR_smooth'] = df['TR'].rolling(window=period).sum()
+    df['+DI'] = 100 * (df['+DM'].rolling(window=period).sum() / df['TR_smooth'])
+    df['-DI'] = 100 * (df['-DM'].rolling(window=period).sum() / df['TR_smooth'])
+    df['DX'] = 100 * (abs(df['+DI'] - df['-DI']) / (df['+DI'] + df['-DI']))
+    df['ADX'] = df['DX'].rolling(window=period).mean()
+    return df[['+DI', '-DI', 'ADX']]
+
+
+@pytest.fixture
+def df_m5(rates_m5):
+    df = rates_para_dataframe(rates_m5)
+    df['volume'] = df['real_volume']
+    return df
+
+
+# ================================
+# ✅ EQUIVALÊNCIA
+# ================================
+
+@pytest.mark.parametrize("escala", [1.0, 50_000.0])
+def test_vwap_vetorizada_igual_ao_laco(df_m5, escala):
+    # Candles sem tick_volume usam `volume`, e sessões sem volume nenhum ficam NaN
+    df_m5.iloc[::7, df_m5.columns.get_loc('tick_volume')] = 0
+    df_m5.iloc[:30, df_m5.columns.get_loc('volume')] = 0
+    df_m5[['open', 'high', 'low', 'close']] *= escala
+
+    esperado = vwap_laco(df_m5)
+    obtido = IndicatorCalculator.calcular_vwap(df_m5)
+
+    # Mesmas somas, na mesma ordem: igualdade bit a bit (NaN nas mesmas posições)
+    for coluna in ('vwap_diaria', 'vwap_semanal'):
+        np.testing.assert_array_equal(obtido[coluna], esperado[coluna])
+
+
+@pytest.mark.parametrize("grupo_candles, distancia_minima", [(3, 0.0005), (2, 0.0), (5, 0.001)])
+def test_pivos_vetorizados_iguais_ao_laco(df_m5, grupo_candles, distancia_minima):
+    df = df_m5.tail(500)
+    esperado = pivos_laco(df, grupo_candles, distancia_minima)
+    assert IndicatorCalculator.detectar_pivos(df, grupo_candles=grupo_candles,
+                                              distancia_minima=distancia_minima) == esperado
+
+
+def test_adx_vetorizado_igual_ao_pandas(df_m5):
+    esperado = adx_pandas(df_m5)
+    obtido = IndicatorCalculator.calcular_adx(df_m5)
+    for coluna in ('+DI', '-DI', 'ADX'):
+        np.testing.assert_allclose(obtido[coluna], esperado[coluna], rtol=1e-12, atol=1e-12, equal_nan=True)
@@ -0,0 +1,115 @@
+"""Market Scanner: volumes pelo gateway e lista de observados gravada como diferença versionada."""
+import asyncio
+
+import pytest
+
+import fake_mt5
+import market_scanner
+from database import obter_banco
+from market_scanner import Ativo, MarketScanner, ScannerConfig
+from mt5_gateway import gateway_mt5
+from timeframes import TIMEFRAME_M5
+
+
+@pytest.fixture
+def scanner(mt5_simulado, tmp_path):
+    gateway_mt5.limpar_cache()
+    market_scanner._volumes_anteriores.clear()
+    return MarketScanner(ScannerConfig(max_forex=2, max_indices=1, max_crypto=1, max_acoes=0,
+                                       caminho_banco=str(tmp_path / "scanner.sqlite")))
+
+
+def test_volume_igual_ao_do_terminal_e_reaproveitado_sem_cotacao_nova(scanner):
+    scanner.carregar_dados_mt5()
+
+    # AAPL (ações desligadas) fica de fora antes de qualquer consulta de candles
+    assert sorted(a.symbol for a in scanner.ativos) == ['BTCUSD', 'EURUSD', 'GBPUSD', 'US500', 'USDJPY']
+    for ativo in scanner.ativos:
+        rates = fake_mt5.copy_rates_from_pos(ativo.symbol, TIMEFRAME_M5, 0, scanner.config.n_barras_volume)
+        assert ativo.volume_ajustado == float(rates['tick_volume'].sum())
+    assert scanner.estatisticas['consultados'] == 5
+
+    gateway_mt5.limpar_cache()
+    scanner.carregar_dados_mt5()
+    assert (scanner.estatisticas['reaproveitados'], scanner.estatisticas['consultados']) == (5, 0)
+
+    fake_mt5.avancar(300)
+    gateway_mt5.limpar_cache()
+    scanner.carregar_dados_mt5()
+    assert scanner.estatisticas['consultados'] == 5
+
+
+def test_consultas_respeitam_o_limite_de_simultaneas(scanner, monkeypatch):
+    ativas, pico = 0, 0
+
+    async def volume_lento(simbolo, n_barras=100):
+        nonlocal ativas, pico
+        ativas += 1
+        pico = max(pico, ativas)
+        await asyncio.sleep(0.01)
+        ativas -= 1
+        return 1.0
+
+    monkeypatch.setattr(market_scanner, 'calcular_volume_ajustado', volume_lento)
+    scanner.config.max_consultas_simultaneas = 3
+    scanner.carregar_dados_mt5()
+
+    assert pico == 3
+    assert [a.volume_ajustado for a in scanner.ativos] == [1.0] * 5
+
+
+# ================================
+# Lista de observados aplicada como diferença
+# ================================
+
+def _ativo(nome: str, path: str, spread: float = 10, volume: float = 100.0) -> Ativo:
+    return Ativo(fake_mt5.SymbolInfo(nome, nome, path, spread, True, 0, 0.00001, 5), volume)
+
+
+def _observados(banco) -> dict:
+    return dict(banco.consultar("SELECT simbolo, observando FROM ativos ORDER BY id"))
+
+
+def test_salvar_aplica_diferenca_e_versiona_so_mudanca_de_lista(scanner):
+    banco = obter_banco(scanner.config.caminho_banco)
+    scanner.ativos = [_ativo('EURUSD', 'Forex\\EURUSD', volume=300), _ativo('GBPUSD', 'Forex\\GBPUSD', volume=200),
+                      _ativo('USDJPY', 'Forex\\USDJPY', volume=100), _ativo('BTCUSD', 'Crypto\\BTCUSD')]
+    resumo = scanner.salvar_no_banco()
+    # max_forex=2: USDJPY fica de fora pelo volume
+    assert (resumo['inseridos'], resumo['lista_mudou']) == (3, True)
+    assert _observados(banco) == {'EURUSD': 1, 'GBPUSD': 1, 'BTCUSD': 1}
+    ids = dict(banco.consultar("SELECT simbolo, id FROM ativos"))
+    versao = resumo['versao']
+
+    # Mesma lista: nada é escrito e a versão não sobe
+    resumo = scanner.salvar_no_banco()
+    assert (resumo['inseridos'], resumo['atualizados'], resumo['lista_mudou'], resumo['versao']) == (0, 0, False, versao)
+
+    # Só spread/volume mudou: a linha é atualizada no lugar, sem nova versão
+    scanner.ativos[0].volume_ajustado = 350
+    resumo = scanner.salvar_no_banco()
+    assert (resumo['atualizados'], resumo['lista_mudou'], resumo['versao']) == (1, False, versao)
+
+    # USDJPY passa GBPUSD: um desliga, outro entra, a versão sobe e os ids antigos ficam
+    scanner.ativos[2].volume_ajustado = 250
+    resumo = scanner.salvar_no_banco()
+    assert (resumo['inseridos'], resumo['desligados'], resumo['lista_mudou']) == (1, 1, True)
+    assert resumo['versao'] == versao + 1
+    assert _observados(banco) == {'EURUSD': 1, 'GBPUSD': 0, 'BTCUSD': 1, 'USDJPY': 1}
+    assert dict(banco.consultar("SELECT simbolo, id FROM ativos WHERE simbolo != 'USDJPY'")) == ids
+
+    # GBPUSD volta: a linha desligada é religada em vez de duplicada
+    scanner.ativos[1].volume_ajustado = 400
+    resumo = scanner.salvar_no_banco()
+    assert (resumo['inseridos'], resumo['atualizados'], resumo['lista_mudou']) == (0, 1, True)
+    assert _observados(banco)['GBPUSD'] == 1
+
+
+def test_salvar_remove_duplicados_antigos(scanner):
+    banco = obter_banco(scanner.config.caminho_banco)
+    banco.executar_varios("INSERT INTO ativos (simbolo, tipo, observando) VALUES (?, 'forex', 1)",
+                          [('EURUSD',), ('EURUSD',)])
+    scanner.ativos = [_ativo('EURUSD', 'Forex\\EURUSD')]
+    resumo = scanner.salvar_no_banco()
+    assert (resumo['duplicados_removidos'], resumo['atualizados'], resumo['lista_mudou']) == (1, 1, True)
+    assert banco.consultar("SELECT id, simbolo FROM ativos") == [(1, 'EURUSD')]
@@ -0,0 +1,76 @@
+"""Métricas: nada é medido quando desligadas e o SQLite só é gravado a cada intervalo."""
+from datetime import time
+
+import metrics
+from database import obter_banco
+from metrics import Metricas, cronometrar
+from strategy import MarketAnalyst
+from symbol_manager import SymbolConfig
+from timeframes import TIMEFRAME_M30, TIMEFRAME_M5
+
+
+def test_cronometrar_e_motivos_sao_nulos_com_metricas_desligadas(mt5_simulado, monkeypatch):
+    # conftest desliga as métricas (METRICAS=0)
+    tempos = {}
+    with cronometrar(tempos, 'etapa'):
+        pass
+    assert tempos == {}
+
+    barras = mt5_simulado.copy_rates_from_pos("EURUSD", TIMEFRAME_M5, 0, 300)
+    ciclo = mt5_simulado.copy_rates_from_pos("EURUSD", TIMEFRAME_M30, 0, 500)
+    config = SymbolConfig(simbolo="EURUSD", horario_inicio=time(10, 0), horario_fim=time(11, 0))
+
+    analista = MarketAnalyst(barras, ciclo, "EURUSD", gravar_sinal=False)
+    assert analista.gerar_sinal_detalhado(config, time(12, 0)) == {}
+    assert (analista.tempos, analista.motivo_rejeicao) == ({}, None)
+
+    # O backtest pede os motivos mesmo sem métricas
+    analista = MarketAnalyst(barras, ciclo, "EURUSD", gravar_sinal=False, registrar_motivos=True)
+    analista.gerar_sinal_detalhado(config, time(12, 0))
+    assert (analista.tempos, analista.motivo_rejeicao) == ({}, 'horario')
+
+    monkeypatch.setattr(metrics, 'METRICAS_HABILITADAS', True)
+    with cronometrar(tempos, 'etapa'):
+        pass
+    with cronometrar(tempos, 'etapa'):
+        pass
+    assert list(tempos) == ['etapa'] and tempos['etapa'] > 0
+
+
+def test_sqlite_gravado_so_a_cada_intervalo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    caminho = str(tmp_path / "metricas.sqlite")
+    metricas = Metricas(habilitado=True, intervalo_sqlite=300)
+    metricas.registrar_tempo('analise', 0.002, 'EURUSD')
+    metricas.incrementar('sinal', 'EURUSD')
+
+    def exportacoes():
+        return obter_banco(caminho).consultar_um("SELECT COUNT(DISTINCT timestamp) FROM metricas")[0]
+
+    assert metricas.exportar(caminho) is True
+    metricas.incrementar('sinal', 'EURUSD')
+    assert metricas.exportar(caminho) is False
+    assert exportacoes() == 1
+
+    # O arquivo Prometheus acompanha cada ciclo
+    with open(tmp_path / "logs" / "metricas.prom", encoding="utf-8") as f:
+        prometheus = f.read()
+    assert 'bot_contador_total{nome="sinal",simbolo="EURUSD"} 2' in prometheus
+    assert prometheus.count("# TYPE bot_etapa_segundos summary") == 1
+
+    assert metricas.exportar(caminho, forcar=True) is True
+    assert exportacoes() == 2
+
+    metricas.intervalo_sqlite = 0
+    assert metricas.exportar(caminho) is True
+
+
+def test_metricas_desligadas_nao_exportam(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    metricas = Metricas(habilitado=False)
+    with metricas.medir('analise', 'EURUSD'):
+        pass
+    metricas.incrementar('sinal')
+    assert metricas.resumo() == []
+    assert metricas.exportar(str(tmp_path / "metricas.sqlite"), forcar=True) is False
+    assert not (tmp_path / "logs").exists()
@@ -0,0 +1,118 @@
+"""Gateway MT5: pedidos idênticos unidos, cache por TTL, limite de ritmo e back-pressure."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import fake_mt5
+from mt5_gateway import GatewayMT5, GatewaySobrecarregado
+from timeframes import TIMEFRAME_M5
+
+
+@pytest.fixture
+def gateway(mt5_simulado):
+    gateway = GatewayMT5(fake_mt5, max_por_segundo=0)
+    gateway.initialize()
+    yield gateway
+    gateway.encerrar()
+
+
+def test_pedidos_simultaneos_identicos_viram_uma_chamada(gateway):
+    fake_mt5.definir_latencia(0.05)
+    antes = fake_mt5.chamadas()['copy_rates_from_pos']
+
+    async def pedir():
+        return await asyncio.gather(*(gateway.chamar_async('copy_rates_from_pos', 'EURUSD', TIMEFRAME_M5, 0, 50)
+                                      for _ in range(20)))
+
+    resultados = asyncio.run(pedir())
+    fake_mt5.definir_latencia(0.0)
+    assert fake_mt5.chamadas()['copy_rates_from_pos'] - antes == 1
+    assert all(r is resultados[0] for r in resultados)
+    assert gateway.estatisticas()['unidos'] == 19
+
+    # Sem TTL para copy_rates_*: terminado o pedido, o próximo vai ao terminal
+    gateway.copy_rates_from_pos('EURUSD', TIMEFRAME_M5, 0, 50)
+    assert fake_mt5.chamadas()['copy_rates_from_pos'] - antes == 2
+
+
+def test_threads_e_tarefas_asyncio_compartilham_o_pedido_em_andamento(gateway):
+    fake_mt5.definir_latencia(0.05)
+    antes = fake_mt5.chamadas()['symbol_info_tick']
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(gateway.symbol_info_tick('GBPUSD')))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    resultados.append(asyncio.run(gateway.chamar_async('symbol_info_tick', 'GBPUSD')))
+    for t in threads:
+        t.join()
+    fake_mt5.definir_latencia(0.0)
+    assert len(resultados) == 6 and len({id(r) for r in resultados}) == 1
+    assert fake_mt5.chamadas()['symbol_info_tick'] - antes == 1
+
+
+def test_cache_por_ttl_e_symbol_select_o_invalida(gateway):
+    antes = fake_mt5.chamadas()['symbols_get']
+    primeiro = gateway.symbols_get()
+    assert gateway.symbols_get() is primeiro
+    assert fake_mt5.chamadas()['symbols_get'] - antes == 1
+    assert gateway.estatisticas()['acertos_cache'] == 1
+
+    # symbol_select muda a Observação do Mercado: nunca fica em cache e descarta symbols_get
+    assert gateway.symbol_select('EURUSD', True)
+    assert gateway.symbol_select('EURUSD', True)
+    assert fake_mt5.chamadas()['symbol_select'] >= 2
+    gateway.symbols_get()
+    assert fake_mt5.chamadas()['symbols_get'] - antes == 2
+
+    # None é falha no MT5: não é guardado
+    assert gateway.symbol_info('NAOEXISTE') is None
+    assert gateway.symbol_info('NAOEXISTE') is None
+    assert gateway.estatisticas()['acertos_cache'] == 1
+
+
+def test_limite_de_chamadas_por_segundo(mt5_simulado):
+    gateway = GatewayMT5(fake_mt5, ttl={'copy_rates_from_pos': 0.0}, max_por_segundo=50)
+    gateway.initialize()
+    inicio = time.perf_counter()
+    for n in range(1, 76):
+        gateway.copy_rates_from_pos('EURUSD', TIMEFRAME_M5, 0, n)
+    duracao = time.perf_counter() - inicio
+    gateway.encerrar()
+
+    # 50 fichas de saída, depois 50 por segundo: as 25 restantes esperam ~0,5 s
+    assert duracao >= 0.45
+    assert gateway.estatisticas()['espera_limite_s'] >= 0.45
+
+
+def test_fila_cheia_rejeita_depois_da_espera_maxima(mt5_simulado):
+    gateway = GatewayMT5(fake_mt5, max_fila=1, max_por_segundo=0, espera_max=0.05)
+    gateway.initialize()
+    fake_mt5.definir_latencia(0.3)
+    try:
+        # Um pedido em execução e outro na fila: o terceiro não tem vaga
+        ocupados = [threading.Thread(target=gateway.copy_rates_from_pos, args=('EURUSD', TIMEFRAME_M5, 0, n))
+                    for n in (10, 11)]
+        for t in ocupados:
+            t.start()
+            time.sleep(0.02)
+        with pytest.raises(GatewaySobrecarregado):
+            gateway.copy_rates_from_pos('EURUSD', TIMEFRAME_M5, 0, 12)
+        with pytest.raises(GatewaySobrecarregado):
+            asyncio.run(gateway.chamar_async('copy_rates_from_pos', 'EURUSD', TIMEFRAME_M5, 0, 13))
+        assert gateway.estatisticas()['rejeitados'] == 2
+        for t in ocupados:
+            t.join()
+    finally:
+        fake_mt5.definir_latencia(0.0)
+        gateway.encerrar()
+
+
+def test_reconecta_sozinho_depois_do_shutdown(gateway):
+    gateway.shutdown()
+    assert not fake_mt5._estado.inicializado
+    assert gateway.copy_rates_from_pos('EURUSD', TIMEFRAME_M5, 0, 5) is not None
+    assert fake_mt5._estado.inicializado
+    assert gateway.TIMEFRAME_M5 == TIMEFRAME_M5
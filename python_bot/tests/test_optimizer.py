@@ -0,0 +1,71 @@
+"""Seleção dos vencedores só pelo treino e candles compartilhados sem cópia."""
+import mmap
+
+import numpy as np
+import pandas as pd
+
+import optimizer
+from backtest import executar_backtest
+from bar_cache import rates_para_dataframe
+
+
+def _medidas(treino: dict, teste: dict, janelas: int = 2) -> pd.DataFrame:
+    # combinação -> objetivo; 20 operações em cada segmento
+    return pd.DataFrame([
+        {'simbolo': 'EURUSD', 'combinacao': combinacao, 'janela': janela, 'segmento': segmento,
+         'operacoes': 20, 'r_total': valores[combinacao]}
+        for janela in range(janelas)
+        for segmento, valores in (('treino', treino), ('teste', teste))
+        for combinacao in valores
+    ])
+
+
+def test_teste_nao_decide_ranking_nem_vencedor():
+    combinacoes = [{'adx_min': 20}, {'adx_min': 30}]
+    # A combinação 1 é muito melhor no teste, mas pior no treino
+    medidas = _medidas(treino={0: 5.0, 1: 1.0}, teste={0: -2.0, 1: 50.0})
+
+    ranking = optimizer._ranking(medidas, combinacoes, 'r_total', min_operacoes=10)
+    assert list(ranking['combinacao']) == [0, 1]
+    assert list(ranking['teste_r_total']) == [-2.0, 50.0]
+
+    walk_forward = optimizer._walk_forward(medidas, 'r_total', min_operacoes=10)
+    vencedores = optimizer._vencedores(walk_forward, combinacoes, {'lote': 0.01}, folds=2)
+    assert vencedores == {'EURUSD': {'lote': 0.01, 'adx_min': 20}}
+
+
+def test_vencedor_e_o_escolhido_na_ultima_janela_de_treino():
+    combinacoes = [{'adx_min': 20}, {'adx_min': 30}]
+    medidas = pd.concat([
+        _medidas(treino={0: 5.0, 1: 1.0}, teste={0: 0.0, 1: 0.0}, janelas=1),
+        _medidas(treino={0: 1.0, 1: 5.0}, teste={0: 9.0, 1: -9.0}, janelas=2).query('janela == 1'),
+    ])
+    walk_forward = optimizer._walk_forward(medidas, 'r_total', min_operacoes=10)
+    assert list(walk_forward['combinacao']) == [0, 1]
+    assert optimizer._vencedores(walk_forward, combinacoes, {}, folds=2) == {'EURUSD': {'adx_min': 30}}
+    # Sem combinação com operações suficientes no último treino, não há vencedor
+    assert optimizer._vencedores(walk_forward.iloc[:1], combinacoes, {}, folds=2) == {}
+
+
+def _sobre_o_arquivo(valores: np.ndarray) -> bool:
+    # Uma cópia tem memória própria; uma visão leva (por .base) até o mmap do arquivo .npy
+    while isinstance(valores, np.ndarray):
+        valores = valores.base
+    return isinstance(valores, mmap.mmap)
+
+
+def test_barras_mapeadas_sem_copia(rates_m5, tmp_path):
+    df = rates_para_dataframe(rates_m5)
+    caminhos = optimizer.publicar_barras(df, str(tmp_path), 'EURUSD')
+    try:
+        mapeado, _ = optimizer._abrir_barras('EURUSD', caminhos)
+
+        assert _sobre_o_arquivo(mapeado.index.values)
+        for coluna in optimizer.COLUNAS_BARRAS[1:]:
+            assert _sobre_o_arquivo(mapeado[coluna].to_numpy())
+        # As colunas float entram no backtest sem conversão
+        assert np.shares_memory(mapeado['close'].to_numpy(dtype=float), mapeado['close'].to_numpy())
+
+        assert executar_backtest(mapeado).resumo == executar_backtest(df).resumo
+    finally:
+        optimizer._barras_abertas.clear()
@@ -0,0 +1,89 @@
+"""Executor por ativo: estado incremental no processo que analisa e envio só dos candles novos."""
+import pandas as pd
+import pytest
+
+import fake_mt5
+import main
+import parallel_executor
+from parallel_executor import ExecutorEstrategias
+from symbol_manager import SymbolConfig
+
+SIMBOLOS = ("EURUSD", "GBPUSD", "BTCUSD")
+
+
+@pytest.fixture
+def robo():
+    fake_mt5.configurar(dias_historico=20)
+    fake_mt5.initialize()
+    main.cache_barras.invalidar()
+    parallel_executor._estados_ativos.clear()
+    return [SymbolConfig(simbolo=simbolo) for simbolo in SIMBOLOS]
+
+
+def _proximo_lote(configs):
+    fake_mt5.avancar(300)
+    fechamento = fake_mt5.agora()
+    horario = pd.Timestamp(fechamento - 300, unit='s').time()
+    return [main.preparar_tarefa(config, horario, fechamento) for config in configs]
+
+
+def _decisao(resultado):
+    assert resultado.erro is None
+    sinal = resultado.sinal
+    return (sinal['direcao'], sinal['sl'], sinal['tp']) if sinal else resultado.motivo_rejeicao
+
+
+def _descartar_estados():
+    # Roda dentro do processo do pool
+    parallel_executor._estados_ativos.clear()
+
+
+def _registrar_envios(executor, monkeypatch) -> list:
+    envios = []
+    original = executor._para_envio
+
+    def para_envio(tarefa):
+        enviada = original(tarefa)
+        envios.append((enviada.desde_inicio, len(enviada.barras)))
+        return enviada
+
+    monkeypatch.setattr(executor, '_para_envio', para_envio)
+    return envios
+
+
+def test_processos_recebem_so_candles_novos_e_decidem_como_em_serie(robo, monkeypatch):
+    serial = ExecutorEstrategias("serial")
+    processos = ExecutorEstrategias("process", max_workers=2)
+    envios = _registrar_envios(processos, monkeypatch)
+    try:
+        for ciclo in range(6):
+            tarefas = _proximo_lote(robo)
+            esperado = [_decisao(r) for r in serial.executar(tarefas)]
+            obtido = [_decisao(r) for r in processos.executar(tarefas)]
+            assert obtido == esperado
+
+            lote = envios[-len(tarefas):]
+            if ciclo == 0:
+                assert lote == [(True, len(t.barras)) for t in tarefas]
+            else:
+                # O último candle já enviado (repetido) e o que acabou de fechar
+                assert lote == [(False, 2)] * len(tarefas)
+    finally:
+        processos.encerrar()
+
+
+def test_processo_sem_estado_recebe_o_historico_de_novo(robo, monkeypatch):
+    executor = ExecutorEstrategias("process", max_workers=1)
+    envios = _registrar_envios(executor, monkeypatch)
+    config = robo[:1]
+    try:
+        assert executor.executar(_proximo_lote(config))[0].erro is None
+        # O processo perde o estado (ex.: reiniciado): os candles novos sozinhos não bastam
+        executor._processos[0].submit(_descartar_estados).result()
+        assert "Sem estado" in executor.executar(_proximo_lote(config))[0].erro
+
+        resultado = executor.executar(_proximo_lote(config))[0]
+        assert resultado.erro is None
+        assert [desde_inicio for desde_inicio, _ in envios] == [True, False, True]
+    finally:
+        executor.encerrar()
@@ -0,0 +1,42 @@
+"""PivotTracker contra detectar_pivos sobre a mesma janela, num feed rolando no fake_mt5."""
+import numpy as np
+import pytest
+
+from bars import Barras
+from indicators import IndicatorCalculator
+from pivot_tracker import PivotTracker
+from timeframes import TIMEFRAME_M5
+
+SIMBOLO = "EURUSD"
+JANELA = 200
+
+
+def _em_segundos(pivos) -> list:
+    return [(t.value // 1_000_000_000, p) for t, p in pivos]
+
+
+def _mais_recente_linear(pivos, valido):
+    return next((p for p in reversed(pivos) if valido(p[1])), None)
+
+
+@pytest.mark.parametrize("grupo_candles, distancia_minima", [(3, 0.0005), (2, 0.0002)])
+def test_tracker_igual_a_detectar_pivos_em_feed_rolando(mt5_simulado, grupo_candles, distancia_minima):
+    tracker = PivotTracker(grupo_candles=grupo_candles, distancia_minima=distancia_minima)
+
+    for passo in range(300):
+        mt5_simulado.avancar(1800 if passo % 60 == 59 else 60)
+        barras = Barras.de_rates(mt5_simulado.copy_rates_from_pos(SIMBOLO, TIMEFRAME_M5, 0, JANELA))
+        tracker.sincronizar(barras)
+
+        topos, fundos = IndicatorCalculator.detectar_pivos(
+            barras.como_dataframe(), grupo_candles=grupo_candles, distancia_minima=distancia_minima)
+        assert list(tracker.topos) == _em_segundos(topos)
+        assert list(tracker.fundos) == _em_segundos(fundos)
+
+        # Busca do stop (verificar_sl): bisseção na escada igual à varredura do mais recente para trás
+        preco = float(barras.close[-1])
+        for distancia in (0.0, 0.0005, 0.002):
+            assert tracker.fundos.mais_recente(lambda f: f < preco and preco - f >= distancia) == \
+                _mais_recente_linear(list(tracker.fundos), lambda f: f < preco and preco - f >= distancia)
+            assert tracker.topos.mais_recente(lambda t: t > preco and t - preco >= distancia) == \
+                _mais_recente_linear(list(tracker.topos), lambda t: t > preco and t - preco >= distancia)
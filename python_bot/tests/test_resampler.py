@@ -0,0 +1,56 @@
+"""Reamostragem local de M5 contra os candles maiores do terminal."""
+import numpy as np
+import pytest
+
+from bars import Barras
+from bar_cache import rates_para_dataframe
+from resampler import ResamplerMultiTimeframe, reamostrar, reamostrar_barras
+from timeframes import TIMEFRAME_H1, TIMEFRAME_M5, TIMEFRAME_M30
+
+SIMBOLO = "EURUSD"
+
+
+def _comparar(obtido: Barras, esperado: np.ndarray):
+    np.testing.assert_array_equal(obtido.tempo, esperado['time'])
+    for coluna in ('open', 'high', 'low', 'close', 'tick_volume'):
+        np.testing.assert_array_equal(obtido.coluna(coluna), esperado[coluna])
+
+
+@pytest.mark.parametrize("timeframe", [TIMEFRAME_M30, TIMEFRAME_H1])
+def test_reamostrado_igual_ao_terminal(mt5_simulado, rates_m5, timeframe):
+    # Base começando no meio de um candle maior: o parcial é descartado
+    base = Barras.de_rates(rates_m5[1:])
+    obtido = reamostrar_barras(base, timeframe)
+    esperado = mt5_simulado.copy_rates_from_pos(SIMBOLO, timeframe, 0, len(obtido))
+
+    _comparar(obtido, esperado)
+    # A versão com DataFrame monta os mesmos candles
+    df = reamostrar(rates_para_dataframe(rates_m5[1:]), timeframe)
+    np.testing.assert_array_equal(df['close'].to_numpy(), obtido.close)
+
+
+def test_atualizacao_incremental_igual_a_reamostrar_tudo(mt5_simulado):
+    resampler = ResamplerMultiTimeframe(SIMBOLO, TIMEFRAME_M5, max_barras=100)
+    for passo in range(40):
+        # Minuto a minuto: o candle M5 em formação é revisado antes de fechar
+        mt5_simulado.avancar(60 if passo % 7 else 420)
+        base = Barras.de_rates(mt5_simulado.copy_rates_from_pos(SIMBOLO, TIMEFRAME_M5, 0, 600))
+        if passo % 5 == 0:
+            # Base cortada no fechamento (main.ate_fechamento): volta um candle
+            base = base[:-1]
+        resampler.atualizar(base, timeframes=[TIMEFRAME_M30, TIMEFRAME_H1])
+
+        for timeframe in (TIMEFRAME_M30, TIMEFRAME_H1):
+            esperado = reamostrar_barras(base, timeframe).ultimas(100)
+            # O incremental ainda guarda candles completos que já saíram da janela da base
+            obtido = resampler.obter(timeframe, 100).ultimas(len(esperado))
+            np.testing.assert_array_equal(obtido.tempo, esperado.tempo)
+            np.testing.assert_array_equal(obtido.close, esperado.close)
+            np.testing.assert_array_equal(obtido.high, esperado.high)
+
+
+def test_timeframe_que_nao_e_multiplo_da_base():
+    resampler = ResamplerMultiTimeframe(SIMBOLO, TIMEFRAME_M30)
+    assert not resampler.suporta(TIMEFRAME_M5)
+    with pytest.raises(ValueError):
+        resampler.atualizar(Barras.vazia(), timeframes=[TIMEFRAME_M5])
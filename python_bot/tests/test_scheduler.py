@@ -0,0 +1,102 @@
+"""Agendador de fechamentos: relógio do servidor, lotes por fechamento e espera."""
+from scheduler import AgendadorFechamentos
+from timeframes import TIMEFRAME_H1, TIMEFRAME_M5, TIMEFRAME_M30
+
+LOCAL = 1_736_164_000.0   # relógio local fixo do teste
+
+
+class Relogio:
+    def __init__(self, agora: float = LOCAL):
+        self.agora = agora
+        self.sonos = []
+
+    def __call__(self) -> float:
+        return self.agora
+
+    def dormir(self, segundos: float):
+        self.sonos.append(segundos)
+        self.agora += segundos
+
+
+def _agendador(relogio: Relogio, **kwargs) -> AgendadorFechamentos:
+    return AgendadorFechamentos(relogio=relogio, dormir=relogio.dormir, **kwargs)
+
+
+def test_offset_do_servidor_usa_a_maior_amostra():
+    relogio = Relogio()
+    agendador = _agendador(relogio)
+    assert agendador.offset_servidor == 0.0
+
+    # Servidor 2h à frente; um tick antigo (mercado parado) não puxa o relógio para trás
+    agendador.registrar_hora_servidor(int(LOCAL) + 7200)
+    agendador.registrar_hora_servidor(int(LOCAL) + 7200 - 90)
+    assert agendador.offset_servidor == 7200
+    assert agendador.agora_servidor() == LOCAL + 7200
+    assert agendador.para_local(LOCAL + 7200 + 60) == LOCAL + 60
+
+
+def test_amostras_antigas_saem_da_janela():
+    relogio = Relogio()
+    agendador = _agendador(relogio, amostras_relogio=3)
+    agendador.registrar_hora_servidor(int(LOCAL) + 3600)
+    for _ in range(3):
+        agendador.registrar_hora_servidor(int(LOCAL) + 7200)
+    assert agendador.offset_servidor == 7200
+
+    agendador = _agendador(relogio, amostras_relogio=3)
+    agendador.registrar_hora_servidor(int(LOCAL) + 7200)
+    for _ in range(3):
+        agendador.registrar_hora_servidor(int(LOCAL) + 3600)
+    assert agendador.offset_servidor == 3600
+
+
+def test_proximo_fechamento_e_lote_seguem_o_relogio_do_servidor():
+    servidor = 1_736_164_800 + 7200 + 120   # 2 min após um candle de H1 (e de M30) no servidor
+    relogio = Relogio(servidor - 7200)
+    agendador = _agendador(relogio)
+    agendador.registrar_hora_servidor(servidor)
+
+    assert agendador.proximo_fechamento(TIMEFRAME_M5) == servidor - 120 + 300
+    assert agendador.proximo_fechamento(TIMEFRAME_M30) == servidor - 120 + 1800
+    # Exatamente no fechamento, o próximo é o seguinte
+    assert agendador.proximo_fechamento(TIMEFRAME_M5, servidor - 120) == servidor - 120 + 300
+
+    fechamento, ativos = agendador.proximo_lote({'EURUSD': TIMEFRAME_M5, 'GBPUSD': TIMEFRAME_H1,
+                                                 'BTCUSD': TIMEFRAME_M5})
+    assert (fechamento, ativos) == (servidor - 120 + 300, ['EURUSD', 'BTCUSD'])
+    assert agendador.proximo_lote({}) == (None, [])
+
+
+def test_aguardar_dorme_ate_o_fechamento_local_mais_carencia():
+    servidor = 1_736_164_800 + 7200 + 120
+    relogio = Relogio(servidor - 7200)
+    agendador = _agendador(relogio, carencia=2.0)
+    agendador.registrar_hora_servidor(servidor)
+    fechamento = agendador.proximo_fechamento(TIMEFRAME_M5)
+
+    assert agendador.aguardar(fechamento) is True
+    assert relogio.sonos == [180 + 2.0]
+    assert relogio() == agendador.para_local(fechamento) + 2.0
+
+    # Com outro compromisso antes do disparo, acorda nele e avisa
+    fechamento = agendador.proximo_fechamento(TIMEFRAME_M5)
+    assert agendador.aguardar(fechamento, limite_local=relogio() + 60) is False
+    assert relogio.sonos[-1] == 60
+
+    # Fechamento já passou: não dorme
+    assert agendador.aguardar(fechamento - 600) is True
+    assert relogio.sonos[-1] == 0.0
+
+
+def test_latencia_medida_a_partir_do_fechamento_local():
+    relogio = Relogio()
+    agendador = _agendador(relogio)
+    agendador.registrar_hora_servidor(int(LOCAL) + 3600)
+    assert agendador.estatisticas()['sinais'] == 0
+
+    fechamento = int(LOCAL) + 3600 - 3
+    assert agendador.registrar_latencia(fechamento) == 3
+    relogio.agora += 2
+    agendador.registrar_latencia(fechamento)
+    assert agendador.estatisticas() == {'sinais': 2, 'latencia_media': 4.0, 'latencia_max': 5.0,
+                                        'latencia_ultima': 5.0}
@@ -0,0 +1,87 @@
+"""Índice de sinais ativos: recarga por PRAGMA data_version e registro local."""
+import pickle
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import obter_banco
+from signal_index import IndiceSinais
+from signal_outbox import SQL_INSERIR_SINAL, linha_sinal
+
+
+def _gravar(caminho: str, simbolo: str, direcao: str, status: str = 'pendente', horas_atras: float = 0):
+    timestamp = (datetime.now() - timedelta(hours=horas_atras)).isoformat()
+    sinal = {'simbolo': simbolo, 'direcao': direcao, 'preco_entrada': 1.1, 'sl': 1.0, 'tp': 1.2, 'status': status,
+             'ciclo': 'bull', 'adx': 25.0, 'corpo_pct': 0.1, 'lote': 0.01, 'timestamp': timestamp}
+    obter_banco(caminho).executar(SQL_INSERIR_SINAL, linha_sinal(sinal))
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    caminho = str(tmp_path / "indice.sqlite")
+    obter_banco(caminho).conexao()
+    return caminho
+
+
+@pytest.fixture
+def indice(caminho):
+    indice = IndiceSinais(caminho)
+    yield indice
+    indice.fechar()
+
+
+def test_recarrega_so_quando_outra_conexao_altera_o_banco(caminho, indice):
+    assert indice.sincronizar() is True
+    assert indice.sincronizar() is False
+    assert not indice.repetido('EURUSD', 'buy')
+
+    _gravar(caminho, 'EURUSD', 'buy')
+    assert indice.sincronizar() is True
+    assert indice.repetido('EURUSD', 'buy')
+    assert not indice.repetido('EURUSD', 'sell')
+    assert indice.sincronizar() is False
+    assert indice.recargas == 2
+
+    # O EA marcou o sinal como executado: sai do índice na próxima recarga
+    obter_banco(caminho).executar("UPDATE sinais SET status = 'executado'")
+    assert indice.sincronizar() is True
+    assert not indice.repetido('EURUSD', 'buy')
+
+
+def test_so_sinais_ativos_e_recentes_contam(caminho, indice):
+    _gravar(caminho, 'EURUSD', 'buy', status='executado')
+    _gravar(caminho, 'GBPUSD', 'sell', horas_atras=2)
+    _gravar(caminho, 'BTCUSD', 'buy', status='em_execucao', horas_atras=0.5)
+    indice.sincronizar()
+
+    assert not indice.repetido('EURUSD', 'buy')
+    assert not indice.repetido('GBPUSD', 'sell')
+    assert indice.repetido('GBPUSD', 'sell', horas=3)
+    assert indice.repetido('BTCUSD', 'buy')
+
+
+def test_registrar_entra_sem_ir_ao_banco(indice):
+    indice.sincronizar()
+    agora = datetime.now().isoformat()
+    indice.registrar({'simbolo': 'EURUSD', 'direcao': 'buy', 'status': 'pendente', 'timestamp': agora})
+    indice.registrar({'simbolo': 'GBPUSD', 'direcao': 'buy', 'status': 'cancelado', 'timestamp': agora})
+    # Um timestamp mais antigo não substitui o mais recente
+    indice.registrar({'simbolo': 'EURUSD', 'direcao': 'buy', 'status': 'pendente',
+                      'timestamp': (datetime.now() - timedelta(hours=5)).isoformat()})
+
+    assert indice.repetido('EURUSD', 'buy')
+    assert not indice.repetido('GBPUSD', 'buy')
+    assert indice.sincronizar() is False
+
+
+def test_copia_para_o_pool_leva_o_retrato_sem_a_conexao(caminho, indice):
+    _gravar(caminho, 'EURUSD', 'sell')
+    indice.sincronizar()
+
+    copia = pickle.loads(pickle.dumps(indice))
+    assert copia.repetido('EURUSD', 'sell')
+    assert copia._conn is None
+    copia.registrar({'simbolo': 'GBPUSD', 'direcao': 'buy', 'status': 'pendente',
+                     'timestamp': datetime.now().isoformat()})
+    assert copia.repetido('GBPUSD', 'buy') and not indice.repetido('GBPUSD', 'buy')
+    copia.fechar()
@@ -0,0 +1,66 @@
+"""Gravador de sinais: descarga em lote numa transação, prazo para produtores avulsos e nova tentativa."""
+import os
+import time
+from datetime import datetime
+
+from database import obter_banco
+from signal_index import IndiceSinais
+from signal_sink import GravadorSinais
+
+
+def _sinal(simbolo: str, direcao: str = 'buy', status: str = 'pendente') -> dict:
+    return {'simbolo': simbolo, 'direcao': direcao, 'preco_entrada': 1.1, 'sl': 1.0, 'tp': 1.3,
+            'status': status, 'ciclo': 'bull', 'adx': 25.0, 'corpo_pct': 0.1, 'lote': 0.01,
+            'timestamp': datetime.now().isoformat()}
+
+
+def test_lote_gravado_numa_descarga_com_outbox_e_indice(tmp_path):
+    caminho = str(tmp_path / "sinais.sqlite")
+    indice = IndiceSinais(caminho)
+    gravador = GravadorSinais(caminho, prazo=None, indice_sinais=indice)
+    for sinal in (_sinal('EURUSD'), _sinal('GBPUSD', 'sell'), _sinal('EURUSD', 'sell', status='ignorado')):
+        gravador.adicionar(sinal)
+    assert gravador.estatisticas()['na_fila'] == 3
+
+    assert gravador.descarregar() == 3
+    assert gravador.descarregar() == 0
+    banco = obter_banco(caminho)
+    assert banco.consultar("SELECT simbolo, direcao, status FROM sinais ORDER BY id") == [
+        ('EURUSD', 'buy', 'pendente'), ('GBPUSD', 'sell', 'pendente'), ('EURUSD', 'sell', 'ignorado')]
+    # Só os pendentes vão para os EAs
+    assert banco.consultar("SELECT sinal_id, simbolo FROM outbox_sinais ORDER BY seq") == [(1, 'EURUSD'), (2, 'GBPUSD')]
+    assert indice.repetido('EURUSD', 'buy') and not indice.repetido('EURUSD', 'sell')
+
+    estatisticas = gravador.estatisticas()
+    assert (estatisticas['lotes'], estatisticas['sinais_gravados'], estatisticas['maior_lote']) == (1, 3, 3)
+    with open(os.path.join("logs", "sinais_processados.log"), encoding="utf-8") as f:
+        assert sum(1 for _ in f) >= 3
+    indice.fechar()
+
+
+def test_produtor_avulso_descarrega_apos_o_prazo(tmp_path):
+    caminho = str(tmp_path / "sinais.sqlite")
+    gravador = GravadorSinais(caminho, prazo=0.05)
+    gravador.adicionar(_sinal('EURUSD'))
+    gravador.adicionar(_sinal('GBPUSD'))
+
+    limite = time.monotonic() + 5
+    while gravador.sinais_gravados < 2 and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert (gravador.lotes, gravador.sinais_gravados) == (1, 2)
+    assert obter_banco(caminho).consultar_um("SELECT COUNT(*) FROM sinais")[0] == 2
+
+
+def test_falha_na_gravacao_mantem_os_sinais_na_fila(tmp_path):
+    diretorio = tmp_path / "ainda_nao_existe"
+    gravador = GravadorSinais(str(diretorio / "sinais.sqlite"), prazo=None)
+    gravador.adicionar(_sinal('EURUSD'))
+
+    assert gravador.descarregar() == 0
+    gravador.adicionar(_sinal('GBPUSD'))
+    assert gravador.estatisticas()['na_fila'] == 2
+
+    diretorio.mkdir()
+    assert gravador.descarregar() == 2
+    assert obter_banco(str(diretorio / "sinais.sqlite")).consultar("SELECT simbolo FROM sinais ORDER BY id") == [
+        ('EURUSD',), ('GBPUSD',)]
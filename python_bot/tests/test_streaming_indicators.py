@@ -0,0 +1,38 @@
+"""Indicadores incrementais contra o cálculo em lote, num feed rolando no fake_mt5."""
+import numpy as np
+
+from bars import Barras
+from indicators import IndicatorCalculator
+from streaming_indicators import IndicadoresIncrementais
+from timeframes import TIMEFRAME_M5
+
+SIMBOLO = "EURUSD"
+
+
+def _todas_as_barras(mt5) -> Barras:
+    return Barras.de_rates(mt5.copy_rates_from_pos(SIMBOLO, TIMEFRAME_M5, 0, 100_000))
+
+
+def test_incremental_igual_ao_lote_em_feed_rolando(mt5_simulado):
+    indicadores = IndicadoresIncrementais(SIMBOLO, TIMEFRAME_M5)
+    indicadores.semear(_todas_as_barras(mt5_simulado))
+
+    # Passos de 1 minuto: quatro de cada cinco revisam o candle em formação; a cada 60, um salto de 30 min
+    for passo in range(300):
+        mt5_simulado.avancar(1800 if passo % 60 == 59 else 60)
+        indicadores.sincronizar(Barras.de_rates(mt5_simulado.copy_rates_from_pos(SIMBOLO, TIMEFRAME_M5, 0, 50)))
+
+        barras = _todas_as_barras(mt5_simulado)
+        _, _, adx = IndicatorCalculator.adx_barras(barras)
+        vwap = IndicatorCalculator.vwap_barras(barras)
+
+        assert indicadores.ultimo_tempo == barras.tempo[-1]
+        np.testing.assert_allclose(indicadores.adx, adx[-1], rtol=1e-12)
+        np.testing.assert_allclose(indicadores.vwap_diaria, vwap['vwap_diaria'][-1], rtol=1e-12)
+        np.testing.assert_allclose(indicadores.vwap_semanal, vwap['vwap_semanal'][-1], rtol=1e-12)
+
+    # O histórico guardado bate com o lote candle a candle
+    df = indicadores.como_dataframe()
+    lote = IndicatorCalculator.calcular_adx(barras.como_dataframe()).join(
+        IndicatorCalculator.calcular_vwap(barras.como_dataframe())).loc[df.index]
+    np.testing.assert_allclose(df.to_numpy(), lote[IndicadoresIncrementais.COLUNAS].to_numpy(), rtol=1e-12)
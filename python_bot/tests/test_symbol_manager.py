@@ -0,0 +1,69 @@
+"""SymbolManager: recarga só quando versao_ativos ou versao_configuracoes muda."""
+from datetime import time
+
+import pytest
+
+from database import VERSAO_ATIVOS, incrementar_versao, obter_banco
+from symbol_manager import SymbolConfig, SymbolManager
+
+
+@pytest.fixture
+def banco(tmp_path):
+    banco = obter_banco(str(tmp_path / "simbolos.sqlite"))
+    with banco.transacao() as conn:
+        conn.executemany("INSERT INTO ativos (simbolo, tipo, volume_ajustado, observando) VALUES (?, ?, ?, ?)",
+                         [('EURUSD', 'forex', 500.0, 1), ('USDJPY', 'forex', 300.0, 1), ('BTCUSD', 'crypto', 9.0, 0)])
+        incrementar_versao(conn, VERSAO_ATIVOS)
+    return banco
+
+
+def test_carga_inicial_com_padroes_do_robo(banco):
+    gerente = SymbolManager(banco.caminho)
+    assert gerente.atualizar() is True
+    assert [c.simbolo for c in gerente.configuracoes()] == ['EURUSD', 'USDJPY']
+    assert gerente.obter_configuracao('EURUSD') == SymbolConfig('EURUSD', tipo='forex', volume_ajustado=500.0)
+    assert gerente.obter_configuracao('USDJPY').ponto == 0.01
+    assert gerente.obter_configuracao('BTCUSD') is None
+    assert gerente.atualizar() is False and gerente.recargas == 1
+
+
+def test_configuracao_alterada_recarrega_e_reaproveita_as_demais(banco):
+    gerente = SymbolManager(banco.caminho)
+    gerente.atualizar()
+    jpy = gerente.obter_configuracao('USDJPY')
+
+    # Gatilho da tabela configuracoes sobe versao_configuracoes
+    banco.executar("INSERT INTO configuracoes (simbolo, adx_min, horario_inicio, horario_fim) "
+                   "VALUES ('EURUSD', 25, '08:00', '17:30')")
+    assert gerente.desatualizado()
+    assert gerente.atualizar() is True
+    eur = gerente.obter_configuracao('EURUSD')
+    assert (eur.adx_min, eur.horario_inicio, eur.horario_fim) == (25, time(8, 0), time(17, 30))
+    assert eur.lote == 0.01   # NULL continua no padrão
+    assert gerente.obter_configuracao('USDJPY') is jpy
+
+    banco.executar("UPDATE configuracoes SET lote = 0.05 WHERE simbolo = 'EURUSD'")
+    assert gerente.atualizar() is True
+    assert gerente.obter_configuracao('EURUSD').lote == 0.05
+
+    banco.executar("DELETE FROM configuracoes")
+    assert gerente.atualizar() is True
+    assert gerente.obter_configuracao('EURUSD').adx_min == 20
+
+
+def test_lista_de_observados_segue_a_versao_do_scanner(banco):
+    gerente = SymbolManager(banco.caminho)
+    gerente.atualizar()
+
+    # Sem nova versão (ex.: só o volume mudou) a carga anterior vale
+    banco.executar("UPDATE ativos SET volume_ajustado = 700 WHERE simbolo = 'EURUSD'")
+    assert not gerente.desatualizado()
+    assert gerente.atualizar() is False
+
+    with banco.transacao() as conn:
+        conn.execute("UPDATE ativos SET observando = CASE simbolo WHEN 'USDJPY' THEN 0 ELSE 1 END")
+        incrementar_versao(conn, VERSAO_ATIVOS)
+    assert gerente.atualizar() is True
+    assert [c.simbolo for c in gerente.configuracoes()] == ['EURUSD', 'BTCUSD']
+    assert gerente.obter_configuracao('EURUSD').volume_ajustado == 700.0
+    assert gerente.obter_configuracao('USDJPY') is None
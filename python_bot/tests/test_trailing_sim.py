@@ -0,0 +1,96 @@
+"""Simulador vetorizado do trailing por marcos contra a regra do EA aplicada ponto a ponto."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from trailing_sim import ESCALA_EA, simular_trailing
+
+
+def _referencia(df, i, compra, entrada, sl, tp, escala, ordem, spread):
+    """Um ponto de preço por vez, como o EA_Executor a cada tick."""
+    s = 1.0 if compra else -1.0
+    alvo = abs(tp - entrada)
+    sl_t, tp_t, melhor = sl * s, tp * s, entrada * s
+    sl_atual = sl_t
+    for j in range(i + 1, len(df)):
+        o, h, l, c = df['open'].iat[j], df['high'].iat[j], df['low'].iat[j], df['close'].iat[j]
+        if ordem == 'ohlc':
+            baixa_primeiro = c >= o
+        else:
+            baixa_primeiro = compra == (ordem == 'pessimista')
+        pontos = (o, l, h, c) if baixa_primeiro else (o, h, l, c)
+        for k, preco in enumerate(pontos):
+            ponto = preco * s
+            acionamento = ponto - (0.0 if compra else spread[j])
+            if acionamento <= sl_atual or acionamento >= tp_t:
+                foi_sl = acionamento <= sl_atual
+                nivel = sl_atual if foi_sl else tp_t
+                saida = acionamento if k == 0 else nivel
+                resultado = ('trailing' if sl_atual > sl_t else 'sl') if foi_sl else 'tp'
+                return j, saida * s, resultado, sl_atual * s
+            melhor = max(melhor, ponto)
+            progresso = (melhor - entrada * s) / alvo
+            for gatilho, fracao in sorted(escala):
+                if progresso > 0 and progresso >= gatilho:
+                    sl_atual = max(sl_atual, (entrada + s * fracao * alvo) * s)
+    return None, df['close'].iat[-1], 'aberta', sl_atual * s
+
+
+def _candles(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 1.1 * np.exp(np.cumsum(rng.normal(0, 0.0015, n)))
+    abertura = np.r_[1.1, close[:-1]]
+    amplitude = np.abs(rng.normal(0, 0.001, n)) * close
+    return pd.DataFrame({'open': abertura, 'high': np.maximum(abertura, close) + amplitude,
+                         'low': np.minimum(abertura, close) - amplitude, 'close': close})
+
+
+@pytest.mark.parametrize('ordem', ['pessimista', 'otimista', 'ohlc'])
+@pytest.mark.parametrize('com_spread', [False, True])
+def test_igual_a_regra_do_ea_ponto_a_ponto(ordem, com_spread):
+    df = _candles(600, seed=7)
+    rng = np.random.default_rng(3)
+    n = 150
+    indices = rng.integers(0, len(df), n)
+    compra = rng.random(n) < 0.5
+    entradas = df['close'].to_numpy()[indices]
+    risco = entradas * rng.uniform(0.002, 0.01, n)
+    sinal = np.where(compra, 1.0, -1.0)
+    sls = entradas - sinal * risco
+    tps = entradas + sinal * risco * rng.uniform(1.0, 3.0, n)
+    spread = np.full(len(df), 0.0002) if com_spread else np.zeros(len(df))
+
+    obtido = simular_trailing(df, indices, np.where(compra, 'buy', 'sell'), entradas, sls, tps,
+                              ordem=ordem, spread=spread if com_spread else None)
+
+    for linha, (i, c, e, sl, tp) in enumerate(zip(indices, compra, entradas, sls, tps)):
+        esperado = _referencia(df, i, c, e, sl, tp, ESCALA_EA, ordem, spread)
+        simulado = obtido.iloc[linha]
+        assert (simulado['indice_saida'], simulado['resultado']) == (esperado[0], esperado[2]), linha
+        assert simulado['preco_saida'] == pytest.approx(esperado[1], abs=1e-12)
+        assert simulado['sl_final'] == pytest.approx(esperado[3], abs=1e-12)
+
+
+def test_compra_que_passa_da_metade_do_alvo_sai_no_zero_a_zero():
+    df = pd.DataFrame({'open': [1.00, 1.00, 1.06, 1.02],
+                       'high': [1.00, 1.06, 1.06, 1.02],
+                       'low': [1.00, 1.00, 0.99, 1.02],
+                       'close': [1.00, 1.06, 0.99, 1.02]})
+    saida = simular_trailing(df, [0], ['buy'], [1.00], [0.95], [1.10]).iloc[0]
+    assert (saida['indice_saida'], saida['resultado']) == (2, 'trailing')
+    assert saida['preco_saida'] == pytest.approx(1.00)
+    assert saida['sl_final'] == pytest.approx(1.00)
+    assert saida['lucro'] == pytest.approx(0.0) and saida['r'] == pytest.approx(0.0)
+
+    # Sem escala, a mesma operação vai até o SL original
+    saida = simular_trailing(df, [0], ['buy'], [1.00], [0.95], [1.10], escala=()).iloc[0]
+    assert saida['resultado'] == 'aberta' and saida['preco_saida'] == pytest.approx(1.02)
+
+
+def test_gap_executa_na_abertura_e_ordem_invalida():
+    df = pd.DataFrame({'open': [1.00, 0.90], 'high': [1.00, 0.91], 'low': [1.00, 0.89], 'close': [1.00, 0.90]})
+    saida = simular_trailing(df, [0], ['buy'], [1.00], [0.95], [1.10]).iloc[0]
+    assert (saida['resultado'], saida['preco_saida']) == ('sl', pytest.approx(0.90))
+
+    with pytest.raises(ValueError):
+        simular_trailing(df, [0], ['buy'], [1.00], [0.95], [1.10], ordem='aleatoria')
@@ -0,0 +1,36 @@
+# Constantes de timeframe com os mesmos valores do pacote MetaTrader5, para que
+# módulos que não falam com o terminal (cache, resampler, simulador) não precisem importá-lo.
+
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+
+SEGUNDOS_POR_TIMEFRAME = {
+    TIMEFRAME_M1: 60,
+    TIMEFRAME_M5: 5 * 60,
+    TIMEFRAME_M15: 15 * 60,
+    TIMEFRAME_M30: 30 * 60,
+    TIMEFRAME_H1: 60 * 60,
+    TIMEFRAME_H4: 4 * 60 * 60,
+    TIMEFRAME_D1: 24 * 60 * 60,
+}
+
+NOMES_TIMEFRAME = {
+    TIMEFRAME_M1: 'M1',
+    TIMEFRAME_M5: 'M5',
+    TIMEFRAME_M15: 'M15',
+    TIMEFRAME_M30: 'M30',
+    TIMEFRAME_H1: 'H1',
+    TIMEFRAME_H4: 'H4',
+    TIMEFRAME_D1: 'D1',
+}
+
+
+def segundos_timeframe(timeframe: int) -> int:
+    if timeframe not in SEGUNDOS_POR_TIMEFRAME:
+        raise ValueError(f"Timeframe não suportado: {timeframe}")
+    return SEGUNDOS_POR_TIMEFRAME[timeframe]
@@ -0,0 +1,205 @@
+"""
+Simulador do trailing stop por marcos do EA_Executor (AplicarTrailingStop).
+
+Regra do EA: com progresso = avanço do BID a favor / distância entrada→TP, o SL
+vai para a entrada aos 50%, para +25% do alvo aos 75%, +50% aos 80% e +75% aos
+95%, e só se move quando o novo nível é mais favorável. Como os níveis crescem
+com o progresso, o SL em cada instante é max(SL inicial, nível do maior
+progresso já atingido), o que permite simular milhares de operações de uma vez
+com máximos acumulados.
+
+Cada candle vira quatro pontos de preço (abertura, dois extremos, fechamento) na
+ordem escolhida:
+  - "pessimista": extremo contra a posição primeiro (compra: O→L→H→C)
+  - "otimista":   extremo a favor primeiro (compra: O→H→L→C)
+  - "ohlc":       como o testador do MT5: candle de alta O→L→H→C, de baixa O→H→L→C
+Sem colunas high/low cada linha é tratada como um tick.
+"""
+import numpy as np
+import pandas as pd
+
+# (progresso mínimo, fração do alvo onde fica o SL) — valores do EA_Executor.mq5
+ESCALA_EA = ((0.50, 0.00), (0.75, 0.25), (0.80, 0.50), (0.95, 0.75))
+ORDENS = ("pessimista", "otimista", "ohlc")
+
+
+def _pontos(abertura, high, low, close, compra: np.ndarray, ordem: str) -> np.ndarray:
+    """Matriz (operação, 4 * candles) com o caminho de preços de cada candle."""
+    if ordem not in ORDENS:
+        raise ValueError(f"Ordem inválida: {ordem} (use um de {ORDENS})")
+    if ordem == "ohlc":
+        baixa_primeiro = close >= abertura
+    else:
+        contra_primeiro = ordem == "pessimista"
+        # Compra: o extremo contra é a mínima; venda: a máxima
+        baixa_primeiro = np.broadcast_to((compra == contra_primeiro)[:, None], abertura.shape)
+    primeiro = np.where(baixa_primeiro, low, high)
+    segundo = np.where(baixa_primeiro, high, low)
+    return np.stack([abertura, primeiro, segundo, close], axis=2).reshape(len(abertura), -1)
+
+
+def simular_saidas(abertura, high, low, close, indices_entrada, compra, entradas, sls, tps,
+                   escala=ESCALA_EA, ordem: str = "pessimista", digitos: int = None, spread=None,
+                   lote_inicial: int = 64):
+    """
+    Núcleo sobre arrays: devolve (índice de saída ou -1, preço de saída, resultado,
+    SL final) por operação. Operações ainda abertas saem pelo último fechamento.
+    """
+    total = len(close)
+    spreads = np.zeros(total) if spread is None else np.broadcast_to(np.asarray(spread, dtype=float), (total,))
+
+    indices_entrada = np.asarray(indices_entrada, dtype=np.int64)
+    compra = np.asarray(compra, dtype=bool)
+    sinal = np.where(compra, 1.0, -1.0)
+    entradas = np.asarray(entradas, dtype=float)
+    sl_inicial = np.asarray(sls, dtype=float)
+    tps = np.asarray(tps, dtype=float)
+    n = len(indices_entrada)
+
+    gatilhos = np.array([g for g, _ in escala], dtype=float)
+    niveis = np.array([nv for _, nv in escala], dtype=float)
+    ordem_escala = np.argsort(gatilhos)
+    gatilhos, niveis = gatilhos[ordem_escala], niveis[ordem_escala]
+
+    # Espaço transformado: multiplicar por `sinal` faz "a favor" ser sempre para cima
+    alvo = np.abs(tps - entradas)
+    entrada_t = entradas * sinal
+    tp_t = tps * sinal
+    melhor = entrada_t.copy()
+    sl_t = sl_inicial * sinal
+
+    indice_saida = np.full(n, -1, dtype=np.int64)
+    preco_saida = np.full(n, np.nan)
+    sl_saida = sl_inicial.copy()
+    resultado = np.full(n, 'aberta', dtype=object)
+
+    def nivel_sl(maximo, linhas):
+        """SL (transformado) correspondente ao maior progresso `maximo` de cada linha."""
+        if not len(gatilhos):
+            return np.broadcast_to(sl_t[linhas, None], maximo.shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            progresso = (maximo - entrada_t[linhas, None]) / alvo[linhas, None]
+        marco = np.searchsorted(gatilhos, progresso, side='right') - 1
+        nivel = entradas[linhas, None] + sinal[linhas, None] * niveis[np.maximum(marco, 0)] * alvo[linhas, None]
+        if digitos is not None:
+            nivel = np.round(nivel, digitos)
+        movido = (marco >= 0) & (progresso > 0) & (alvo[linhas, None] > 0)
+        return np.where(movido, np.maximum(nivel * sinal[linhas, None], sl_t[linhas, None]), sl_t[linhas, None])
+
+    ativos = np.flatnonzero(indices_entrada + 1 < total)
+    posicao = indices_entrada + 1
+    passo = lote_inicial
+    while ativos.size:
+        candles = posicao[ativos, None] + np.arange(passo)
+        existe = candles < total
+        candles = np.minimum(candles, total - 1)
+        caminho = _pontos(abertura[candles], high[candles], low[candles], close[candles],
+                          compra[ativos], ordem) * sinal[ativos, None]
+        # Venda sai pelo ASK: no espaço transformado, o preço de acionamento fica `spread` abaixo
+        acionamento = caminho - np.where(compra[ativos], 0.0, 1.0)[:, None] * np.repeat(spreads[candles], 4, axis=1)
+        existe_ponto = np.repeat(existe, 4, axis=1)
+
+        # SL vigente ao chegar em cada ponto: definido pelo melhor preço até o ponto anterior
+        maximos = np.maximum.accumulate(np.concatenate([melhor[ativos, None], caminho], axis=1), axis=1)
+        sl_vigente = nivel_sl(maximos[:, :-1], ativos)
+
+        bate_sl = existe_ponto & (acionamento <= sl_vigente)
+        bate_tp = existe_ponto & (acionamento >= tp_t[ativos, None])
+        evento = bate_sl | bate_tp
+        saiu = evento.any(axis=1)
+        primeiro = evento.argmax(axis=1)
+
+        linhas = np.flatnonzero(saiu)
+        if linhas.size:
+            ops = ativos[linhas]
+            k = primeiro[linhas]
+            abertura_ponto = k % 4 == 0
+            foi_sl = bate_sl[linhas, k]
+            preco_ponto = acionamento[linhas, k]
+            # Gap na abertura: executa no preço da abertura, não no nível da ordem
+            nivel = np.where(foi_sl, sl_vigente[linhas, k], tp_t[ops])
+            preco = np.where(abertura_ponto, preco_ponto, nivel)
+            indice_saida[ops] = candles[linhas, k // 4]
+            preco_saida[ops] = preco * sinal[ops]
+            sl_saida[ops] = sl_vigente[linhas, k] * sinal[ops]
+            movido = sl_vigente[linhas, k] > sl_t[ops]
+            resultado[ops] = np.where(foi_sl, np.where(movido, 'trailing', 'sl'), 'tp')
+
+        # Operações ainda abertas seguem para o próximo bloco com o estado acumulado
+        continua = ~saiu & existe[:, -1]
+        fim_dados = ~saiu & ~existe[:, -1]
+        if fim_dados.any():
+            ops = ativos[fim_dados]
+            sl_saida[ops] = nivel_sl(maximos[fim_dados, -1:], ops)[:, 0] * sinal[ops]
+        seguem = ativos[continua]
+        melhor[seguem] = maximos[continua, -1]
+        posicao[seguem] += passo
+        ativos = seguem
+        passo = min(passo * 4, 16384)
+
+    preco_saida[indice_saida < 0] = close[-1] if total else np.nan
+    return indice_saida, preco_saida, resultado, sl_saida
+
+
+def simular_trailing(df: pd.DataFrame, indices_entrada, direcoes, entradas, sls, tps,
+                     escala=ESCALA_EA, ordem: str = "pessimista", digitos: int = None,
+                     spread=None) -> pd.DataFrame:
+    """
+    Simula a saída de cada operação a partir do candle seguinte ao de entrada.
+
+    `direcoes`: 'buy'/'sell'. `spread` (preço, por candle, opcional): stops e TP
+    de venda são acionados pelo ASK (BID + spread), enquanto o progresso do
+    trailing usa o BID, como no EA. `digitos` arredonda o novo SL (NormalizeDouble).
+    Retorna uma linha por operação, na mesma ordem da entrada.
+    """
+    close = df['close'].to_numpy(dtype=float)
+    abertura = df['open'].to_numpy(dtype=float) if 'open' in df.columns else close
+    high = df['high'].to_numpy(dtype=float) if 'high' in df.columns else close
+    low = df['low'].to_numpy(dtype=float) if 'low' in df.columns else close
+    compra = np.asarray(direcoes) == 'buy'
+    entradas = np.asarray(entradas, dtype=float)
+    sls = np.asarray(sls, dtype=float)
+    indice_saida, preco_saida, resultado, sl_final = simular_saidas(
+        abertura, high, low, close, indices_entrada, compra, entradas, sls, tps,
+        escala=escala, ordem=ordem, digitos=digitos, spread=spread)
+
+    aberta = indice_saida < 0
+    lucro = (preco_saida - entradas) * np.where(compra, 1.0, -1.0)
+    risco = np.abs(entradas - sls)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.where(risco > 0, lucro / risco, np.nan)
+    return pd.DataFrame({
+        'indice_entrada': np.asarray(indices_entrada, dtype=np.int64),
+        'indice_saida': np.where(aberta, None, indice_saida),
+        'resultado': resultado,
+        'preco_saida': preco_saida,
+        'sl_final': sl_final,
+        'lucro': lucro,
+        'r': r,
+    })
+
+
+def reprocessar_operacoes(df: pd.DataFrame, operacoes: pd.DataFrame, escala=ESCALA_EA,
+                          ordem: str = "pessimista", **kwargs) -> pd.DataFrame:
+    """Refaz as saídas de uma tabela de operações do backtest com outra escala de trailing."""
+    simulado = simular_trailing(df, operacoes['indice_entrada'], operacoes['direcao'], operacoes['preco_entrada'],
+                                operacoes['sl'], operacoes['tp'], escala=escala, ordem=ordem, **kwargs)
+    saida = operacoes.copy()
+    for coluna in ('indice_saida', 'resultado', 'preco_saida', 'lucro', 'r', 'sl_final'):
+        saida[coluna] = simulado[coluna].to_numpy()
+    saida['saida'] = [df.index[i] if i is not None else pd.NaT for i in simulado['indice_saida']]
+    saida['candles'] = [(i if i is not None else len(df) - 1) - e
+                        for i, e in zip(simulado['indice_saida'], simulado['indice_entrada'])]
+    return saida
+
+
+def comparar_escalas(df: pd.DataFrame, operacoes: pd.DataFrame, escalas: dict, ordem: str = "pessimista") -> pd.DataFrame:
+    """Resumo (R total, acerto, ...) das mesmas entradas sob cada escala de trailing."""
+    from backtest import resumir
+
+    linhas = []
+    for nome, escala in escalas.items():
+        resumo = resumir(reprocessar_operacoes(df, operacoes, escala, ordem), pd.Series(dtype=object))
+        resumo.pop('rejeicoes', None)
+        linhas.append({'escala': nome, **resumo})
+    return pd.DataFrame(linhas).set_index('escala')